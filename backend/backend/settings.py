@@ -49,6 +49,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'events.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -143,6 +144,48 @@ CORS_ALLOW_CREDENTIALS = True
 STRIPE_PUBLISHABLE_KEY = 'pk_test_...'  # Test key
 STRIPE_SECRET_KEY = 'sk_test_...'  # Test key
 STRIPE_WEBHOOK_SECRET = 'whsec_...'  # Webhook secret
+STRIPE_API_BASE = 'https://api.stripe.com'  # Yerel testlerde `manage.py fake_stripe` adresi
+STRIPE_TIMEOUT = 10  # Tek bir gateway çağrısının yeniden denemeler dahil süre sınırı (saniye)
+STRIPE_CONNECT_TIMEOUT = 2  # saniye
+STRIPE_MAX_RETRIES = 2  # Ağ hatası, 409/429 ve 5xx yanıtlarında ek deneme sayısı
+STRIPE_MAX_CONNECTIONS = 100  # Süreç başına havuzdaki en fazla bağlantı
+PAYMENT_CUSTOMER_CACHE_ENTRIES = 10000  # Süreç içinde tutulan kullanıcı -> Stripe müşteri eşlemesi
+
+# Payment webhook settings
+# Biletleri `manage.py process_payment_events` worker'ı oluşturur
+STRIPE_WEBHOOK_TOLERANCE = 300  # İmza zaman damgasının kabul edilen en fazla yaşı (saniye)
+PAYMENT_EVENT_MAX_ATTEMPTS = 8  # Bu kadar denemeden sonra olay 'failed' olarak bırakılır
+PAYMENT_EVENT_LEASE = 60  # İşlenen olayın başka worker'a verilmediği süre (saniye)
+
+# Ticket reservation settings
+TICKET_HOLD_TTL = 600  # Ödeme için ayrılan biletlerin tutulma süresi (saniye)
+BULK_ORDER_MAX_TICKETS = 5000  # Tek grup siparişindeki en fazla bilet
+BULK_ORDER_BATCH_SIZE = 500  # bulk_create başına eklenen bilet satırı
+GATE_SCAN_MAX_BATCH = 500  # Kapı cihazının tek gönderimde okutabileceği en fazla bilet
+
+# Waiting room settings
+# Event.admission_rate dolu olan etkinliklerde satın alma geçiş kartı ister
+WAITING_ROOM_TICK = 1  # Kuyruğun ilerletildiği aralık (saniye)
+WAITING_ROOM_PURCHASE_WINDOW = 600  # Geçiş kartının geçerli olduğu süre (saniye)
+WAITING_ROOM_TTL = 6 * 3600  # Kuyruk sayaçlarının önbellekte tutulduğu süre (saniye)
+
+# Catalog cache settings
+# Paylaşılan katman CACHES['default']'tur; birden fazla süreçte Redis/Memcached kullanılmalı
+CATALOG_CACHE_TIMEOUT = 300  # saniye
+CATALOG_CACHE_LOCAL_ENTRIES = 1024  # süreç içi LRU katmanındaki en fazla yanıt
+
+# Inventory broadcast settings
+INVENTORY_BROADCAST_WINDOW = 0.1  # Aynı etkinliğin güncellemelerinin birleştirildiği süre (saniye)
+
+# Admin dashboard settings
+DASHBOARD_STATS_INTERVAL = 2  # Değişiklik kontrolü ve yeniden hesaplama aralığı (saniye)
+DASHBOARD_STATS_MAX_AGE = 30  # Değişiklik olmasa da istatistiklerin yenilendiği süre (saniye)
+
+# Metrics settings
+# /metrics her süreç için ayrı sayılar sunar
+METRICS_SERVER_TIMING = DEBUG  # Yanıtlara Server-Timing başlığı eklenir
+METRICS_SLOW_REQUEST_MS = 1000  # Bu süreyi aşan istekler SQL ifadeleriyle loglanır
+METRICS_TOKEN = None  # Prometheus için 'Authorization: Bearer <token>'; tanımsızsa /metrics yalnızca staff'a açık
 
 # Channels settings
 ASGI_APPLICATION = 'backend.asgi.application'
@@ -170,6 +213,11 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': [
+        # JSON'a çevirme süresini istek metriklerine yazar
+        'events.metrics.TimedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
 # Spectacular settings
@@ -1,12 +1,17 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Count, Sum, Q
-from django.utils import timezone
-from datetime import datetime, timedelta
-from .models import Event, Ticket, Category
-from .serializers import EventSerializer, TicketSerializer, CategorySerializer
-from accounts.models import User
+from django.db.models import Count, DecimalField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.contrib.auth.models import User
+from .models import Event, Ticket
+from .stats import overview_stats, monthly_revenue, category_stats, popular_events
+from .serializers import EventListSerializer, TicketSerializer
+from .pagination import KeysetPagination
+from .fast_serializers import compile_serializer
+from decimal import Decimal
+
+USER_ORDERING_FIELDS = ('date_joined', 'username', 'ticket_count', 'total_spent')
 
 class AdminDashboardViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAdminUser]
@@ -17,107 +22,96 @@ class AdminDashboardViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Admin dashboard için istatistikler"""
-        today = timezone.now().date()
-        thirty_days_ago = today - timedelta(days=30)
-        
-        # Genel istatistikler
-        total_events = Event.objects.count()
-        active_events = Event.objects.filter(is_active=True).count()
-        total_tickets_sold = Ticket.objects.filter(is_cancelled=False).count()
-        total_revenue = Ticket.objects.filter(is_cancelled=False).aggregate(
-            total=Sum('total_price')
-        )['total'] or 0
-        
-        # Son 30 gün istatistikleri
-        recent_events = Event.objects.filter(created_at__gte=thirty_days_ago).count()
-        recent_tickets = Ticket.objects.filter(
-            purchase_date__gte=thirty_days_ago,
-            is_cancelled=False
-        ).count()
-        recent_revenue = Ticket.objects.filter(
-            purchase_date__gte=thirty_days_ago,
-            is_cancelled=False
-        ).aggregate(total=Sum('total_price'))['total'] or 0
-        
-        # Kategori bazında istatistikler
-        category_stats = Category.objects.annotate(
-            event_count=Count('events'),
-            ticket_count=Count('events__tickets', filter=Q(events__tickets__is_cancelled=False))
-        ).values('name', 'event_count', 'ticket_count')
-        
-        # En popüler etkinlikler
-        popular_events = Event.objects.annotate(
-            ticket_count=Count('tickets', filter=Q(tickets__is_cancelled=False))
-        ).order_by('-ticket_count')[:5]
-        
-        # Aylık gelir grafiği için veri
-        monthly_revenue = []
-        for i in range(12):
-            month_start = today.replace(day=1) - timedelta(days=30*i)
-            month_end = month_start + timedelta(days=30)
-            month_revenue = Ticket.objects.filter(
-                purchase_date__gte=month_start,
-                purchase_date__lt=month_end,
-                is_cancelled=False
-            ).aggregate(total=Sum('total_price'))['total'] or 0
-            monthly_revenue.append({
-                'month': month_start.strftime('%Y-%m'),
-                'revenue': float(month_revenue)
-            })
+        # Genel ve son 30 gün istatistikleri
+        overview = overview_stats()
         
         return Response({
             'overview': {
-                'total_events': total_events,
-                'active_events': active_events,
-                'total_tickets_sold': total_tickets_sold,
-                'total_revenue': float(total_revenue)
+                'total_events': overview['total_events'],
+                'active_events': overview['active_events'],
+                'total_tickets_sold': overview['total_tickets_sold'],
+                'total_revenue': overview['total_revenue']
             },
             'recent_stats': {
-                'events_last_30_days': recent_events,
-                'tickets_last_30_days': recent_tickets,
-                'revenue_last_30_days': float(recent_revenue)
+                'events_last_30_days': overview['recent_events'],
+                'tickets_last_30_days': overview['recent_tickets'],
+                'revenue_last_30_days': overview['recent_revenue']
             },
-            'category_stats': list(category_stats),
-            'popular_events': EventSerializer(popular_events, many=True).data,
-            'monthly_revenue': monthly_revenue
+            'category_stats': list(category_stats()),
+            'popular_events': EventListSerializer(popular_events(), many=True).data,
+            # Aylık gelir grafiği için veri (takvim ayları)
+            'monthly_revenue': monthly_revenue()
         })
     
     @action(detail=False, methods=['get'])
     def events_management(self, request):
-        """Etkinlik yönetimi"""
-        events = Event.objects.all().order_by('-created_at')
-        serializer = EventSerializer(events, many=True)
-        return Response(serializer.data)
+        """Etkinlik yönetimi (keyset sayfalı)"""
+        paginator = KeysetPagination()
+        paginator.ordering = ('-created_at', '-id')
+        mapper = compile_serializer(EventListSerializer)
+        events = paginator.paginate_queryset(mapper.values(Event.objects.all(), 'created_at'), request)
+        return paginator.get_paginated_response(mapper.map(events))
     
     @action(detail=False, methods=['get'])
     def users_management(self, request):
-        """Kullanıcı yönetimi"""
-        users = User.objects.all().order_by('-date_joined')
-        user_data = []
-        for user in users:
-            ticket_count = Ticket.objects.filter(user=user, is_cancelled=False).count()
-            total_spent = Ticket.objects.filter(
-                user=user, 
-                is_cancelled=False
-            ).aggregate(total=Sum('total_price'))['total'] or 0
-            
-            user_data.append({
-                'id': user.id,
-                'username': user.username,
-                'email': user.email,
-                'first_name': user.first_name,
-                'last_name': user.last_name,
-                'date_joined': user.date_joined,
-                'is_active': user.is_active,
-                'ticket_count': ticket_count,
-                'total_spent': float(total_spent)
-            })
+        """Kullanıcı yönetimi (keyset sayfalı, sıralanabilir, filtrelenebilir)"""
+        ordering = request.query_params.get('ordering', '-date_joined')
+        if ordering.lstrip('-') not in USER_ORDERING_FIELDS:
+            return Response(
+                {'detail': f"Geçersiz sıralama: {ordering}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Bilet sayısı ve harcama korelasyonlu alt sorgularla hesaplanır;
+        # varsayılan sıralamada sadece sayfadaki kullanıcılar için çalışır
+        active_tickets = Ticket.objects.filter(
+            user=OuterRef('pk'),
+            is_cancelled=False
+        ).order_by().values('user')
+        users = User.objects.annotate(
+            ticket_count=Coalesce(
+                Subquery(active_tickets.annotate(count=Count('id')).values('count')),
+                0
+            ),
+            total_spent=Coalesce(
+                Subquery(active_tickets.annotate(total=Sum('total_price')).values('total')),
+                Value(Decimal('0')),
+                output_field=DecimalField(max_digits=12, decimal_places=2)
+            )
+        )
+        
+        search = request.query_params.get('search')
+        if search:
+            users = users.filter(
+                Q(username__icontains=search) |
+                Q(email__icontains=search) |
+                Q(first_name__icontains=search) |
+                Q(last_name__icontains=search)
+            )
+        is_active = request.query_params.get('is_active')
+        if is_active in ('true', 'false'):
+            users = users.filter(is_active=is_active == 'true')
+        if request.query_params.get('has_tickets') == 'true':
+            users = users.filter(ticket_count__gt=0)
         
-        return Response(user_data)
+        users = users.values(
+            'id', 'username', 'email', 'first_name', 'last_name',
+            'date_joined', 'is_active', 'ticket_count', 'total_spent'
+        )
+        paginator = KeysetPagination()
+        paginator.ordering = (ordering, '-id' if ordering.startswith('-') else 'id')
+        page = paginator.paginate_queryset(users, request, view=None)
+        user_data = [
+            {**user, 'total_spent': float(user['total_spent'])}
+            for user in page
+        ]
+        return paginator.get_paginated_response(user_data)
     
     @action(detail=False, methods=['get'])
     def tickets_management(self, request):
-        """Bilet yönetimi"""
-        tickets = Ticket.objects.select_related('event', 'user').all().order_by('-purchase_date')
-        serializer = TicketSerializer(tickets, many=True)
-        return Response(serializer.data)
+        """Bilet yönetimi (keyset sayfalı)"""
+        paginator = KeysetPagination()
+        paginator.ordering = ('-purchase_date', '-id')
+        mapper = compile_serializer(TicketSerializer)
+        tickets = paginator.paginate_queryset(mapper.values(Ticket.objects.all()), request)
+        return paginator.get_paginated_response(mapper.map(tickets))
@@ -1,6 +1,41 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_migrate, post_save
+
+
+def install_search_index(using='default', **kwargs):
+    from django.db import connections
+    from .search import install
+    install(connections[using])
+
+
+def invalidate_event_cache(instance, **kwargs):
+    from .caching import bump_event
+    bump_event(instance.pk)
+
+
+def invalidate_category_cache(instance, **kwargs):
+    from .caching import bump, bump_category
+    bump_category(instance.pk)
+    # Etkinlik yanıtları kategoriyi iç içe içerir
+    bump('events')
 
 
 class EventsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'events'
+
+    def ready(self):
+        # SQLite tablo yeniden oluşturulunca arama tetikleyicileri düşer; her migrate sonrası geri kur
+        post_migrate.connect(install_search_index, sender=self)
+
+        # Katalog önbelleğinin sürüm damgaları
+        Event = self.get_model('Event')
+        Category = self.get_model('Category')
+        for signal in (post_save, post_delete):
+            signal.connect(invalidate_event_cache, sender=Event)
+            signal.connect(invalidate_category_cache, sender=Category)
+
+        # İstek metrikleri için sorgu sayacı her yeni bağlantıya eklenir
+        from .metrics import install_query_recorder
+        connection_created.connect(install_query_recorder)
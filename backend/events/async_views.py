@@ -0,0 +1,72 @@
+"""
+DRF 3.14 async view desteklemediği için dış servis bekleyen uç noktalar
+(ödeme) bu küçük ``APIView`` uyarlamasını kullanır.
+
+Kimlik doğrulama, izin ve throttle kontrolleri (veritabanı/önbellek erişimi)
+``sync_to_async`` ile çalışır; handler ise event loop'ta kalır. Böylece ASGI
+altında dış servisin yanıtı beklenirken bir worker thread'i tutulmaz.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    """HTTP handler'ları ``async def`` olan ``APIView``"""
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            # ``options`` ve ``http_method_not_allowed`` APIView'dan gelen senkron metotlardır
+            if asyncio.iscoroutine(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+def async_api_view(http_method_names):
+    """
+    ``@api_view`` karşılığı; ``async def`` fonksiyonu ``AsyncAPIView``'a çevirir.
+    ``@permission_classes`` gibi DRF dekoratörleri aynen kullanılır.
+    """
+    def decorator(func):
+        allowed_methods = {method.lower() for method in http_method_names} | {'options'}
+
+        async def handler(self, request, *args, **kwargs):
+            return await func(request, *args, **kwargs)
+
+        attrs = {
+            'http_method_names': sorted(allowed_methods),
+            '__doc__': func.__doc__,
+            '__module__': func.__module__,
+            'renderer_classes': getattr(func, 'renderer_classes', api_settings.DEFAULT_RENDERER_CLASSES),
+            'parser_classes': getattr(func, 'parser_classes', api_settings.DEFAULT_PARSER_CLASSES),
+            'authentication_classes': getattr(func, 'authentication_classes', api_settings.DEFAULT_AUTHENTICATION_CLASSES),
+            'throttle_classes': getattr(func, 'throttle_classes', api_settings.DEFAULT_THROTTLE_CLASSES),
+            'permission_classes': getattr(func, 'permission_classes', api_settings.DEFAULT_PERMISSION_CLASSES),
+        }
+        for method in allowed_methods - {'options'}:
+            attrs[method] = handler
+
+        view_class = type(func.__name__, (AsyncAPIView,), attrs)
+        return view_class.as_view()
+
+    return decorator
@@ -0,0 +1,240 @@
+"""
+Etkinlik stok değişikliklerinin WebSocket izleyicilerine iletilmesi.
+
+Satın alma, iptal ve rezervasyonlar ``events.inventory`` üzerinden geçer; her
+değişiklik commit sonrasında ``event_<id>`` grubuna gönderilir. Satılan ve
+kalan bilet sayıları önbellekte tutulan bir anlık görüntüdür; değişiklikler
+buna ``incr`` ile uygulanır, böylece ne yayın ne de yeni bağlanan izleyici
+veritabanına gider. Görüntü önbellekten düşerse bir kez veritabanından
+yeniden yüklenir.
+
+Yoğun satışta her alım ayrı bir grup mesajı olmaz: süreç başına bir
+``Coalescer`` aynı etkinliğin ``INVENTORY_BROADCAST_WINDOW`` saniye içindeki
+güncellemelerini birleştirir ve arka plandaki ``BroadcastWorker`` pencere
+sonunda yalnızca en güncel sayıları gönderir.
+"""
+import logging
+import threading
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+
+from .models import Event
+
+logger = logging.getLogger(__name__)
+
+# Kaybolan bir güncelleme (ör. commit sonrası çöken süreç) en geç bu sürede düzelir
+SNAPSHOT_TIMEOUT = 300
+
+
+def group_name(event_id):
+    return f'event_{event_id}'
+
+
+def _keys(event_id):
+    return f'inventory:sold:{event_id}', f'inventory:remaining:{event_id}'
+
+
+def event_state(event_id):
+    """
+    Etkinlik bilgisi ve (parçalar dahil) stok sayaçları için tek sorgu.
+    Sonuç ``values()`` satırıdır; ``snapshot_from`` ile sayılara çevrilir.
+    """
+    return Event.objects.filter(pk=event_id).values(
+        'id', 'title', 'price', 'available_tickets',
+        'sold_tickets', 'held_tickets', 'inventory_shards',
+    ).annotate(
+        shard_capacity=Sum('shards__capacity'),
+        shard_sold=Sum('shards__sold_tickets'),
+        shard_held=Sum('shards__held_tickets'),
+    )
+
+
+def snapshot_from(row):
+    if row['inventory_shards']:
+        sold, held, capacity = row['shard_sold'] or 0, row['shard_held'] or 0, row['shard_capacity'] or 0
+    else:
+        sold, held, capacity = row['sold_tickets'], row['held_tickets'], row['available_tickets']
+    return {'ticket_count': sold, 'remaining_tickets': capacity - sold - held}
+
+
+def load_snapshot(event_id):
+    """Anlık görüntüyü veritabanından hesaplar; etkinlik yoksa ``None``"""
+    row = event_state(event_id).first()
+    return None if row is None else snapshot_from(row)
+
+
+def _cached(found, sold_key, remaining_key):
+    if len(found) == 2:
+        return {'ticket_count': found[sold_key], 'remaining_tickets': found[remaining_key]}
+    return None
+
+
+def get_snapshot(event_id):
+    sold_key, remaining_key = _keys(event_id)
+    snapshot = _cached(cache.get_many([sold_key, remaining_key]), sold_key, remaining_key)
+    if snapshot is not None:
+        return snapshot
+
+    snapshot = load_snapshot(event_id)
+    if snapshot is None:
+        return {'ticket_count': 0, 'remaining_tickets': 0}
+    # ``add``: bu arada commit sonrası yüklenen daha yeni bir görüntünün üzerine yazma
+    cache.add(sold_key, snapshot['ticket_count'], SNAPSHOT_TIMEOUT)
+    cache.add(remaining_key, snapshot['remaining_tickets'], SNAPSHOT_TIMEOUT)
+    return snapshot
+
+
+async def aget_snapshot(event_id, row=None):
+    """
+    ``get_snapshot``'ın async karşılığı. Çağıran etkinlik satırını zaten
+    okuduysa (``event_state``) ``row`` ile verir, ayrıca sorgu yapılmaz.
+    """
+    sold_key, remaining_key = _keys(event_id)
+    snapshot = _cached(await cache.aget_many([sold_key, remaining_key]), sold_key, remaining_key)
+    if snapshot is not None:
+        return snapshot
+
+    if row is None:
+        row = await event_state(event_id).afirst()
+    if row is None:
+        return {'ticket_count': 0, 'remaining_tickets': 0}
+    snapshot = snapshot_from(row)
+    await cache.aadd(sold_key, snapshot['ticket_count'], SNAPSHOT_TIMEOUT)
+    await cache.aadd(remaining_key, snapshot['remaining_tickets'], SNAPSHOT_TIMEOUT)
+    return snapshot
+
+
+def publish_delta(event_id, sold=0, held=0):
+    """Stok değişikliğini commit sonrasında gruba yayınlar (işlem dışında hemen)"""
+    # Yayın hatası commit edilmiş satışı başarısız göstermemeli; hata sadece loglanır
+    transaction.on_commit(lambda: apply_delta(event_id, sold, held), robust=True)
+
+
+def apply_delta(event_id, sold=0, held=0):
+    sold_key, remaining_key = _keys(event_id)
+    try:
+        snapshot = {
+            'ticket_count': cache.incr(sold_key, sold),
+            'remaining_tickets': cache.decr(remaining_key, sold + held),
+        }
+    except ValueError:
+        # Görüntü önbellekte yok; commit edilmiş değişikliği de içeren hali yüklenir
+        cache.delete_many([sold_key, remaining_key])
+        snapshot = get_snapshot(event_id)
+
+    message = {'type': 'ticket_count', **snapshot}
+    if sold > 0:
+        message.update(type='ticket_purchased', quantity=sold)
+    schedule(event_id, message)
+    return snapshot
+
+
+def send(event_id, message):
+    channel_layer = get_channel_layer()
+    if channel_layer is not None:
+        async_to_sync(channel_layer.group_send)(group_name(event_id), message)
+
+
+def merge(pending, message):
+    """
+    Henüz gönderilmemiş güncellemeyi yenisiyle birleştirir: sayılar en yeni
+    mesajdan alınır, aradaki satın almalar kaybolmaz (adetler toplanır).
+    """
+    if pending is None:
+        return message
+    merged = dict(message)
+    if pending['type'] == 'ticket_purchased':
+        merged['type'] = 'ticket_purchased'
+        merged['quantity'] = pending['quantity'] + message.get('quantity', 0)
+    return merged
+
+
+class Coalescer:
+    """Etkinlik başına pencere süresince biriken güncellemeleri tutar (thread-safe)"""
+
+    def __init__(self):
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def add(self, event_id, message, window, now=None):
+        """Güncellemeyi ekler; yeni bir pencere açıldıysa ``True`` döner"""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            entry = self.pending.get(event_id)
+            if entry is None:
+                self.pending[event_id] = (now + window, message)
+                return True
+            deadline, previous = entry
+            self.pending[event_id] = (deadline, merge(previous, message))
+            return False
+
+    def pop_due(self, now=None):
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            due = [
+                event_id for event_id, (deadline, _) in self.pending.items()
+                if deadline <= now
+            ]
+            return [(event_id, self.pending.pop(event_id)[1]) for event_id in due]
+
+    def next_deadline(self):
+        with self.lock:
+            return min((deadline for deadline, _ in self.pending.values()), default=None)
+
+
+class BroadcastWorker(threading.Thread):
+    """Pencere süresi dolan güncellemeleri gruba gönderen arka plan thread'i"""
+
+    def __init__(self, coalescer):
+        super().__init__(name='inventory-broadcast', daemon=True)
+        self.coalescer = coalescer
+        self.wakeup = threading.Event()
+
+    def run(self):
+        while True:
+            deadline = self.coalescer.next_deadline()
+            timeout = None if deadline is None else max(0, deadline - time.monotonic())
+            self.wakeup.wait(timeout)
+            self.wakeup.clear()
+            flush(self.coalescer.pop_due())
+
+
+coalescer = Coalescer()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _ensure_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = BroadcastWorker(coalescer)
+            _worker.start()
+        return _worker
+
+
+def schedule(event_id, message):
+    """Mesajı pencere sonunda gönderilmek üzere sıraya alır (pencere 0 ise hemen gönderir)"""
+    window = getattr(settings, 'INVENTORY_BROADCAST_WINDOW', 0.1)
+    if window <= 0:
+        send(event_id, message)
+        return
+    if coalescer.add(event_id, message, window):
+        _ensure_worker().wakeup.set()
+
+
+def flush(messages=None):
+    """Verilen (varsayılan: bekleyen tüm) mesajları hemen gönderir"""
+    if messages is None:
+        messages = coalescer.pop_due(now=float('inf'))
+    for event_id, message in messages:
+        try:
+            send(event_id, message)
+        except Exception:
+            logger.exception('Inventory broadcast for event %s failed', event_id)
@@ -0,0 +1,176 @@
+"""
+Herkese açık katalog (kategori ve etkinlik) yanıtları için sürümlü önbellek.
+
+Her yanıt, bağlı olduğu kapsamların sürüm damgalarıyla birlikte anahtarlanır
+(``events``, ``event:<id>``, ``categories``, ``category:<id>``). Bir kayıt ya da
+stok değişince ilgili damga artırılır; eski anahtarlar bir daha okunmaz ve
+süreleri dolunca düşer, yani silme gerekmez.
+
+İki katman vardır: süreç içi LRU (ağ gidiş-dönüşü yok) ve Django'nun paylaşılan
+önbelleği. Damgalar her istekte paylaşılan önbellekten tek ``get_many`` ile
+okunur; yanıt gövdesi önce yerel katmanda aranır. ETag anahtardan türetildiği
+için eşleşen ``If-None-Match`` istekleri gövdeye hiç bakılmadan 304 alır.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+
+KEY_PREFIX = 'catalog'
+
+
+class LocalLRU:
+    """Thread-safe, boyutu sınırlı süreç içi önbellek"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + timeout)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+local_cache = LocalLRU(getattr(settings, 'CATALOG_CACHE_LOCAL_ENTRIES', 1024))
+
+
+def _stamp_key(scope):
+    return f'{KEY_PREFIX}:v:{scope}'
+
+
+def _new_stamp():
+    # Düşen (evict edilen) bir damga eski bir değerle geri gelmemeli
+    return time.time_ns() // 1000
+
+
+def _increment(scopes):
+    for scope in scopes:
+        key = _stamp_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _new_stamp(), None)
+
+
+def bump(*scopes):
+    """
+    Kapsamların sürümünü artırır. İşlem içindeyken commit sonrasında bir kez
+    daha artırılır; aradaki sürede eski veriyle doldurulan önbellek girdisi
+    böylece hiç okunmaz.
+    """
+    _increment(scopes)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _increment(scopes), robust=True)
+
+
+def bump_event(event_id):
+    bump('events', f'event:{event_id}')
+
+
+def bump_category(category_id):
+    bump('categories', f'category:{category_id}')
+
+
+def versions(scopes):
+    keys = [_stamp_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    missing = {key: _new_stamp() for key in keys if key not in found}
+    for key, stamp in missing.items():
+        # Aynı anda başka bir süreç oluşturduysa onunki geçerli olur
+        if not cache.add(key, stamp, None):
+            stamp = cache.get(key, stamp)
+        found[key] = stamp
+    return [found[key] for key in keys]
+
+
+class VersionedCacheMixin:
+    """
+    ``list`` ve ``retrieve`` JSON yanıtlarını sürümlü önbellekten sunar.
+    View'lar ``get_cache_scopes()`` ile yanıtın bağlı olduğu kapsamları döner.
+    """
+    cache_timeout = getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300)
+    # ``as_view(..., use_response_cache=False)`` ile kapatılabilir (ör. sorgu analizi)
+    use_response_cache = True
+
+    def get_cache_scopes(self):
+        raise NotImplementedError
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
+
+    def get_cache_key(self, request):
+        scopes = self.get_cache_scopes()
+        parts = [
+            type(self).__name__,
+            self.action,
+            request.get_host(),
+            request.get_full_path(),
+            ','.join(f'{scope}={stamp}' for scope, stamp in zip(scopes, versions(scopes))),
+        ]
+        digest = hashlib.sha1('|'.join(map(str, parts)).encode('utf-8')).hexdigest()
+        return f'{KEY_PREFIX}:r:{digest}', f'"{digest}"'
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        # Tarayıcıdan gezilebilen API gibi JSON dışı çıktılar önbelleğe alınmaz
+        if not self.use_response_cache or request.accepted_renderer.format != 'json':
+            return handler(request, *args, **kwargs)
+
+        key, etag = self.get_cache_key(request)
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+
+        entry = local_cache.get(key)
+        if entry is None:
+            entry = cache.get(key)
+            if entry is not None:
+                local_cache.set(key, entry, self.cache_timeout)
+        if entry is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            response = self.finalize_response(request, response, *args, **kwargs)
+            response.render()
+            entry = (response.content, response['Content-Type'])
+            cache.set(key, entry, self.cache_timeout)
+            local_cache.set(key, entry, self.cache_timeout)
+            response['ETag'] = etag
+            return response
+
+        content, content_type = entry
+        response = HttpResponse(content, content_type=content_type)
+        response['ETag'] = etag
+        return response
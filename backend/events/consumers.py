@@ -1,19 +1,36 @@
+import asyncio
 import json
+from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
-from channels.db import database_sync_to_async
-from .models import Event, Ticket
+from .broadcast import aget_snapshot, event_state, group_name, merge
+from .dashboard import GROUP, publisher
+from .metrics import MetricsConsumerMixin
+from .models import Event
+from . import waiting_room
 from django.contrib.auth.models import User
 
-class EventConsumer(AsyncWebsocketConsumer):
+class EventConsumer(MetricsConsumerMixin, AsyncWebsocketConsumer):
+    # Süreç içi son görüntüler; grup mesajlarıyla güncellenir, izleyici kalmayınca silinir
+    snapshots = {}
+    watchers = {}
+
     async def connect(self):
         self.event_id = self.scope['url_route']['kwargs']['event_id']
-        self.event_group_name = f'event_{self.event_id}'
+        if not self.event_id.isdigit():
+            await self.close()
+            return
+        self.event_group_name = group_name(self.event_id)
+        # Geri basınç: gönderilmeyi bekleyen tek kare ve onu gönderen görev
+        self.pending_frame = None
+        self.sender = None
+        self.dropped_frames = 0
         
         # Join event group
         await self.channel_layer.group_add(
             self.event_group_name,
             self.channel_name
         )
+        EventConsumer.watchers[self.event_id] = EventConsumer.watchers.get(self.event_id, 0) + 1
         
         await self.accept()
         
@@ -21,11 +38,22 @@ class EventConsumer(AsyncWebsocketConsumer):
         await self.send_ticket_count()
 
     async def disconnect(self, close_code):
+        if not self.event_id.isdigit():
+            return
         # Leave event group
         await self.channel_layer.group_discard(
             self.event_group_name,
             self.channel_name
         )
+        if self.sender is not None:
+            self.sender.cancel()
+        remaining = EventConsumer.watchers.get(self.event_id, 1) - 1
+        if remaining > 0:
+            EventConsumer.watchers[self.event_id] = remaining
+        else:
+            # Artık grup mesajı alınmayacak; görüntü bayatlamasın
+            EventConsumer.watchers.pop(self.event_id, None)
+            EventConsumer.snapshots.pop(self.event_id, None)
 
     async def receive(self, text_data):
         text_data_json = json.loads(text_data)
@@ -37,76 +65,150 @@ class EventConsumer(AsyncWebsocketConsumer):
             await self.send_event_info()
 
     async def send_ticket_count(self):
-        ticket_count = await self.get_ticket_count()
-        remaining_tickets = await self.get_remaining_tickets()
+        snapshot = EventConsumer.snapshots.get(self.event_id)
+        if snapshot is None:
+            # Önbellekte yoksa tek sorguyla yüklenir
+            snapshot = await aget_snapshot(self.event_id)
+            EventConsumer.snapshots[self.event_id] = snapshot
         
         await self.send(text_data=json.dumps({
             'type': 'ticket_count',
-            'ticket_count': ticket_count,
-            'remaining_tickets': remaining_tickets
+            'ticket_count': snapshot['ticket_count'],
+            'remaining_tickets': snapshot['remaining_tickets']
         }))
 
     async def send_event_info(self):
-        event_info = await self.get_event_info()
+        # Etkinlik bilgisi ve stok sayaçları tek sorguda
+        row = await event_state(self.event_id).afirst()
+        event_info = None
+        if row is not None:
+            snapshot = EventConsumer.snapshots.get(self.event_id)
+            if snapshot is None:
+                snapshot = await aget_snapshot(self.event_id, row)
+            event_info = {
+                'id': row['id'],
+                'title': row['title'],
+                'price': float(row['price']),
+                'available_tickets': row['available_tickets'],
+                'remaining_tickets': snapshot['remaining_tickets']
+            }
         await self.send(text_data=json.dumps({
             'type': 'event_info',
             'event': event_info
         }))
 
-    async def ticket_purchased(self, event):
-        # Send message to event group
-        await self.channel_layer.group_send(
-            self.event_group_name,
-            {
-                'type': 'ticket_purchased',
+    def remember(self, event):
+        EventConsumer.snapshots[self.event_id] = {
+            'ticket_count': event['ticket_count'],
+            'remaining_tickets': event['remaining_tickets']
+        }
+
+    def push(self, event):
+        """
+        Kareyi gönderim sırasına koyar. İstemci önceki kareyi henüz almadıysa
+        bekleyen kare yenisiyle birleştirilir; yavaş istemciye eski sayılar gitmez
+        ve kanal kuyruğu dolmaz.
+        """
+        if self.pending_frame is not None:
+            self.dropped_frames += 1
+        self.pending_frame = merge(self.pending_frame, event)
+        if self.sender is None or self.sender.done():
+            self.sender = asyncio.ensure_future(self.drain())
+
+    async def drain(self):
+        while self.pending_frame is not None:
+            event, self.pending_frame = self.pending_frame, None
+            frame = {
+                'type': event['type'],
                 'ticket_count': event['ticket_count'],
-                'remaining_tickets': event['remaining_tickets'],
-                'user': event['user']
+                'remaining_tickets': event['remaining_tickets']
             }
-        )
+            if event['type'] == 'ticket_purchased':
+                frame['quantity'] = event['quantity']
+            await self.send(text_data=json.dumps(frame))
+
+    async def ticket_count(self, event):
+        # İptal ve rezervasyon değişiklikleri
+        self.remember(event)
+        self.push(event)
 
     async def ticket_purchased(self, event):
-        # Send message to WebSocket
+        self.remember(event)
+        self.push(event)
+
+class QueueConsumer(MetricsConsumerMixin, AsyncWebsocketConsumer):
+    """
+    Bekleme odası: bağlanan kullanıcı kuyruğa katılır (yeniden bağlanınca
+    yerini korur) ve kuyruk her ilerlediğinde konumunu alır. Sıra gelince
+    geçiş kartı gönderilir.
+    """
+
+    async def connect(self):
+        self.event_id = self.scope['url_route']['kwargs']['event_id']
+        self.user = self.scope.get('user')
+        self.joined = False
+        if not self.event_id.isdigit() or self.user is None or not self.user.is_authenticated:
+            await self.close()
+            return
+        event = await Event.objects.filter(pk=self.event_id).values('admission_rate').afirst()
+        if event is None:
+            await self.close()
+            return
+        self.rate = event['admission_rate']
+        self.queue_group_name = waiting_room.group_name(self.event_id)
+
+        await self.channel_layer.group_add(self.queue_group_name, self.channel_name)
+        self.joined = True
+        await self.accept()
+
+        self.number = await sync_to_async(waiting_room.join)(self.event_id, self.user.pk)
+        self.admitted = False
+        self.position = None
+        if self.rate:
+            waiting_room.gatekeeper.subscribe(self.event_id, self.rate)
+            await self.send_position(await sync_to_async(waiting_room.admitted_through)(self.event_id))
+        else:
+            await self.send_pass()
+
+    async def disconnect(self, close_code):
+        if not self.joined:
+            return
+        await self.channel_layer.group_discard(self.queue_group_name, self.channel_name)
+        if self.rate:
+            waiting_room.gatekeeper.unsubscribe(self.event_id)
+
+    async def receive(self, text_data):
+        text_data_json = json.loads(text_data)
+        if text_data_json.get('type') == 'get_position':
+            self.position = None
+            await self.send_position(await sync_to_async(waiting_room.admitted_through)(self.event_id))
+
+    async def send_position(self, head):
+        if self.admitted:
+            return
+        state = waiting_room.status(self.event_id, self.number, head)
+        if state['admitted']:
+            await self.send_pass()
+        elif state['position'] != self.position:
+            # Konum değişmediyse kare gönderilmez
+            self.position = state['position']
+            await self.send(text_data=json.dumps({'type': 'queue_position', **state}))
+
+    async def send_pass(self):
+        self.admitted = True
         await self.send(text_data=json.dumps({
-            'type': 'ticket_purchased',
-            'ticket_count': event['ticket_count'],
-            'remaining_tickets': event['remaining_tickets'],
-            'user': event['user']
+            'type': 'admitted',
+            'number': self.number,
+            'pass': waiting_room.issue_pass(self.event_id, self.user.pk, self.number),
+            'expires_in': waiting_room.purchase_window(),
         }))
 
-    @database_sync_to_async
-    def get_ticket_count(self):
-        try:
-            event = Event.objects.get(id=self.event_id)
-            return event.tickets.filter(is_cancelled=False).count()
-        except Event.DoesNotExist:
-            return 0
-
-    @database_sync_to_async
-    def get_remaining_tickets(self):
-        try:
-            event = Event.objects.get(id=self.event_id)
-            return event.remaining_tickets
-        except Event.DoesNotExist:
-            return 0
-
-    @database_sync_to_async
-    def get_event_info(self):
-        try:
-            event = Event.objects.get(id=self.event_id)
-            return {
-                'id': event.id,
-                'title': event.title,
-                'price': float(event.price),
-                'available_tickets': event.available_tickets,
-                'remaining_tickets': event.remaining_tickets
-            }
-        except Event.DoesNotExist:
-            return None
+    async def queue_advanced(self, event):
+        await self.send_position(event['admitted_through'])
 
-class AdminConsumer(AsyncWebsocketConsumer):
+class AdminConsumer(MetricsConsumerMixin, AsyncWebsocketConsumer):
     async def connect(self):
-        self.admin_group_name = 'admin_dashboard'
+        self.admin_group_name = GROUP
         
         # Join admin group
         await self.channel_layer.group_add(
@@ -115,6 +217,8 @@ class AdminConsumer(AsyncWebsocketConsumer):
         )
         
         await self.accept()
+        # İstatistikler süreç başına tek görevde hesaplanıp gruba yayınlanır
+        publisher.subscribe()
 
     async def disconnect(self, close_code):
         # Leave admin group
@@ -122,6 +226,7 @@ class AdminConsumer(AsyncWebsocketConsumer):
             self.admin_group_name,
             self.channel_name
         )
+        publisher.unsubscribe()
 
     async def receive(self, text_data):
         text_data_json = json.loads(text_data)
@@ -131,7 +236,7 @@ class AdminConsumer(AsyncWebsocketConsumer):
             await self.send_stats()
 
     async def send_stats(self):
-        stats = await self.get_dashboard_stats()
+        stats = await publisher.get_stats()
         await self.send(text_data=json.dumps({
             'type': 'dashboard_stats',
             'stats': stats
@@ -143,37 +248,3 @@ class AdminConsumer(AsyncWebsocketConsumer):
             'type': 'stats_updated',
             'stats': event['stats']
         }))
-
-    @database_sync_to_async
-    def get_dashboard_stats(self):
-        from django.db.models import Count, Sum
-        from datetime import timedelta
-        from django.utils import timezone
-        
-        today = timezone.now().date()
-        thirty_days_ago = today - timedelta(days=30)
-        
-        total_events = Event.objects.count()
-        active_events = Event.objects.filter(is_active=True).count()
-        total_tickets_sold = Ticket.objects.filter(is_cancelled=False).count()
-        total_revenue = Ticket.objects.filter(is_cancelled=False).aggregate(
-            total=Sum('total_price')
-        )['total'] or 0
-        
-        recent_tickets = Ticket.objects.filter(
-            purchase_date__gte=thirty_days_ago,
-            is_cancelled=False
-        ).count()
-        recent_revenue = Ticket.objects.filter(
-            purchase_date__gte=thirty_days_ago,
-            is_cancelled=False
-        ).aggregate(total=Sum('total_price'))['total'] or 0
-        
-        return {
-            'total_events': total_events,
-            'active_events': active_events,
-            'total_tickets_sold': total_tickets_sold,
-            'total_revenue': float(total_revenue),
-            'recent_tickets': recent_tickets,
-            'recent_revenue': float(recent_revenue)
-        }
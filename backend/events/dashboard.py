@@ -0,0 +1,147 @@
+"""
+Admin paneli istatistiklerinin paylaşılan hesaplanması.
+
+Bağlı admin sayısından bağımsız olarak istatistikler tek bir yerde hesaplanır:
+
+* Admin bağlantısı olan her süreçte bir ``DashboardPublisher`` görevi çalışır,
+  ancak önbellekteki kira (lease) kaydını tutan lider süreç hesaplama ve
+  ``admin_dashboard`` grubuna ``stats_updated`` yayını yapar.
+* Lider her ``DASHBOARD_STATS_INTERVAL`` saniyede katalog sürüm damgalarına
+  bakar (satışlar ve etkinlik değişiklikleri bunları artırır); değişiklik
+  varsa ya da sonuç ``DASHBOARD_STATS_MAX_AGE`` saniyeden eskiyse yeniden
+  hesaplar.
+* ``get_stats`` istekleri önbellekteki sonuçtan yanıtlanır; sonuç yoksa aynı
+  anda gelen istekler tek bir hesaplamayı bekler (single-flight).
+"""
+import asyncio
+import logging
+import time
+import uuid
+
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+
+from .caching import versions
+from .stats import aoverview_stats, overview_stats
+
+logger = logging.getLogger(__name__)
+
+GROUP = 'admin_dashboard'
+STATS_KEY = 'dashboard:stats'
+LEADER_KEY = 'dashboard:leader'
+# Bu kapsamların damgası değişmediyse istatistikler de değişmemiştir
+STATS_SCOPES = ['events', 'categories']
+
+
+def compute_stats():
+    return {
+        'stamp': versions(STATS_SCOPES),
+        'stats': overview_stats(),
+        'computed_at': time.time(),
+    }
+
+
+async def acompute_stats():
+    # Damga sorgudan önce okunur; arada olan bir satış sonraki turda yakalanır
+    stamp = await sync_to_async(versions)(STATS_SCOPES)
+    return {
+        'stamp': stamp,
+        'stats': await aoverview_stats(),
+        'computed_at': time.time(),
+    }
+
+
+class DashboardPublisher:
+    def __init__(self):
+        self.token = uuid.uuid4().hex
+        self.subscribers = 0
+        self.task = None
+        self.inflight = None
+
+    @property
+    def interval(self):
+        return getattr(settings, 'DASHBOARD_STATS_INTERVAL', 2)
+
+    @property
+    def max_age(self):
+        return getattr(settings, 'DASHBOARD_STATS_MAX_AGE', 30)
+
+    def subscribe(self):
+        self.subscribers += 1
+        if not self._alive(self.task):
+            self.task = asyncio.ensure_future(self.run())
+
+    def unsubscribe(self):
+        self.subscribers = max(0, self.subscribers - 1)
+        if not self.subscribers and self.task is not None:
+            # Kira süresi dolunca başka bir süreç liderliği devralır
+            self.task.cancel()
+            self.task = None
+
+    def _alive(self, future):
+        # Görev başka (kapanmış) bir event loop'a ait olabilir
+        return (
+            future is not None
+            and not future.done()
+            and future.get_loop() is asyncio.get_running_loop()
+        )
+
+    async def get_stats(self):
+        entry = await cache.aget(STATS_KEY)
+        if entry is None:
+            entry = await self.compute()
+        return entry['stats']
+
+    async def compute(self):
+        """Aynı anda gelen çağrılar tek hesaplamayı paylaşır"""
+        if not self._alive(self.inflight):
+            self.inflight = asyncio.ensure_future(self._compute())
+        return await asyncio.shield(self.inflight)
+
+    async def _compute(self):
+        entry = await acompute_stats()
+        await cache.aset(STATS_KEY, entry, self.max_age)
+        return entry
+
+    async def is_leader(self):
+        lease = self.interval * 3
+        if await cache.aadd(LEADER_KEY, self.token, lease):
+            return True
+        if await cache.aget(LEADER_KEY) == self.token:
+            await cache.atouch(LEADER_KEY, lease)
+            return True
+        return False
+
+    async def refresh(self):
+        """Gerekirse yeniden hesaplar ve yayınlar; yayın yapıldıysa ``True``"""
+        entry = await cache.aget(STATS_KEY)
+        stamp = await sync_to_async(versions)(STATS_SCOPES)
+        if (
+            entry is not None
+            and entry['stamp'] == stamp
+            and time.time() - entry['computed_at'] < self.max_age
+        ):
+            return False
+
+        entry = await self.compute()
+        await get_channel_layer().group_send(GROUP, {
+            'type': 'stats_updated',
+            'stats': entry['stats'],
+        })
+        return True
+
+    async def run(self):
+        while True:
+            try:
+                if await self.is_leader():
+                    await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception('Dashboard stats refresh failed')
+            await asyncio.sleep(self.interval)
+
+
+publisher = DashboardPublisher()
@@ -0,0 +1,230 @@
+"""
+Testler ve yerel yük testleri için bellek içi Stripe API taklidi.
+
+Gateway'in kullandığı uç noktaları (PaymentIntent, Customer, PaymentMethod,
+SetupIntent) Stripe'ın form biçimi ve hata gövdesiyle yanıtlar. Gecikme ve
+hata enjeksiyonu yapılabilir::
+
+    with FakeStripe(latency=0.05) as fake, override_settings(STRIPE_API_BASE=fake.url):
+        fake.fail_next(503, 'drop')
+        ...
+
+``fail_next`` ile sıraya alınan her değer bir sonraki isteğe uygulanır:
+HTTP durum kodu isteği işlemeden o kodla yanıtlar; ``'drop'`` isteği işler
+ama yanıt göndermeden bağlantıyı kapatır (yanıtı kaybolan istek).
+"""
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+KEY_PART = re.compile(r'\[([^\]]*)\]')
+
+
+def decode(pairs):
+    """``metadata[event_id]=1`` ve ``types[0]=card`` biçimini iç içe yapıya çevirir"""
+    result = {}
+    for name, value in pairs:
+        base = name.split('[', 1)[0]
+        path = [base] + KEY_PART.findall(name[len(base):])
+        target = result
+        for part in path[:-1]:
+            target = target.setdefault(part, {})
+        target[path[-1]] = value
+    return _lists(result)
+
+
+def _lists(value):
+    if not isinstance(value, dict):
+        return value
+    if value and all(key.isdigit() for key in value):
+        return [_lists(value[key]) for key in sorted(value, key=int)]
+    return {key: _lists(item) for key, item in value.items()}
+
+
+class FakeStripe:
+    def __init__(self, host='127.0.0.1', port=0, latency=0, api_key=None):
+        self.latency = latency
+        self.api_key = api_key
+        self.lock = threading.Lock()
+        self.failures = []
+        self.requests = []
+        self.objects = {}
+        self.replies = {}
+        self.inflight = set()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name='fake-stripe', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def fail_next(self, *failures):
+        with self.lock:
+            self.failures.extend(failures)
+
+    def succeed(self, payment_intent_id):
+        """Müşterinin ödemeyi tamamladığını taklit eder"""
+        with self.lock:
+            self.objects[payment_intent_id]['status'] = 'succeeded'
+        return self.objects[payment_intent_id]
+
+    def add_payment_method(self, customer_id, last4='4242'):
+        return self._create('pm', {
+            'object': 'payment_method',
+            'type': 'card',
+            'customer': customer_id,
+            'card': {'brand': 'visa', 'last4': last4, 'exp_month': 12, 'exp_year': 2030},
+        })
+
+    def count(self, method, path):
+        return sum(1 for request in self.requests if request[:2] == (method, path))
+
+    def _create(self, prefix, obj):
+        obj['id'] = f'{prefix}_{uuid.uuid4().hex[:24]}'
+        obj['created'] = int(time.time())
+        with self.lock:
+            self.objects[obj['id']] = obj
+        return obj
+
+    def _list(self, object_type, **filters):
+        with self.lock:
+            return [
+                obj for obj in self.objects.values()
+                if obj['object'] == object_type
+                and all(obj.get(key) == value for key, value in filters.items())
+            ]
+
+    def handle(self, method, path, params, headers):
+        """``(durum, gövde)`` döner"""
+        api_key = (headers.get('Authorization') or '').removeprefix('Bearer ')
+        if not api_key or (self.api_key and api_key != self.api_key):
+            return 401, error('invalid_request_error', 'Invalid API Key provided')
+
+        if (method, path) == ('POST', '/v1/payment_intents'):
+            intent = self._create('pi', {
+                'object': 'payment_intent',
+                'amount': int(params['amount']),
+                'currency': params['currency'],
+                'metadata': params.get('metadata', {}),
+                'status': 'requires_payment_method',
+            })
+            intent['client_secret'] = f"{intent['id']}_secret_{uuid.uuid4().hex[:12]}"
+            return 200, intent
+        if (method, path) == ('POST', '/v1/customers'):
+            return 200, self._create('cus', {
+                'object': 'customer',
+                'email': params.get('email'),
+                'name': params.get('name'),
+                'metadata': params.get('metadata', {}),
+            })
+        if (method, path) == ('GET', '/v1/customers'):
+            customers = self._list('customer', email=params['email']) if 'email' in params else self._list('customer')
+            return 200, page(customers[:int(params.get('limit', 10))], path)
+        if (method, path) == ('GET', '/v1/payment_methods'):
+            return 200, page(self._list('payment_method', customer=params.get('customer'), type=params.get('type', 'card')), path)
+        if (method, path) == ('POST', '/v1/setup_intents'):
+            setup_intent = self._create('seti', {
+                'object': 'setup_intent',
+                'customer': params.get('customer'),
+                'payment_method_types': params.get('payment_method_types', ['card']),
+                'status': 'requires_payment_method',
+            })
+            setup_intent['client_secret'] = f"{setup_intent['id']}_secret_{uuid.uuid4().hex[:12]}"
+            return 200, setup_intent
+
+        match = re.fullmatch(r'/v1/(payment_intents|customers)/(\w+)', path)
+        if method == 'GET' and match and match.group(2) in self.objects:
+            return 200, self.objects[match.group(2)]
+        return 404, error('invalid_request_error', f'No such resource: {path}', code='resource_missing')
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                self.dispatch()
+
+            def do_POST(self):
+                self.dispatch()
+
+            def dispatch(self):
+                url = urlsplit(self.path)
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length).decode() if length else ''
+                params = decode(parse_qsl(url.query if self.command == 'GET' else body))
+                idempotency_key = self.headers.get('Idempotency-Key')
+                with fake.lock:
+                    fake.requests.append((self.command, url.path, idempotency_key))
+                    failure = fake.failures.pop(0) if fake.failures else None
+                if fake.latency:
+                    time.sleep(fake.latency)
+
+                replayed = None
+                if isinstance(failure, int):
+                    status, reply = failure, error('api_error', 'Injected failure')
+                else:
+                    with fake.lock:
+                        replayed = fake.replies.get(idempotency_key) if idempotency_key else None
+                        concurrent = idempotency_key in fake.inflight
+                        if idempotency_key and replayed is None and not concurrent:
+                            fake.inflight.add(idempotency_key)
+                    if replayed is not None:
+                        status, reply = replayed
+                    elif concurrent:
+                        # Stripe aynı anahtarla süren isteğe 409 döner; istemci tekrar dener
+                        status, reply = 409, error('idempotency_error', 'Concurrent request with the same key')
+                    else:
+                        try:
+                            status, reply = fake.handle(self.command, url.path, params, self.headers)
+                            if idempotency_key:
+                                fake.replies[idempotency_key] = (status, reply)
+                        finally:
+                            fake.inflight.discard(idempotency_key)
+                if failure == 'drop':
+                    self.close_connection = True
+                    return
+
+                payload = json.dumps(reply).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                if replayed is not None:
+                    self.send_header('Idempotent-Replayed', 'true')
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def error(error_type, message, code=None):
+    return {'error': {'type': error_type, 'message': message, 'code': code}}
+
+
+def page(data, url):
+    return {'object': 'list', 'data': data, 'has_more': False, 'url': url}
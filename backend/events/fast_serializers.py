@@ -0,0 +1,294 @@
+"""
+Liste uçları için ``values()`` tabanlı hızlı serileştirme.
+
+``ModelSerializer`` her satırda her alan için ``get_attribute`` ve
+``to_representation`` çağırır; sorgular sabitlendikten sonra liste
+sayfalarında sürenin çoğu burada geçer. ``compile_serializer`` serializer
+tanımını bir kez okuyup şunları çıkarır:
+
+* ``values()`` ile istenecek sütunlar (iç içe serializer'lar için
+  ``event__category__name`` gibi yollar; model örneği oluşturulmaz),
+* satırı çıktı dict'ine çeviren, tek dict ifadesinden oluşan bir fonksiyon.
+  Veritabanından zaten doğru tipte gelen metin, tam sayı ve mantıksal
+  sütunlar olduğu gibi yazılır; diğerleri DRF alanının kuralını izleyen bir
+  çevirici ile (ISO tarih/saat, saat dilimi, ondalık metin, dosya URL'si).
+  Standart dışı ayarlı alanlarda alanın kendi ``to_representation`` metodu
+  kullanılır.
+
+Model özelliklerinden gelen alanlar (``remaining_tickets``) ``COMPUTED``
+içinde satır sütunlarından hesaplanır; parçalı stoklu etkinliklerin parça
+toplamları sayfa başına tek sorguyla alınır.
+
+Çıktı serializer'ın çıktısıyla bayt bayt aynıdır
+(``test_views.FastSerializerTest``, ``manage.py benchmark_serializers``).
+Derlenemeyen alan (``source='*'``, noktalı kaynak, ``many=True``, hesaplama
+kuralı olmayan özellik) derlemede ``ImproperlyConfigured`` hatası verir.
+"""
+import decimal
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db.models import Sum
+from rest_framework import fields, serializers
+from rest_framework.response import Response
+from rest_framework.settings import ISO_8601, api_settings
+
+from .models import Event, InventoryShard
+
+# Bu model alanlarının değeri veritabanından DRF alanının çıktısıyla aynı tipte gelir
+NATIVE = {
+    fields.CharField: ('CharField', 'TextField', 'SlugField', 'EmailField', 'URLField'),
+    fields.SlugField: ('SlugField',),
+    fields.IntegerField: (
+        'AutoField', 'BigAutoField', 'SmallAutoField', 'IntegerField', 'BigIntegerField',
+        'SmallIntegerField', 'PositiveIntegerField', 'PositiveBigIntegerField',
+        'PositiveSmallIntegerField',
+    ),
+    fields.BooleanField: ('BooleanField',),
+}
+
+
+def _field_rule(field):
+    return lambda context: field.to_representation
+
+
+def _is_iso(field, default):
+    output_format = getattr(field, 'format', default)
+    return output_format is not None and output_format.lower() == ISO_8601
+
+
+def _isoformat(value):
+    return value.isoformat()
+
+
+def _date(field, default):
+    if not _is_iso(field, default):
+        return _field_rule(field)
+    return lambda context: _isoformat
+
+
+def _datetime(field):
+    if not _is_iso(field, api_settings.DATETIME_FORMAT):
+        return _field_rule(field)
+
+    def factory(context):
+        # Saat dilimi her değer için değil, sayfa başına bir kez çözülür
+        zone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+        if zone is None:
+            return field.to_representation
+
+        def convert(value):
+            if value.tzinfo is None:
+                return field.to_representation(value)
+            value = value.astimezone(zone).isoformat()
+            return value[:-6] + 'Z' if value.endswith('+00:00') else value
+        return convert
+    return factory
+
+
+def _decimal(field):
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if not coerce_to_string or field.localize or field.decimal_places is None:
+        return _field_rule(field)
+    exponent = decimal.Decimal('.1') ** field.decimal_places
+
+    def factory(context):
+        # ``DecimalField.quantize`` bağlamı her değerde kopyalar; burada sayfa başına bir kez
+        quantize_context = decimal.getcontext().copy()
+        if field.max_digits is not None:
+            quantize_context.prec = field.max_digits
+
+        def convert(value):
+            return '{:f}'.format(value.quantize(exponent, rounding=field.rounding, context=quantize_context))
+        return convert
+    return factory
+
+
+def _choice(field):
+    choices = field.choice_strings_to_values
+    return lambda context: lambda value: choices.get(str(value), value)
+
+
+def _file(field, model_field):
+    def factory(context):
+        if not getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL):
+            return lambda name: name or None
+        storage = model_field.storage
+        request = context.get('request')
+        if request is None:
+            return lambda name: storage.url(name) if name else None
+        return lambda name: request.build_absolute_uri(storage.url(name)) if name else None
+    return factory
+
+
+def _converter(field, model_field):
+    """Alan için ``context`` alıp çevirici dönen fabrika"""
+    kind = type(field)
+    if kind is fields.CharField or kind is fields.SlugField:
+        return lambda context: str
+    if kind is fields.IntegerField:
+        return lambda context: int
+    if kind is fields.BooleanField:
+        return lambda context: bool
+    if kind is fields.DateField:
+        return _date(field, api_settings.DATE_FORMAT)
+    if kind is fields.TimeField:
+        return _date(field, api_settings.TIME_FORMAT)
+    if kind is fields.DateTimeField:
+        return _datetime(field)
+    if kind is fields.DecimalField:
+        return _decimal(field)
+    if kind is fields.ChoiceField:
+        return _choice(field)
+    if kind is fields.FileField or kind is fields.ImageField:
+        return _file(field, model_field)
+    return _field_rule(field)
+
+
+class Computed:
+    """Model özelliğini ``values()`` sütunlarından hesaplayan kural"""
+    columns = ()
+
+    def prepare(self, rows, prefix):
+        """Sayfanın satırlarından değeri hesaplayan fonksiyonu döner"""
+        raise NotImplementedError
+
+
+class RemainingTickets(Computed):
+    columns = ('id', 'available_tickets', 'sold_tickets', 'held_tickets', 'inventory_shards')
+
+    def prepare(self, rows, prefix):
+        # ``inventory.totals`` ile aynı hesap; parça toplamları tek sorguda
+        id_, available, sold, held, shard_count = (f'{prefix}{column}' for column in self.columns)
+        sharded = {row[id_] for row in rows if row[shard_count]}
+        shards = {}
+        if sharded:
+            totals = InventoryShard.objects.filter(event_id__in=sharded).values('event_id').annotate(
+                capacity=Sum('capacity'), sold=Sum('sold_tickets'), held=Sum('held_tickets')
+            ).order_by()
+            shards = {row['event_id']: row['capacity'] - row['sold'] - row['held'] for row in totals}
+
+        def remaining(row):
+            if row[shard_count]:
+                return shards.get(row[id_], 0)
+            return row[available] - row[sold] - row[held]
+        return remaining
+
+
+COMPUTED = {
+    (Event, 'remaining_tickets'): RemainingTickets(),
+}
+
+
+class RowMapper:
+    """
+    Serializer'ın (iç içe olanlar dahil) derlenmiş hali. Satır fonksiyonunun
+    kaynağı derlemede bir kez üretilir; sayfa başına yalnızca isteğe ve
+    sayfanın satırlarına bağlı çeviriciler bağlanır.
+    """
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self.columns = []
+        # Sayfa başına bağlanacak çeviriciler: fabrika ya da (Computed, önek)
+        self.slots = []
+        body = self.compile(serializer_class(), '')
+        params = ', '.join(f'_{index}' for index in range(len(self.slots)))
+        self.source = (
+            f'def bind({params}):\n'
+            f'    def to_representation(row):\n'
+            f'        return {body}\n'
+            f'    return to_representation\n'
+        )
+        namespace = {}
+        exec(compile(self.source, f'<{serializer_class.__name__} row mapper>', 'exec'), namespace)
+        self._bind = namespace['bind']
+        self.columns = list(dict.fromkeys(self.columns))
+
+    def slot(self, converter):
+        self.slots.append(converter)
+        return f'_{len(self.slots) - 1}'
+
+    def compile(self, serializer, prefix):
+        """Serializer için satırdan çıktı dict'ini kuran ifade"""
+        model = serializer.Meta.model
+        items = []
+        for field in serializer._readable_fields:
+            source = field.source
+            if isinstance(field, serializers.ListSerializer) or '.' in source or source == '*':
+                raise ImproperlyConfigured(
+                    f'{type(serializer).__name__}.{field.field_name} cannot be compiled'
+                )
+            column = f'{prefix}{source}'
+
+            if isinstance(field, serializers.BaseSerializer):
+                expression = self.compile(field, f'{column}__')
+                if model._meta.get_field(source).null:
+                    # Boş ilişkide DRF alanı None yazar
+                    self.columns.append(column)
+                    expression = f'None if row[{column!r}] is None else {expression}'
+            elif (model, source) in COMPUTED:
+                computed = COMPUTED[(model, source)]
+                self.columns.extend(f'{prefix}{name}' for name in computed.columns)
+                expression = f'{self.slot((computed, prefix))}(row)'
+            else:
+                try:
+                    model_field = model._meta.get_field(source)
+                except FieldDoesNotExist:
+                    raise ImproperlyConfigured(
+                        f'{type(serializer).__name__}.{field.field_name}: '
+                        f'{model.__name__}.{source} has no rule in COMPUTED'
+                    )
+                self.columns.append(column)
+                if model_field.get_internal_type() in NATIVE.get(type(field), ()):
+                    expression = f'row[{column!r}]'
+                elif model_field.null:
+                    converter = self.slot(_converter(field, model_field))
+                    expression = f'(None if (_value := row[{column!r}]) is None else {converter}(_value))'
+                else:
+                    expression = f'{self.slot(_converter(field, model_field))}(row[{column!r}])'
+            items.append(f'{field.field_name!r}: {expression}')
+        return '{' + ', '.join(items) + '}'
+
+    def values(self, queryset, *extra):
+        """Satırları dict olarak dönen sorgu; ``extra`` ör. keyset sıralama sütunları"""
+        return queryset.prefetch_related(None).values(*dict.fromkeys(self.columns + list(extra)))
+
+    def bind(self, rows, context):
+        """Bu sayfanın satırlarını çıktıya çeviren fonksiyonu döner"""
+        converters = []
+        for slot in self.slots:
+            if isinstance(slot, tuple):
+                computed, prefix = slot
+                converters.append(computed.prepare(rows, prefix))
+            else:
+                converters.append(slot(context))
+        return self._bind(*converters)
+
+    def map(self, rows, context=None):
+        rows = list(rows)
+        to_representation = self.bind(rows, context or {})
+        return [to_representation(row) for row in rows]
+
+
+@lru_cache(maxsize=None)
+def compile_serializer(serializer_class):
+    return RowMapper(serializer_class)
+
+
+class FastListMixin:
+    """
+    ``list`` eylemini serializer yerine derlenmiş ``RowMapper`` ile sunar.
+    Keyset sayfalama imleci için ``keyset_ordering`` sütunları da okunur.
+    """
+
+    def list(self, request, *args, **kwargs):
+        mapper = compile_serializer(self.get_serializer_class())
+        ordering = [field.lstrip('-') for field in getattr(self, 'keyset_ordering', ())]
+        rows = mapper.values(self.filter_queryset(self.get_queryset()), *ordering)
+        context = self.get_serializer_context()
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(mapper.map(page, context))
+        return Response(mapper.map(rows, context))
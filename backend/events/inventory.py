@@ -0,0 +1,238 @@
+"""
+Stok sayaçları için düşük seviyeli atomik işlemler.
+
+Normal etkinliklerde ``sold_tickets`` ve ``held_tickets`` sayaçları Event
+satırında tutulur. Çok yoğun etkinliklerde (``inventory_shards > 0``) stok
+N adet ``InventoryShard`` satırına bölünür; her alım rastgele bir parçadan
+düşer, böylece yazma çekişmesi parça sayısıyla ölçeklenir. Bir parça
+tükendiğinde diğer parçaların boş kapasitesi ona aktarılır.
+"""
+import random
+
+from django.db import transaction
+from django.db.models import F, Sum
+
+from .broadcast import publish_delta
+from .caching import bump_event
+from .models import Event, InventoryShard
+
+COUNTERS = ('sold_tickets', 'held_tickets')
+
+# Parça tükenmiş görünürse yeniden dengelemeden önce denenecek parça sayısı
+SHARD_PROBES = 2
+
+
+def _changed(event, counter, quantity):
+    # Katalog önbelleğini eskit, izleyicilere değişikliği gönder
+    bump_event(event.pk)
+    if counter == 'sold_tickets':
+        publish_delta(event.pk, sold=quantity)
+    else:
+        publish_delta(event.pk, held=quantity)
+
+
+def _has_room(quantity):
+    return {'capacity__gte': F('sold_tickets') + F('held_tickets') + quantity}
+
+
+def take(event, quantity, counter, check_availability=True):
+    """
+    Sayacı ``quantity`` kadar artırır. ``check_availability`` açıkken yalnızca
+    yeterli stok varsa artırır. Başarısızsa ``None``, başarılıysa bileti alan
+    parçanın numarasını döner (parçasız etkinliklerde ``-1``).
+    """
+    shard_index = _take(event, quantity, counter, check_availability)
+    if shard_index is not None:
+        _changed(event, counter, quantity)
+    return shard_index
+
+
+def _take(event, quantity, counter, check_availability):
+    if not event.inventory_shards:
+        filters = {'pk': event.pk, 'inventory_shards': 0}
+        if check_availability:
+            filters['is_active'] = True
+            filters['available_tickets__gte'] = (
+                F('sold_tickets') + F('held_tickets') + quantity
+            )
+        if not Event.objects.filter(**filters).update(**{counter: F(counter) + quantity}):
+            return None
+        setattr(event, counter, getattr(event, counter) + quantity)
+        return -1
+
+    if check_availability and not event.is_active:
+        return None
+    shards = InventoryShard.objects.filter(event_id=event.pk)
+    indexes = random.sample(range(event.inventory_shards), event.inventory_shards)
+    if not check_availability:
+        shards.filter(index=indexes[0]).update(**{counter: F(counter) + quantity})
+        return indexes[0]
+
+    for index in indexes[:SHARD_PROBES]:
+        if shards.filter(index=index, **_has_room(quantity)).update(
+            **{counter: F(counter) + quantity}
+        ):
+            return index
+    # Denenen parçalar tükenmiş; boş kapasiteyi ilk parçaya toplayıp tekrar dene
+    if rebalance(event, indexes[0], quantity) and shards.filter(
+        index=indexes[0], **_has_room(quantity)
+    ).update(**{counter: F(counter) + quantity}):
+        return indexes[0]
+    return None
+
+
+def give_back(event, quantity, counter, shard_index=-1):
+    """Sayacı ``quantity`` kadar azaltır (iptal ya da rezervasyon iadesi)"""
+    _changed(event, counter, -quantity)
+    if not event.inventory_shards:
+        Event.objects.filter(pk=event.pk).update(**{counter: F(counter) - quantity})
+        setattr(event, counter, getattr(event, counter) - quantity)
+        return
+
+    # Satılan bilet hangi parçadan düştüğünü bilmez; sayacı yeterli herhangi bir parça olur
+    shards = InventoryShard.objects.filter(event_id=event.pk, **{f'{counter}__gte': quantity})
+    indexes = random.sample(range(event.inventory_shards), event.inventory_shards)
+    if 0 <= shard_index < event.inventory_shards:
+        indexes.remove(shard_index)
+        indexes.insert(0, shard_index)
+    for index in indexes:
+        if shards.filter(index=index).update(**{counter: F(counter) - quantity}):
+            return
+    _spread_decrement(event, quantity, counter)
+
+
+def convert_held(event, quantity, shard_index=-1):
+    """Rezerve edilen biletleri tek UPDATE ile satılmış sayısına aktarır"""
+    changes = {
+        'held_tickets': F('held_tickets') - quantity,
+        'sold_tickets': F('sold_tickets') + quantity,
+    }
+    if not event.inventory_shards:
+        Event.objects.filter(pk=event.pk).update(**changes)
+        event.held_tickets -= quantity
+        event.sold_tickets += quantity
+        publish_delta(event.pk, sold=quantity, held=-quantity)
+        return
+
+    if InventoryShard.objects.filter(
+        event_id=event.pk, index=shard_index, held_tickets__gte=quantity
+    ).update(**changes):
+        publish_delta(event.pk, sold=quantity, held=-quantity)
+        return
+    # Rezervasyon parçalama değişmeden önce alınmış; sayaçları ayrı ayrı taşı
+    give_back(event, quantity, 'held_tickets')
+    take(event, quantity, 'sold_tickets', check_availability=False)
+
+
+def _spread_decrement(event, quantity, counter):
+    # Nadir yol: hiçbir parça tek başına yetmiyor, azaltmayı parçalara yay
+    with transaction.atomic():
+        shards = InventoryShard.objects.select_for_update().filter(event_id=event.pk)
+        for shard in shards.order_by('-' + counter):
+            step = min(quantity, getattr(shard, counter))
+            setattr(shard, counter, getattr(shard, counter) - step)
+            shard.save(update_fields=[counter])
+            quantity -= step
+            if not quantity:
+                break
+
+
+def rebalance(event, target_index, quantity):
+    """Diğer parçaların boş kapasitesini hedef parçaya aktarır"""
+    with transaction.atomic():
+        shards = list(
+            InventoryShard.objects.select_for_update()
+            .filter(event_id=event.pk)
+            .order_by('index')
+        )
+        free = {shard.index: shard.free for shard in shards}
+        if target_index not in free or sum(free.values()) < quantity:
+            return False
+
+        target = next(shard for shard in shards if shard.index == target_index)
+        needed = quantity - free[target_index]
+        donors = sorted(
+            (shard for shard in shards if shard.index != target_index),
+            key=lambda shard: free[shard.index],
+            reverse=True,
+        )
+        changed = [target]
+        for donor in donors:
+            if needed <= 0:
+                break
+            moved = min(needed, free[donor.index])
+            if moved <= 0:
+                continue
+            donor.capacity -= moved
+            target.capacity += moved
+            needed -= moved
+            changed.append(donor)
+        InventoryShard.objects.bulk_update(changed, ['capacity'])
+        return True
+
+
+def totals(event):
+    """Etkinliğin (parçalar dahil) toplam satılan, ayrılan ve kalan bilet sayıları"""
+    if not event.inventory_shards:
+        return {
+            'sold_tickets': event.sold_tickets,
+            'held_tickets': event.held_tickets,
+            'remaining_tickets': event.available_tickets - event.sold_tickets - event.held_tickets,
+        }
+    shards = event.shards.all()
+    sold = sum(shard.sold_tickets for shard in shards)
+    held = sum(shard.held_tickets for shard in shards)
+    return {
+        'sold_tickets': sold,
+        'held_tickets': held,
+        'remaining_tickets': sum(shard.capacity for shard in shards) - sold - held,
+    }
+
+
+def configure_shards(event, shard_count, sold_tickets=None, held_tickets=None):
+    """
+    Etkinliğin stoğunu ``shard_count`` parçaya böler; 0 verilirse parçaları
+    tekrar Event satırında birleştirir. Satış öncesinde çalıştırılmalıdır.
+    ``sold_tickets``/``held_tickets`` verilirse mevcut sayaçların yerine
+    bu değerler dağıtılır (sayaç onarımı için).
+    """
+    with transaction.atomic():
+        event = Event.objects.select_for_update().get(pk=event.pk)
+        if event.inventory_shards:
+            collapsed = InventoryShard.objects.filter(event=event).aggregate(
+                sold=Sum('sold_tickets'),
+                held=Sum('held_tickets'),
+            )
+            event.sold_tickets = collapsed['sold'] or 0
+            event.held_tickets = collapsed['held'] or 0
+            InventoryShard.objects.filter(event=event).delete()
+        if sold_tickets is not None:
+            event.sold_tickets = sold_tickets
+        if held_tickets is not None:
+            event.held_tickets = held_tickets
+
+        event.inventory_shards = shard_count
+        if shard_count:
+            # Sayaçlar parçalara taşınır, Event satırındakiler sıfırlanır
+            InventoryShard.objects.bulk_create(_split(event, shard_count))
+        event.save(update_fields=['inventory_shards', 'sold_tickets', 'held_tickets'])
+        return event
+
+
+def _split(event, shard_count):
+    base, extra = divmod(event.available_tickets, shard_count)
+    shards = [
+        InventoryShard(event=event, index=index, capacity=base + (index < extra))
+        for index in range(shard_count)
+    ]
+    # Mevcut satış ve rezervasyonları parçaların kapasitesini aşmadan dağıt
+    for counter in COUNTERS:
+        left = getattr(event, counter)
+        for shard in shards:
+            step = min(left, shard.free)
+            setattr(shard, counter, getattr(shard, counter) + step)
+            left -= step
+        # Kapasiteyi aşan fazlalık (ör. stok azaltılmışsa) ilk parçada kalır
+        setattr(shards[0], counter, getattr(shards[0], counter) + left)
+        setattr(event, counter, 0)
+    return shards
@@ -0,0 +1,156 @@
+import asyncio
+import json
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from channels.layers import get_channel_layer
+
+from events.broadcast import Coalescer, _keys, group_name
+from events.consumers import EventConsumer
+
+IN_MEMORY_LAYER = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+# Veritabanında olmayan bir etkinlik; görüntü önbelleğe önceden yazılır
+EVENT_ID = '0'
+
+class Command(BaseCommand):
+    help = (
+        'Simulate many EventConsumer watchers on the in-memory channel layer during a '
+        'flash sale and measure inventory update fan-out with and without coalescing'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--watchers', type=int, default=500)
+        parser.add_argument('--slow-ratio', type=float, default=0.1,
+                            help='Share of watchers whose socket drains slowly')
+        parser.add_argument('--slow-delay', type=float, default=0.05,
+                            help='Seconds a slow watcher needs per frame')
+        parser.add_argument('--purchases', type=int, default=2000)
+        parser.add_argument('--duration', type=float, default=2.0,
+                            help='Seconds over which the purchases are spread')
+        parser.add_argument('--windows', default='0,0.1',
+                            help='Comma separated coalescing windows in seconds (0 = no coalescing)')
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'window s':>9} {'group msgs':>11} {'frames':>9} {'frames/s':>10} "
+            f"{'dropped':>8} {'slow frames':>12} {'stale':>6} {'seconds':>8}"
+        )
+        with override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYER):
+            for window in (float(value) for value in options['windows'].split(',')):
+                result = asyncio.run(self.run(window, options))
+                self.stdout.write(
+                    f"{window:>9.3f} {result['group_messages']:>11} {result['frames']:>9} "
+                    f"{result['frames'] / result['elapsed']:>10.0f} {result['dropped']:>8} "
+                    f"{result['slow_frames']:>12} {result['stale']:>6} {result['elapsed']:>8.2f}"
+                )
+        cache.delete_many(_keys(EVENT_ID))
+
+    async def run(self, window, options):
+        total = options['purchases']
+        # Bağlanan izleyiciler anlık görüntüyü önbellekten alır, veritabanına gidilmez
+        cache.set_many(dict(zip(_keys(EVENT_ID), (0, total))), None)
+        EventConsumer.snapshots.clear()
+        layer = get_channel_layer()
+        await layer.flush()
+
+        slow_count = int(options['watchers'] * options['slow_ratio'])
+        watchers = [
+            self.watcher(options['slow_delay'] if index < slow_count else 0)
+            for index in range(options['watchers'])
+        ]
+        for watcher in watchers:
+            await watcher['connected'].wait()
+
+        started = time.perf_counter()
+        group_messages = await self.sell(layer, window, total, options['duration'])
+        # Son kare her izleyiciye ulaşana kadar bekle
+        deadline = time.perf_counter() + 30
+        while any(w['last'] != 0 for w in watchers) and time.perf_counter() < deadline:
+            await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - started
+
+        for watcher in watchers:
+            await watcher['inbox'].put({'type': 'websocket.disconnect', 'code': 1000})
+        await asyncio.gather(*(watcher['task'] for watcher in watchers))
+        return {
+            'group_messages': group_messages,
+            'frames': sum(w['frames'] for w in watchers),
+            'slow_frames': sum(w['frames'] for w in watchers[:slow_count]),
+            'dropped': sum(w['consumer'].dropped_frames for w in watchers),
+            # Son sayıyı (0) almamış izleyiciler
+            'stale': sum(1 for w in watchers if w['last'] != 0),
+            'elapsed': elapsed,
+        }
+
+    async def sell(self, layer, window, total, duration):
+        coalescer = Coalescer()
+        sent = 0
+
+        async def send(message):
+            nonlocal sent
+            sent += 1
+            await layer.group_send(group_name(EVENT_ID), message)
+
+        batch = max(1, total // max(1, int(duration * 100)))
+        for sold in range(1, total + 1):
+            message = {
+                'type': 'ticket_purchased',
+                'ticket_count': sold,
+                'remaining_tickets': total - sold,
+                'quantity': 1,
+            }
+            if window <= 0:
+                await send(message)
+            else:
+                coalescer.add(EVENT_ID, message, window)
+                for _, due in coalescer.pop_due():
+                    await send(due)
+            if sold % batch == 0:
+                await asyncio.sleep(duration * batch / total)
+
+        # Son pencereyi de bekleyip gönder
+        if window > 0:
+            await asyncio.sleep(window)
+            for _, due in coalescer.pop_due(now=float('inf')):
+                await send(due)
+        return sent
+
+    def watcher(self, delay):
+        state = {
+            'inbox': asyncio.Queue(),
+            'connected': asyncio.Event(),
+            'frames': 0,
+            'last': None,
+        }
+        consumer = EventConsumer()
+        state['consumer'] = consumer
+        scope = {
+            'type': 'websocket',
+            'path': f'/ws/event/{EVENT_ID}/',
+            'headers': [],
+            'subprotocols': [],
+            'url_route': {'kwargs': {'event_id': EVENT_ID}},
+        }
+
+        async def receive():
+            return await state['inbox'].get()
+
+        async def send(message):
+            if message['type'] != 'websocket.send':
+                return
+            frame = json.loads(message['text'])
+            state['last'] = frame['remaining_tickets']
+            if not state['connected'].is_set():
+                # İlk kare bağlantıdaki anlık görüntüdür
+                state['connected'].set()
+                return
+            state['frames'] += 1
+            if delay:
+                # Yavaş istemci: soket yazması beklenir
+                await asyncio.sleep(delay)
+
+        state['inbox'].put_nowait({'type': 'websocket.connect'})
+        state['task'] = asyncio.ensure_future(consumer(scope, receive, send))
+        return state
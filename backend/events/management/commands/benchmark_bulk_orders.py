@@ -0,0 +1,71 @@
+import time
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from events.models import Category, Event
+from events.reservations import purchase_order, purchase_tickets
+
+class Command(BaseCommand):
+    help = (
+        'Measure tickets/second for group orders: one purchase per seat versus a single '
+        'bulk order (bulk_create, inventory adjusted once). Data is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--order-size', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        size, repeat = options['order_size'], options['repeat']
+        self.stdout.write(
+            f"{'strategy':>10} {'order size':>11} {'ms/order':>10} {'tickets/s':>10} {'queries/order':>14}"
+        )
+        with transaction.atomic():
+            event, user = self.seed(size * repeat * 2)
+            for name, order in (
+                ('per-seat', lambda: [purchase_tickets(event, user, 1) for _ in range(size)]),
+                ('bulk', lambda: purchase_order(event, user, size)),
+            ):
+                elapsed, queries = self.measure(order, repeat)
+                self.stdout.write(
+                    f'{name:>10} {size:>11} {elapsed / repeat * 1000:>10.1f} '
+                    f'{size * repeat / elapsed:>10.0f} {queries / repeat:>14.0f}'
+                )
+            # Veritabanı benchmark'tan önceki haline döner
+            transaction.set_rollback(True)
+
+    def measure(self, order, repeat):
+        # Sorgu günlüğü 9000 kayıtla sınırlı olduğu için sayaç ile sayılır
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            started = time.perf_counter()
+            for _ in range(repeat):
+                order()
+            elapsed = time.perf_counter() - started
+        return elapsed, queries
+
+    def seed(self, capacity):
+        category = Category.objects.create(name='Benchmark', slug='benchmark-bulk-orders')
+        event = Event.objects.create(
+            title='Benchmark Event',
+            slug='benchmark-bulk-orders',
+            description='Benchmark',
+            date=date.today(),
+            time='20:00:00',
+            location='Benchmark Arena',
+            category=category,
+            price=Decimal('100.00'),
+            available_tickets=capacity,
+        )
+        user = User.objects.create_user(username='benchmark-bulk-orders')
+        return event, user
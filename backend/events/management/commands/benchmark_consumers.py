@@ -0,0 +1,148 @@
+import asyncio
+import json
+import time
+from datetime import date
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from channels.db import database_sync_to_async
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from events.broadcast import _keys
+from events.consumers import EventConsumer
+from events.inventory import totals
+from events.models import Category, Event
+
+IN_MEMORY_LAYER = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+class LegacyEventConsumer(EventConsumer):
+    """Karşılaştırma için önceki uygulama: her okuma ayrı thread geçişi ve ayrı ``get``"""
+
+    async def send_ticket_count(self):
+        ticket_count = await self.get_ticket_count()
+        remaining_tickets = await self.get_remaining_tickets()
+        await self.send(text_data=json.dumps({
+            'type': 'ticket_count',
+            'ticket_count': ticket_count,
+            'remaining_tickets': remaining_tickets
+        }))
+
+    async def send_event_info(self):
+        event_info = await self.get_event_info()
+        await self.send(text_data=json.dumps({
+            'type': 'event_info',
+            'event': event_info
+        }))
+
+    @database_sync_to_async
+    def get_ticket_count(self):
+        event = Event.objects.get(id=self.event_id)
+        return totals(event)['sold_tickets']
+
+    @database_sync_to_async
+    def get_remaining_tickets(self):
+        return Event.objects.get(id=self.event_id).remaining_tickets
+
+    @database_sync_to_async
+    def get_event_info(self):
+        event = Event.objects.get(id=self.event_id)
+        return {
+            'id': event.id,
+            'title': event.title,
+            'price': float(event.price),
+            'available_tickets': event.available_tickets,
+            'remaining_tickets': event.remaining_tickets
+        }
+
+class Command(BaseCommand):
+    help = (
+        'Measure EventConsumer connect latency (connect, ticket count, join_event) and '
+        'connections per second for one worker, before and after the async ORM rewrite. '
+        'Every connection targets a different event with a cold snapshot cache.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=50)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'consumer':>10} {'p50 ms':>8} {'p95 ms':>8} {'conn/s':>8} {'queries/conn':>13}"
+        )
+        # database_sync_to_async işlem içindeki bağlantıyı kapattığı için veriler
+        # commit edilir ve sonunda silinir
+        category = Category.objects.create(name='Benchmark', slug='benchmark-consumers')
+        event_ids = []
+        try:
+            event_ids = self.seed(category, options['connections'])
+            with override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYER):
+                for name, consumer in (('before', LegacyEventConsumer), ('after', EventConsumer)):
+                    self.measure(name, consumer, event_ids, options['concurrency'])
+        finally:
+            category.delete()
+            cache.delete_many([key for event_id in event_ids for key in _keys(event_id)])
+
+    def measure(self, name, consumer, event_ids, concurrency):
+        cache.delete_many([key for event_id in event_ids for key in _keys(event_id)])
+        EventConsumer.snapshots.clear()
+        with CaptureQueriesContext(connection) as queries:
+            latencies, elapsed = async_to_sync(self.storm)(consumer, event_ids, concurrency)
+        latencies.sort()
+        self.stdout.write(
+            f'{name:>10} {latencies[len(latencies) // 2]:>8.2f} '
+            f'{latencies[int(len(latencies) * 0.95)]:>8.2f} '
+            f'{len(latencies) / elapsed:>8.0f} '
+            f'{len(queries.captured_queries) / len(latencies):>13.1f}'
+        )
+
+    def seed(self, category, count):
+        Event.objects.bulk_create(
+            Event(
+                title=f'Benchmark Event {i}',
+                slug=f'benchmark-consumers-{i}',
+                description='Benchmark',
+                date=date.today(),
+                time='20:00:00',
+                location='Benchmark Arena',
+                category=category,
+                price=Decimal('100.00'),
+                available_tickets=1000,
+            )
+            for i in range(count)
+        )
+        return [str(pk) for pk in Event.objects.filter(category=category).values_list('id', flat=True)]
+
+    async def storm(self, consumer, event_ids, concurrency):
+        limit = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def client(event_id):
+            async with limit:
+                scope = {
+                    'type': 'websocket',
+                    'path': f'/ws/event/{event_id}/',
+                    'headers': [],
+                    'subprotocols': [],
+                    'url_route': {'kwargs': {'event_id': event_id}},
+                }
+                started = time.perf_counter()
+                communicator = ApplicationCommunicator(consumer.as_asgi(), scope)
+                await communicator.send_input({'type': 'websocket.connect'})
+                await communicator.receive_output()  # accept
+                await communicator.receive_output()  # ticket_count
+                await communicator.send_input({
+                    'type': 'websocket.receive',
+                    'text': json.dumps({'type': 'join_event'}),
+                })
+                await communicator.receive_output()  # event_info
+                latencies.append((time.perf_counter() - started) * 1000)
+                await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+                await communicator.wait()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client(event_id) for event_id in event_ids))
+        return latencies, time.perf_counter() - started
@@ -0,0 +1,313 @@
+import asyncio
+import json
+import math
+import queue
+import random
+import subprocess
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from events.consumers import EventConsumer
+from events.models import Category, Event
+from events.reservations import purchase_order
+
+IN_MEMORY_LAYER = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+SCENARIOS = ('list', 'search', 'purchase', 'cancel', 'admin_stats', 'ws_connect')
+SLUG = 'benchmark-load'
+WORDS = ['rock', 'jazz', 'konser', 'festival', 'tiyatro', 'futbol', 'basketbol', 'konferans', 'opera', 'stand-up']
+CITIES = ['Istanbul', 'Ankara', 'Izmir', 'Bursa', 'Antalya']
+
+class Command(BaseCommand):
+    help = (
+        'Load-test the browse and purchase paths: seeds a scaled dataset, drives event listing, '
+        'search, ticket purchase, cancellation, admin stats and WebSocket connect with N '
+        'concurrent clients and reports p50/p95/p99 latency, queries per request and '
+        'throughput. --output writes the results as JSON, --compare diffs against a previous '
+        'run. Seeded rows are committed (clients use their own connections) and deleted at the '
+        'end. On SQLite writers are serialized, so purchase/cancel numbers measure lock waits.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=2000)
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--requests', type=int, default=500, help='Requests per scenario')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                            help='Comma separated subset of: ' + ', '.join(SCENARIOS))
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for request parameters')
+        parser.add_argument('--output', help='Write results to this JSON file')
+        parser.add_argument('--compare', help='Baseline JSON file from a previous run')
+
+    def handle(self, *args, **options):
+        scenarios = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as fp:
+                baseline = json.load(fp)
+
+        self.random = random.Random(options['seed'])
+        self.requests, self.concurrency = options['requests'], options['concurrency']
+        self.cleanup()
+        results = {}
+        try:
+            with override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYER):
+                self.seed(options['events'], options['users'], self.requests if 'cancel' in scenarios else 0)
+                self.stdout.write(
+                    f"{'scenario':>12} {'requests':>9} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} "
+                    f"{'p99 ms':>8} {'req/s':>8} {'queries/req':>12}"
+                )
+                for name in scenarios:
+                    results[name] = getattr(self, f'run_{name}')()
+                    self.report(name, results[name])
+        finally:
+            self.cleanup()
+
+        if options['output']:
+            with open(options['output'], 'w') as fp:
+                json.dump(self.document(options, results), fp, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+        if baseline is not None:
+            self.compare(baseline, results)
+
+    # Veri
+
+    def seed(self, events, users, cancellations):
+        self.category = Category.objects.create(name='Benchmark Load', slug=SLUG)
+        start = date.today()
+        Event.objects.bulk_create(
+            (
+                Event(
+                    title=f'{WORDS[i % len(WORDS)].title()} {WORDS[i * 7 % len(WORDS)]} {i}',
+                    slug=f'{SLUG}-{i}',
+                    description=f'{WORDS[i * 3 % len(WORDS)]} etkinliği',
+                    date=start + timedelta(days=i % 365),
+                    time='20:00:00',
+                    location=f'{CITIES[i % len(CITIES)]} Arena',
+                    category=self.category,
+                    price=Decimal('100.00'),
+                    available_tickets=1_000_000,
+                )
+                for i in range(events)
+            ),
+            batch_size=500,
+        )
+        self.event_ids = list(Event.objects.filter(category=self.category).values_list('id', flat=True))
+        User.objects.bulk_create(
+            (User(username=f'{SLUG}-{i}') for i in range(users)),
+            batch_size=500,
+        )
+        self.users = list(User.objects.filter(username__startswith=f'{SLUG}-'))
+        self.staff = User.objects.create_user(username=f'{SLUG}-staff', is_staff=True)
+
+        # İptal senaryosu için her kullanıcıya dağıtılmış aktif biletler
+        self.cancellable = []
+        event = Event.objects.get(pk=self.event_ids[0])
+        per_user = math.ceil(cancellations / len(self.users)) if cancellations else 0
+        for user in self.users:
+            if len(self.cancellable) >= cancellations:
+                break
+            _, tickets = purchase_order(event, user, per_user)
+            self.cancellable.extend((ticket.pk, user) for ticket in tickets)
+
+    def cleanup(self):
+        # Önceki yarıda kalmış çalışmalardan kalanlar da silinir
+        Category.objects.filter(slug=SLUG).delete()
+        User.objects.filter(username__startswith=f'{SLUG}-').delete()
+
+    # Senaryolar
+
+    def run_list(self):
+        pages = max(1, len(self.event_ids) // 20)
+        return self.drive(lambda i: ('get', '/api/', {'page': self.random.randint(1, pages)}, None))
+
+    def run_search(self):
+        return self.drive(lambda i: (
+            'get', '/api/', {'search': self.random.choice(WORDS + CITIES)[:self.random.randint(3, 6)]}, None
+        ))
+
+    def run_purchase(self):
+        return self.drive(lambda i: (
+            'post', '/api/tickets/',
+            {'event': self.random.choice(self.event_ids), 'quantity': 1},
+            self.random.choice(self.users),
+        ))
+
+    def run_cancel(self):
+        tickets = list(self.cancellable)
+        return self.drive(lambda i: (
+            'post', f'/api/tickets/{tickets[i][0]}/cancel/', None, tickets[i][1]
+        ), count=min(self.requests, len(tickets)))
+
+    def run_admin_stats(self):
+        return self.drive(lambda i: ('get', '/api/admin/stats/', None, self.staff))
+
+    def drive(self, make_request, count=None):
+        """İstekleri ``concurrency`` thread ile gönderir; her thread kendi bağlantısını kullanır"""
+        count = self.requests if count is None else count
+        jobs = queue.SimpleQueue()
+        for i in range(count):
+            # Parametreler önceden üretilir; aynı tohumla aynı istek dizisi
+            jobs.put(make_request(i))
+        samples, lock = [], threading.Lock()
+
+        def client():
+            api = APIClient(HTTP_HOST='localhost')
+            queries = 0
+
+            def count_query(execute, sql, params, many, context):
+                nonlocal queries
+                queries += 1
+                return execute(sql, params, many, context)
+
+            try:
+                with connection.execute_wrapper(count_query):
+                    while True:
+                        try:
+                            method, path, data, user = jobs.get_nowait()
+                        except queue.Empty:
+                            return
+                        api.force_authenticate(user)
+                        before = queries
+                        started = time.perf_counter()
+                        try:
+                            if method == 'post':
+                                response = api.post(path, data, format='json')
+                            else:
+                                response = api.get(path, data)
+                            ok = response.status_code < 400
+                        except OperationalError:
+                            # SQLite yazma kilidi zaman aşımı
+                            ok = False
+                        elapsed = (time.perf_counter() - started) * 1000
+                        with lock:
+                            samples.append((elapsed, ok, queries - before))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=client) for _ in range(self.concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.summarize(samples, time.perf_counter() - started)
+
+    def run_ws_connect(self):
+        event_ids = [str(self.random.choice(self.event_ids)) for _ in range(self.requests)]
+        samples = []
+        queries = 0
+
+        def count_query(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        async def storm():
+            limit = asyncio.Semaphore(self.concurrency)
+
+            async def client(event_id):
+                async with limit:
+                    scope = {
+                        'type': 'websocket',
+                        'path': f'/ws/event/{event_id}/',
+                        'headers': [],
+                        'subprotocols': [],
+                        'url_route': {'kwargs': {'event_id': event_id}},
+                    }
+                    before = queries
+                    started = time.perf_counter()
+                    communicator = ApplicationCommunicator(EventConsumer.as_asgi(), scope)
+                    await communicator.send_input({'type': 'websocket.connect'})
+                    accepted = (await communicator.receive_output())['type'] == 'websocket.accept'
+                    await communicator.receive_output()  # ticket_count
+                    samples.append(((time.perf_counter() - started) * 1000, accepted, queries - before))
+                    await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+                    await communicator.wait()
+
+            started = time.perf_counter()
+            await asyncio.gather(*(client(event_id) for event_id in event_ids))
+            return time.perf_counter() - started
+
+        # Async ORM sorguları bu thread'in bağlantısında çalışır (thread_sensitive)
+        with connection.execute_wrapper(count_query):
+            elapsed = async_to_sync(storm)()
+        return self.summarize(samples, elapsed)
+
+    # Sonuçlar
+
+    def summarize(self, samples, elapsed):
+        latencies = sorted(latency for latency, _, _ in samples)
+        return {
+            'requests': len(samples),
+            'errors': sum(1 for _, ok, _ in samples if not ok),
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'p99_ms': round(percentile(latencies, 99), 3),
+            'throughput_rps': round(len(samples) / elapsed, 1) if elapsed else 0.0,
+            'queries_per_request': round(sum(q for _, _, q in samples) / len(samples), 2) if samples else 0.0,
+        }
+
+    def report(self, name, result):
+        self.stdout.write(
+            f"{name:>12} {result['requests']:>9} {result['errors']:>7} {result['p50_ms']:>8.2f} "
+            f"{result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f} {result['throughput_rps']:>8.0f} "
+            f"{result['queries_per_request']:>12.2f}"
+        )
+
+    def document(self, options, results):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            'commit': commit,
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'options': {
+                key: options[key]
+                for key in ('events', 'users', 'requests', 'concurrency', 'scenarios', 'seed')
+            },
+            'results': results,
+        }
+
+    def compare(self, baseline, results):
+        self.stdout.write(f"Compared with {baseline.get('commit') or 'baseline'}:")
+        self.stdout.write(f"{'scenario':>12} {'p95 change':>11} {'req/s change':>13} {'queries change':>15}")
+        for name, result in results.items():
+            before = baseline.get('results', {}).get(name)
+            if before is None:
+                continue
+            self.stdout.write(
+                f"{name:>12} {change(before['p95_ms'], result['p95_ms']):>11} "
+                f"{change(before['throughput_rps'], result['throughput_rps']):>13} "
+                f"{change(before['queries_per_request'], result['queries_per_request']):>15}"
+            )
+
+
+def percentile(values, p):
+    """Sıralı listede en yakın sıra yöntemiyle yüzdelik"""
+    if not values:
+        return 0.0
+    return values[max(0, min(len(values) - 1, math.ceil(p / 100 * len(values)) - 1))]
+
+
+def change(before, after):
+    if not before:
+        return 'n/a'
+    return f'{(after - before) / before * 100:+.1f}%'
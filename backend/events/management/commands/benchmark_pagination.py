@@ -0,0 +1,94 @@
+import time
+from urllib.parse import parse_qs, urlparse
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIRequestFactory
+
+from events.models import Category, Event
+from events.views import EventViewSet
+
+class Command(BaseCommand):
+    help = (
+        'Compare page-number and keyset pagination latency at increasing page depths '
+        'on a temporary event dataset (rolled back afterwards)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=20000)
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--depths', default='1,10,100,500',
+                            help='Comma separated page numbers to measure')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        depths = sorted(int(depth) for depth in options['depths'].split(','))
+        page_size = options['page_size']
+        needed = depths[-1] * page_size
+        if options['events'] < needed:
+            options['events'] = needed
+
+        with transaction.atomic():
+            self.seed(options['events'])
+            # Yanıt önbelleği ölçümü bozmasın; her istek veritabanına gider
+            self.view = EventViewSet.as_view({'get': 'list'}, use_response_cache=False)
+            self.factory = APIRequestFactory(HTTP_HOST='localhost')
+
+            cursors = self.collect_cursors(depths, page_size)
+            self.stdout.write(f"{'page':>6} {'page-number ms':>16} {'keyset ms':>12}")
+            for depth in depths:
+                offset_ms = self.measure({'page': depth, 'page_size': page_size}, options['repeat'])
+                params = {'pagination': 'cursor', 'page_size': page_size}
+                if cursors[depth]:
+                    params['cursor'] = cursors[depth]
+                keyset_ms = self.measure(params, options['repeat'])
+                self.stdout.write(f'{depth:>6} {offset_ms:>16.2f} {keyset_ms:>12.2f}')
+
+            # Veritabanı benchmark'tan önceki haline döner
+            transaction.set_rollback(True)
+
+    def seed(self, count):
+        category = Category.objects.create(name='Benchmark', slug='benchmark-pagination')
+        start = date.today()
+        Event.objects.bulk_create(
+            (
+                Event(
+                    title=f'Benchmark Event {i}',
+                    slug=f'benchmark-pagination-{i}',
+                    description='Benchmark',
+                    date=start + timedelta(days=i % 365),
+                    time='20:00:00',
+                    location='Benchmark Arena',
+                    category=category,
+                    price=Decimal('100.00'),
+                    available_tickets=1000,
+                )
+                for i in range(count)
+            ),
+            batch_size=1000,
+        )
+
+    def request(self, params):
+        response = self.view(self.factory.get('/api/', params))
+        response.render()
+        return response
+
+    def collect_cursors(self, depths, page_size):
+        # Keyset modunda N. sayfaya ulaşmak için önceki sayfaların cursor'ı izlenir
+        cursors = {1: None}
+        params = {'pagination': 'cursor', 'page_size': page_size}
+        for page in range(2, depths[-1] + 1):
+            next_link = self.request(params).data['next']
+            params['cursor'] = parse_qs(urlparse(next_link).query)['cursor'][0]
+            cursors[page] = params['cursor']
+        return cursors
+
+    def measure(self, params, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            self.request(params)
+            timings.append((time.perf_counter() - started) * 1000)
+        return sorted(timings)[len(timings) // 2]
@@ -0,0 +1,127 @@
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from events.fast_serializers import compile_serializer
+from events.inventory import configure_shards
+from events.models import Category, Event, Ticket
+from events.serializers import CategorySerializer, EventListSerializer, TicketSerializer
+
+class Command(BaseCommand):
+    help = (
+        'Compare ModelSerializer and the compiled values() row mapper on list pages on a '
+        'temporary dataset (rolled back afterwards): end to end (fetch + serialize + JSON '
+        'render) and serialization only (rows already loaded). Both outputs are rendered '
+        'and compared byte for byte.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=2000)
+        parser.add_argument('--page-sizes', default='10,100,1000',
+                            help='Comma separated row counts to measure')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options['page_sizes'].split(','))
+        renderer = JSONRenderer()
+
+        with transaction.atomic():
+            self.seed(max(options['events'], sizes[-1]))
+            targets = [
+                ('categories', CategorySerializer, Category.objects.filter(slug__startswith='benchmark-serializers')),
+                ('events', EventListSerializer, Event.objects.for_listing().filter(slug__startswith='benchmark-serializers')),
+                ('tickets', TicketSerializer, Ticket.objects.filter(user=self.user).select_related(
+                    'event__category').prefetch_related('event__shards')),
+            ]
+            self.stdout.write(
+                f"{'list':>10} {'rows':>6} {'serializer ms':>14} {'compiled ms':>12} {'speedup':>8} "
+                f"{'serialize-only ms':>18} {'speedup':>8}"
+            )
+            for name, serializer_class, queryset in targets:
+                mapper = compile_serializer(serializer_class)
+                queryset = queryset.order_by('-id')
+                for size in sizes:
+                    page = queryset[:size]
+
+                    def reference():
+                        return renderer.render(serializer_class(page, many=True).data)
+
+                    def compiled():
+                        return renderer.render(mapper.map(mapper.values(queryset)[:size]))
+
+                    if reference() != compiled():
+                        raise CommandError(f'{name}: compiled output differs from {serializer_class.__name__}')
+                    reference_ms = self.measure(reference, options['repeat'])
+                    compiled_ms = self.measure(compiled, options['repeat'])
+
+                    # Sorgu dışarıda: yalnızca satırların çıktıya çevrilmesi
+                    objects = list(page)
+                    rows = list(mapper.values(queryset)[:size])
+                    serialize_ms = self.measure(
+                        lambda: serializer_class(objects, many=True).data, options['repeat']
+                    )
+                    map_ms = self.measure(lambda: mapper.map(rows), options['repeat'])
+                    self.stdout.write(
+                        f'{name:>10} {len(rows):>6} {reference_ms:>14.2f} {compiled_ms:>12.2f} '
+                        f'{reference_ms / compiled_ms:>7.1f}x '
+                        f'{f"{serialize_ms:.2f} / {map_ms:.2f}":>18} {serialize_ms / map_ms:>7.1f}x'
+                    )
+                    if len(rows) < size:
+                        break
+
+            # Veritabanı benchmark'tan önceki haline döner
+            transaction.set_rollback(True)
+
+    def seed(self, count):
+        categories = [
+            Category.objects.create(name=f'Benchmark Serializers {i}', slug=f'benchmark-serializers-{i}')
+            for i in range(20)
+        ]
+        start = date.today()
+        events = Event.objects.bulk_create(
+            (
+                Event(
+                    title=f'Benchmark Event {i}',
+                    slug=f'benchmark-serializers-{i}',
+                    description='Benchmark',
+                    date=start + timedelta(days=i % 365),
+                    time='20:00:00',
+                    location='Benchmark Arena',
+                    category=categories[i % len(categories)],
+                    price=Decimal('100.00'),
+                    available_tickets=1000,
+                )
+                for i in range(count)
+            ),
+            batch_size=1000,
+        )
+        # Parçalı stoklu etkinlikler de ölçülsün
+        for event in events[::50]:
+            configure_shards(event, 4)
+
+        self.user = User.objects.create_user(username='benchmark-serializers')
+        Ticket.objects.bulk_create(
+            (
+                Ticket(
+                    event=event,
+                    user=self.user,
+                    quantity=1,
+                    total_price=event.price,
+                )
+                for event in events
+            ),
+            batch_size=1000,
+        )
+
+    def measure(self, render, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            render()
+            timings.append((time.perf_counter() - started) * 1000)
+        return sorted(timings)[len(timings) // 2]
@@ -0,0 +1,142 @@
+import re
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from events.admin_views import AdminDashboardViewSet
+from events.inventory import totals
+from events.models import Category, Event
+from events.reservations import InsufficientTickets, purchase_tickets
+from events.dashboard import compute_stats
+from events.views import EventViewSet, TicketViewSet
+
+# Tablonun tamamını okuyan plan satırları (indeks taramaları hariç)
+SEQ_SCAN_PATTERNS = {
+    'sqlite': re.compile(r'^SCAN (?:TABLE )?(\w+)$'),
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+}
+EXPLAIN_PREFIX = {
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'postgresql': 'EXPLAIN ',
+}
+EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE', 'INSERT', 'WITH')
+
+class Command(BaseCommand):
+    help = (
+        'Run the canonical API, consumer and admin queries, EXPLAIN each of them and '
+        'flag sequential scans. Run against a production-sized copy: planners prefer '
+        'full scans on tiny tables. Changes made while capturing are rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ignore', default='events_category,django_migrations',
+                            help='Comma separated tables whose full scans are expected')
+        parser.add_argument('--verbose-plans', action='store_true',
+                            help='Print the full plan of every query')
+        parser.add_argument('--fail', action='store_true',
+                            help='Exit with an error if any sequential scan is found')
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        if vendor not in SEQ_SCAN_PATTERNS:
+            raise CommandError(f'EXPLAIN parsing is not supported on {vendor}')
+        ignored = {table for table in options['ignore'].split(',') if table}
+
+        flagged = 0
+        for name, scenario, expected in self.scenarios():
+            for sql in self.capture(scenario):
+                plan = self.explain(sql)
+                scans = {
+                    match.group(1)
+                    for line in plan
+                    for match in [SEQ_SCAN_PATTERNS[vendor].search(line.strip())]
+                    if match and match.group(1) not in ignored | expected
+                }
+                if scans:
+                    flagged += 1
+                    self.stdout.write(self.style.WARNING(
+                        f"[{name}] sequential scan on {', '.join(sorted(scans))}"
+                    ))
+                    self.stdout.write(f'    {sql[:300]}')
+                if scans or options['verbose_plans']:
+                    for line in plan:
+                        self.stdout.write(f'      {line}')
+
+        if flagged and options['fail']:
+            raise CommandError(f'{flagged} queries use sequential scans')
+        self.stdout.write(self.style.SUCCESS(f'{flagged} queries flagged'))
+
+    def scenarios(self):
+        host = next(
+            (host for host in settings.ALLOWED_HOSTS if '*' not in host and not host.startswith('.')),
+            'localhost'
+        )
+        factory = APIRequestFactory(HTTP_HOST=host)
+        event = Event.objects.filter(is_active=True).order_by('-id').first()
+        category_id = Category.objects.values_list('id', flat=True).first() or 0
+        user = User.objects.order_by('id').first() or User(pk=0, username='explain')
+        # Yetki kontrolünü geçmek için kaydedilmeyen bir yönetici kopyası
+        admin = User(pk=user.pk, username=user.username, is_staff=True, is_superuser=True)
+
+        def api(viewset, action, params=None, as_user=None):
+            def run():
+                request = factory.get('/api/', params or {})
+                if as_user is not None:
+                    force_authenticate(request, user=as_user)
+                # Önbellekten dönen yanıt sorgu çalıştırmaz; her zaman veritabanına gidilir
+                initkwargs = {'use_response_cache': False} if hasattr(viewset, 'use_response_cache') else {}
+                viewset.as_view({'get': action}, **initkwargs)(request).render()
+            return run
+
+        # Üçüncü eleman: tasarım gereği tamamı okunan tablolar (genel toplamlar,
+        # tüm kullanıcılar üzerinde hesaplanan sıralamalar). Bunlar işaretlenmez.
+        summaries = {'events_event', 'events_dailysalesrollup'}
+        yield 'events.list', api(EventViewSet, 'list'), set()
+        yield 'events.list_cursor', api(EventViewSet, 'list', {'pagination': 'cursor'}), set()
+        yield 'events.by_category', api(EventViewSet, 'list', {'category': category_id}), set()
+        yield 'events.search', api(EventViewSet, 'list', {'search': 'konser'}), set()
+        yield 'tickets.list', api(TicketViewSet, 'list', as_user=admin), set()
+        yield 'admin.stats', api(AdminDashboardViewSet, 'stats', as_user=admin), summaries
+        yield 'admin.events', api(AdminDashboardViewSet, 'events_management', as_user=admin), set()
+        yield 'admin.users', api(
+            AdminDashboardViewSet, 'users_management', as_user=admin
+        ), {'auth_user'}
+        yield 'admin.users_by_spend', api(
+            AdminDashboardViewSet, 'users_management', {'ordering': '-total_spent'}, as_user=admin
+        ), {'auth_user'}
+        yield 'admin.tickets', api(AdminDashboardViewSet, 'tickets_management', as_user=admin), set()
+        yield 'consumers.dashboard', compute_stats, summaries
+        if event is not None:
+            yield 'consumers.ticket_count', lambda: totals(Event.objects.get(pk=event.pk)), set()
+            if user.pk:
+                yield 'tickets.purchase', lambda: self.purchase(event, user), set()
+
+    def purchase(self, event, user):
+        try:
+            purchase_tickets(event, user, 1)
+        except InsufficientTickets:
+            pass
+
+    def capture(self, scenario):
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                scenario()
+            transaction.set_rollback(True)
+        seen = set()
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith(EXPLAINABLE) or sql in seen:
+                continue
+            seen.add(sql)
+            yield sql
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(EXPLAIN_PREFIX[connection.vendor] + sql)
+            rows = cursor.fetchall()
+        # SQLite: (id, parent, notused, detail); PostgreSQL: (plan satırı,)
+        return [str(row[-1]) for row in rows]
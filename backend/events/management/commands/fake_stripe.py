@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from events.fake_stripe import FakeStripe
+
+class Command(BaseCommand):
+    help = (
+        'Run an in-memory fake of the Stripe API for local development and load tests. '
+        'Point STRIPE_API_BASE at the printed URL.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=12111)
+        parser.add_argument('--latency', type=float, default=0,
+                            help='Seconds added to every response to mimic gateway latency')
+
+    def handle(self, *args, **options):
+        fake = FakeStripe(options['host'], options['port'], latency=options['latency'])
+        self.stdout.write(self.style.SUCCESS(f'Fake Stripe API listening on {fake.url}'))
+        with fake:
+            try:
+                while True:
+                    time.sleep(3600)
+            except KeyboardInterrupt:
+                pass
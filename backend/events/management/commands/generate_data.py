@@ -0,0 +1,311 @@
+import itertools
+import random
+import time
+import uuid
+from array import array
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from events.caching import bump
+from events.models import Category, Event, Ticket
+
+CATEGORY_NAMES = [
+    'Müzik', 'Spor', 'Tiyatro', 'Teknoloji', 'Eğitim', 'Festival',
+    'Sergi', 'Çocuk', 'Stand-up', 'Opera', 'Dans', 'Sinema',
+]
+TITLE_WORDS = [
+    'Rock', 'Jazz', 'Klasik', 'Pop', 'Elektronik', 'Derbi', 'Final', 'Gala',
+    'Konser', 'Festival', 'Gösteri', 'Konferans', 'Atölye', 'Turnuva', 'Gece', 'Buluşma',
+]
+CITIES = ['Istanbul', 'Ankara', 'Izmir', 'Bursa', 'Antalya', 'Eskişehir', 'Trabzon', 'Gaziantep']
+VENUES = ['Arena', 'Stadyumu', 'Kongre Merkezi', 'Sahnesi', 'Kültür Merkezi', 'Açıkhava']
+PRICES = [50, 75, 100, 150, 200, 250, 300, 400, 500, 750, 1000]
+# Bilet adedi dağılımı: çoğu tek, bir kısmı grup
+QUANTITIES, QUANTITY_WEIGHTS = [1, 2, 3, 4, 6], [70, 90, 96, 99, 100]
+SALE_WINDOW = timedelta(days=120)
+# Bilet tanımı tek baytta: adet ve iptal bayrağı
+CANCELLED = 0x80
+
+
+def power_law(n, exponent, rng):
+    """
+    ``n`` öğe için Zipf ağırlıklarının kümülatif listesi. Sıralar karıştırılır;
+    popüler öğeler id sırasına, tarihe ya da kategoriye göre kümelenmez.
+    """
+    ranks = list(range(1, n + 1))
+    rng.shuffle(ranks)
+    return list(itertools.accumulate(rank ** -exponent for rank in ranks))
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a production-scale synthetic dataset: categories, events, users and tickets '
+        'with power-law popularity (a few hot events, a few heavy buyers), group purchases, '
+        'cancellations and dates spread around --start-date. Rows are streamed through '
+        'bulk_create in batches; the same --seed, --prefix and --start-date produce the same data. '
+        'Event ticket counters and the daily sales rollup are consistent with the tickets.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=10000)
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--tickets', type=int, default=100000)
+        parser.add_argument('--categories', type=int, default=len(CATEGORY_NAMES))
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--start-date', help='Dates are spread around this day (YYYY-MM-DD, default today)')
+        parser.add_argument('--days', type=int, default=730, help='Event dates span this many days')
+        parser.add_argument('--event-skew', type=float, default=1.1,
+                            help='Zipf exponent of event popularity (0 = uniform)')
+        parser.add_argument('--user-skew', type=float, default=0.8,
+                            help='Zipf exponent of purchases per user (0 = uniform)')
+        parser.add_argument('--cancel-rate', type=float, default=0.05)
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk_create batch')
+        parser.add_argument('--commit-every', type=int, default=100000, help='Rows per transaction')
+        parser.add_argument('--prefix', default='gen', help='Prefix of generated slugs and usernames')
+        parser.add_argument('--flush', action='store_true',
+                            help='Delete data generated earlier with the same prefix first')
+        parser.add_argument('--skip-rollup', action='store_true',
+                            help='Do not rebuild DailySalesRollup afterwards')
+
+    def handle(self, *args, **options):
+        if min(options['events'], options['users'], options['categories']) < 1 or options['tickets'] < 0:
+            raise CommandError('--events, --users and --categories must be positive')
+        try:
+            start = (
+                datetime.strptime(options['start_date'], '%Y-%m-%d').date()
+                if options['start_date'] else date.today()
+            )
+        except ValueError:
+            raise CommandError('--start-date must be in YYYY-MM-DD format')
+
+        self.prefix = options['prefix']
+        self.verbosity = options['verbosity']
+        self.batch_size = options['batch_size']
+        self.commit_every = options['commit_every']
+        if options['flush']:
+            self.flush()
+        elif Category.objects.filter(slug__startswith=f'{self.prefix}-').exists():
+            raise CommandError(f"Data with prefix '{self.prefix}' exists; use --flush or another --prefix")
+
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                # Rastgele bilet numaralarının tekil indeksi varsayılan 2 MB sayfa önbelleğine sığmaz
+                cursor.execute('PRAGMA cache_size = -262144')
+        # Önek de tohuma katılır; farklı öneklerin bilet numaraları çakışmaz
+        self.rng = random.Random(f"{self.prefix}:{options['seed']}")
+        self.now = timezone.make_aware(datetime.combine(start, datetime.min.time())) + timedelta(hours=12)
+        started = time.perf_counter()
+
+        categories = self.create_categories(options['categories'])
+        user_ids = self.create_users(options['users'])
+        counts, specs = self.plan_tickets(options['events'], options['tickets'], options['event_skew'], options['cancel_rate'])
+        events = self.create_events(counts, specs, categories, start, options['days'])
+        created = self.create_tickets(events, counts, specs, user_ids, options['user_skew'])
+
+        if not options['skip_rollup']:
+            call_command('rebuild_sales_rollup', stdout=self.stdout)
+        bump('events', 'categories')
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {len(categories)} categories, {len(user_ids)} users, {len(events)} events '
+            f'and {created} tickets in {time.perf_counter() - started:.1f}s'
+        ))
+
+    def flush(self):
+        # Biletler tek DELETE ile silinir; ORM kaskadı milyonlarca satırı tek tek toplardı
+        events, params = Event.objects.filter(
+            category__slug__startswith=f'{self.prefix}-'
+        ).values('id').query.sql_with_params()
+        quote = connection.ops.quote_name
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {quote(Ticket._meta.db_table)} WHERE {quote('event_id')} IN ({events})",
+                params,
+            )
+            # Etkinlikler ve rollup'lar kategorilerle birlikte silinir
+            Category.objects.filter(slug__startswith=f'{self.prefix}-').delete()
+            User.objects.filter(username__startswith=f'{self.prefix}-').delete()
+
+    def progress(self, label, done, total):
+        if self.verbosity > 1:
+            self.stdout.write(f'{label}: {done}/{total}')
+
+    def create_categories(self, count):
+        Category.objects.bulk_create(
+            Category(
+                name=f'{CATEGORY_NAMES[i % len(CATEGORY_NAMES)]} ({self.prefix} {i + 1})',
+                slug=f'{self.prefix}-category-{i}',
+                description=f'{CATEGORY_NAMES[i % len(CATEGORY_NAMES)]} etkinlikleri',
+            )
+            for i in range(count)
+        )
+        return list(Category.objects.filter(slug__startswith=f'{self.prefix}-category-')
+                    .order_by('id').values_list('id', flat=True))
+
+    def create_users(self, count):
+        # Kullanılamaz parola ('!'); hash hesaplanmaz
+        users = (
+            User(
+                username=f'{self.prefix}-user-{i}',
+                email=f'{self.prefix}-user-{i}@example.com',
+                password='!',
+                date_joined=self.now - timedelta(days=self.rng.randrange(1000)),
+            )
+            for i in range(count)
+        )
+        self.insert(User, users, count, 'users')
+        return array('q', User.objects.filter(username__startswith=f'{self.prefix}-user-')
+                     .order_by('id').values_list('id', flat=True))
+
+    def plan_tickets(self, events, tickets, skew, cancel_rate):
+        """
+        Bilet başına yalnızca adet ve iptal bayrağı (1 bayt) tutulur; etkinliklerin
+        satış sayaçları bilet satırlarından önce bilinir.
+        """
+        rng = self.rng
+        popularity = power_law(events, skew, rng)
+        counts = array('l', [0]) * events
+        for chunk in batched(range(tickets), 100000):
+            for index in rng.choices(range(events), cum_weights=popularity, k=len(chunk)):
+                counts[index] += 1
+
+        specs = array('B', (
+            quantity | (CANCELLED if rng.random() < cancel_rate else 0)
+            for quantity in rng.choices(QUANTITIES, cum_weights=QUANTITY_WEIGHTS, k=tickets)
+        ))
+        return counts, specs
+
+    def create_events(self, counts, specs, categories, start, days):
+        rng = self.rng
+        first_day = start - timedelta(days=days // 2)
+        plan = []
+        offset = 0
+        for count in counts:
+            sold = sum(spec for spec in specs[offset:offset + count] if not spec & CANCELLED)
+            offset += count
+            plan.append(sold)
+
+        def build():
+            for i, sold in enumerate(plan):
+                word = rng.choice(TITLE_WORDS)
+                city = rng.choice(CITIES)
+                # Popüler etkinliklerin bir kısmı tükenir
+                capacity = max(sold, 50, int(sold * rng.uniform(0.9, 1.6)))
+                yield Event(
+                    title=f'{word} {rng.choice(TITLE_WORDS)} {i + 1}',
+                    slug=f'{self.prefix}-event-{i}',
+                    description=f'{city} {word.lower()} etkinliği',
+                    date=first_day + timedelta(days=rng.randrange(max(1, days))),
+                    time=f'{rng.randint(10, 22):02d}:{rng.choice((0, 30)):02d}:00',
+                    location=f'{city} {rng.choice(VENUES)}',
+                    category_id=rng.choice(categories),
+                    price=Decimal(rng.choice(PRICES)),
+                    available_tickets=capacity,
+                    sold_tickets=sold,
+                )
+
+        self.insert(Event, build(), len(plan), 'events')
+        return list(
+            Event.objects.filter(slug__startswith=f'{self.prefix}-event-')
+            .order_by('id').values_list('id', 'date', 'time', 'price')
+        )
+
+    def create_tickets(self, events, counts, specs, user_ids, skew):
+        rng = self.rng
+        buyers = power_law(len(user_ids), skew, rng)
+        ops = connection.ops
+        decimal_field = Ticket._meta.get_field('total_price')
+
+        def build():
+            offset = 0
+            for (event_id, event_date, event_time, price), count in zip(events, counts):
+                if not count:
+                    continue
+                starts_at = timezone.make_aware(datetime.combine(event_date, event_time))
+                sale_ends = min(starts_at, self.now)
+                past = starts_at < self.now
+                totals = {
+                    quantity: ops.adapt_decimalfield_value(
+                        price * quantity, decimal_field.max_digits, decimal_field.decimal_places
+                    )
+                    for quantity in QUANTITIES
+                }
+                for user_id, spec in zip(
+                    rng.choices(user_ids, cum_weights=buyers, k=count),
+                    specs[offset:offset + count],
+                ):
+                    quantity = spec & ~CANCELLED
+                    cancelled = bool(spec & CANCELLED)
+                    if cancelled:
+                        status = 'cancelled'
+                    elif past:
+                        status = 'used' if rng.random() < 0.9 else 'expired'
+                    else:
+                        status = 'active'
+                    yield (
+                        str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+                        event_id,
+                        user_id,
+                        # Satışlar etkinliğe yaklaştıkça yoğunlaşır
+                        ops.adapt_datetimefield_value(sale_ends - SALE_WINDOW * rng.random() ** 2),
+                        quantity,
+                        totals[quantity],
+                        status,
+                        cancelled,
+                    )
+                offset += count
+
+        fields = [
+            'ticket_number', 'event', 'user', 'purchase_date',
+            'quantity', 'total_price', 'status', 'is_cancelled',
+        ]
+        return self.insert_rows(Ticket, fields, build(), len(specs), 'tickets')
+
+    def insert(self, model, objects, total, label):
+        """Nesneleri belleğe toplamadan ``commit_every`` satırlık işlemlerle yazar"""
+        done = 0
+        for chunk in batched(objects, self.commit_every):
+            with transaction.atomic():
+                model.objects.bulk_create(chunk, batch_size=self.batch_size)
+            done += len(chunk)
+            self.progress(label, done, total)
+        return done
+
+    def insert_rows(self, model, fields, rows, total, label):
+        """
+        ``insert`` ile aynı, ancak değerleri veritabanına hazırlanmış demetler
+        olarak çok satırlı ``INSERT`` ile yazar. ``bulk_create`` satır ve alan
+        başına SQL derlediği için milyonlarca biletin süresini bu derleme belirler.
+        """
+        meta = model._meta
+        quote = connection.ops.quote_name
+        columns = [meta.get_field(name) for name in fields]
+        # Veritabanının parametre sınırı aşılmaz (SQLite'ta 999)
+        per_statement = min(self.batch_size, connection.ops.bulk_batch_size(columns, [None] * self.batch_size))
+        placeholders = '({})'.format(', '.join(['%s'] * len(fields)))
+        prefix = 'INSERT INTO {} ({}) VALUES '.format(
+            quote(meta.db_table), ', '.join(quote(field.column) for field in columns)
+        )
+        statements = {}
+        done = 0
+        for chunk in batched(rows, self.commit_every):
+            with transaction.atomic(), connection.cursor() as cursor:
+                for batch in batched(chunk, per_statement):
+                    sql = statements.get(len(batch))
+                    if sql is None:
+                        sql = statements[len(batch)] = prefix + ', '.join([placeholders] * len(batch))
+                    cursor.execute(sql, [value for row in batch for value in row])
+            done += len(chunk)
+            self.progress(label, done, total)
+        return done
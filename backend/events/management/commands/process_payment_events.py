@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+from events.payment_events import process_pending
+
+class Command(BaseCommand):
+    help = 'Process queued Stripe webhook events and issue tickets for completed payments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Process the events that are due now and exit')
+        parser.add_argument('--batch', type=int, default=100)
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Seconds to wait when the queue is empty')
+
+    def handle(self, *args, **options):
+        while True:
+            claimed, processed = process_pending(limit=options['batch'])
+            if claimed:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Processed {processed} of {claimed} payment event(s)'
+                ))
+            if options['once']:
+                return
+            # Dolu parti (başarısız ya da ertelenen olaylar dahil) arkasında iş olabilir
+            if claimed < options['batch']:
+                time.sleep(options['interval'])
@@ -0,0 +1,110 @@
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from events.models import DailySalesRollup, Ticket
+
+COUNTER_FIELDS = [
+    'tickets', 'quantity', 'revenue', 'cancellations', 'cancelled_quantity', 'cancelled_revenue',
+]
+
+class Command(BaseCommand):
+    help = 'Backfill DailySalesRollup from the ticket table, or compact its buckets'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            help='Only rebuild days on or after this date (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--compact',
+            action='store_true',
+            help='Merge per-day buckets into a single row instead of rescanning tickets',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = datetime.strptime(options['since'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--since must be in YYYY-MM-DD format')
+
+        if options['compact']:
+            merged = self.compact(since, options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Compacted {merged} event-day bucket group(s)'))
+        else:
+            created = self.backfill(since, options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt {created} rollup row(s)'))
+
+    def backfill(self, since, batch_size):
+        tickets = Ticket.objects.all()
+        rollups = DailySalesRollup.objects.all()
+        if since:
+            tickets = tickets.filter(
+                purchase_date__gte=timezone.make_aware(datetime.combine(since, time.min))
+            )
+            rollups = rollups.filter(day__gte=since)
+
+        cancelled = Q(is_cancelled=True)
+        rows = tickets.annotate(day=TruncDate('purchase_date')).order_by().values(
+            'event_id', 'event__category_id', 'day'
+        ).annotate(
+            tickets=Count('id'),
+            quantity_sum=Sum('quantity'),
+            revenue=Sum('total_price'),
+            cancellations=Count('id', filter=cancelled),
+            cancelled_quantity_sum=Sum('quantity', filter=cancelled),
+            cancelled_revenue=Sum('total_price', filter=cancelled),
+        )
+
+        with transaction.atomic():
+            rollups.delete()
+            created = DailySalesRollup.objects.bulk_create(
+                (
+                    DailySalesRollup(
+                        event_id=row['event_id'],
+                        category_id=row['event__category_id'],
+                        day=row['day'],
+                        tickets=row['tickets'],
+                        quantity=row['quantity_sum'] or 0,
+                        revenue=row['revenue'] or 0,
+                        cancellations=row['cancellations'],
+                        cancelled_quantity=row['cancelled_quantity_sum'] or 0,
+                        cancelled_revenue=row['cancelled_revenue'] or 0,
+                    )
+                    for row in rows.iterator(chunk_size=batch_size)
+                ),
+                batch_size=batch_size,
+            )
+        return len(created)
+
+    def compact(self, since, batch_size):
+        rollups = DailySalesRollup.objects.all()
+        if since:
+            rollups = rollups.filter(day__gte=since)
+
+        groups = rollups.order_by().values('event_id', 'day').annotate(
+            rows=Count('id')
+        ).filter(rows__gt=1)
+
+        merged = 0
+        for group in groups.iterator(chunk_size=batch_size):
+            with transaction.atomic():
+                # Kilitli satırlar birleştirilir; eşzamanlı satış artışları kaybolmaz
+                rows = list(
+                    DailySalesRollup.objects.select_for_update()
+                    .filter(event_id=group['event_id'], day=group['day'])
+                    .order_by('bucket')
+                )
+                keep, extra = rows[0], rows[1:]
+                for field in COUNTER_FIELDS:
+                    setattr(keep, field, sum(getattr(row, field) for row in rows))
+                keep.save(update_fields=COUNTER_FIELDS)
+                DailySalesRollup.objects.filter(pk__in=[row.pk for row in extra]).delete()
+            merged += 1
+        return merged
@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from events.inventory import configure_shards
+from events.models import Event, InventoryShard, Ticket, TicketHold
+
+def _sum_subquery(queryset, field):
+    totals = queryset.filter(event=OuterRef('pk')).order_by().values('event').annotate(
+        total=Sum(field)
+    ).values('total')
+    return Coalesce(Subquery(totals, output_field=IntegerField()), 0)
+
+class Command(BaseCommand):
+    help = 'Rebuild (or verify with --check) the denormalized ticket counters on events'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report drifted counters, do not modify them',
+        )
+
+    def handle(self, *args, **options):
+        events = Event.objects.annotate(
+            actual_sold=_sum_subquery(Ticket.objects.filter(is_cancelled=False), 'quantity'),
+            actual_held=_sum_subquery(TicketHold.objects.filter(status='active'), 'quantity'),
+            shard_sold=_sum_subquery(InventoryShard.objects.all(), 'sold_tickets'),
+            shard_held=_sum_subquery(InventoryShard.objects.all(), 'held_tickets'),
+        )
+
+        drifted = 0
+        for event in events.iterator():
+            if event.inventory_shards:
+                sold, held = event.shard_sold, event.shard_held
+            else:
+                sold, held = event.sold_tickets, event.held_tickets
+            if (sold, held) == (event.actual_sold, event.actual_held):
+                continue
+            drifted += 1
+            self.stdout.write(
+                f'{event.title} (#{event.id}): sold={sold}/{event.actual_sold}, '
+                f'held={held}/{event.actual_held}'
+            )
+            if options['check']:
+                continue
+            if event.inventory_shards:
+                configure_shards(
+                    event,
+                    event.inventory_shards,
+                    sold_tickets=event.actual_sold,
+                    held_tickets=event.actual_held,
+                )
+            else:
+                # Okuma ile yazma arasında satış olduysa sayacı ezme
+                Event.objects.filter(pk=event.pk, sold_tickets=sold, held_tickets=held).update(
+                    sold_tickets=event.actual_sold,
+                    held_tickets=event.actual_held,
+                )
+
+        if options['check'] and drifted:
+            raise CommandError(f'{drifted} event counter(s) out of sync')
+        elif options['check']:
+            self.stdout.write(self.style.SUCCESS('All event counters are in sync'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt {drifted} event counter(s)'))
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from events.reservations import release_expired_holds
+
+class Command(BaseCommand):
+    help = 'Release ticket holds whose payment window has expired'
+
+    def handle(self, *args, **options):
+        released = release_expired_holds()
+        self.stdout.write(self.style.SUCCESS(f'Released {released} expired hold(s)'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from events.inventory import configure_shards, totals
+from events.models import Event
+
+class Command(BaseCommand):
+    help = 'Split an event\'s ticket inventory into N shards (0 merges them back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('event', help='Event id or slug')
+        parser.add_argument('shards', type=int, help='Number of inventory shards, 0 to disable')
+
+    def handle(self, *args, **options):
+        if options['shards'] < 0:
+            raise CommandError('Shard count cannot be negative')
+
+        lookup = {'pk': options['event']} if options['event'].isdigit() else {'slug': options['event']}
+        try:
+            event = Event.objects.get(**lookup)
+        except Event.DoesNotExist:
+            raise CommandError(f"Event '{options['event']}' does not exist")
+
+        event = configure_shards(event, options['shards'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{event.title}: {event.inventory_shards} shard(s), '
+            f"{totals(event)['remaining_tickets']} ticket(s) remaining"
+        ))
@@ -0,0 +1,292 @@
+"""
+İstek ve consumer başına sorgu sayısı ve süre ölçümü.
+
+* ``MetricsMiddleware`` her HTTP isteğini, ``MetricsConsumerMixin`` her
+  consumer mesajını (bağlanma, alınan mesaj, grup mesajı) bir ölçüm
+  bağlamında çalıştırır. Bağlam ``contextvars`` ile taşındığı için
+  ``sync_to_async`` ile başka thread'de çalışan sorgular da aynı isteğe
+  yazılır.
+* Sorgular, her veritabanı bağlantısına bir kez eklenen ``execute_wrapper``
+  ile sayılır ve süreleri toplanır; bağlam yoksa (ör. management komutları)
+  sarmalayıcı doğrudan sorguyu çalıştırır.
+* Serileştirme süresi DRF yanıtının ``TimedJSONRenderer`` ile JSON'a
+  çevrilme süresidir.
+* Sonuçlar süreç içi histogramlara yazılır ve ``/metrics`` adresinde
+  Prometheus metin biçiminde sunulur. Her worker süreci kendi sayılarını
+  sunar; Prometheus hepsini ayrı hedef olarak toplamalıdır.
+
+``METRICS_SERVER_TIMING`` açıksa yanıtlara ``Server-Timing`` başlığı
+eklenir; ``METRICS_SLOW_REQUEST_MS`` süresini aşan istekler en yavaş SQL
+ifadeleriyle birlikte loglanır.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+# Yavaş istek logu için istek başına saklanan en fazla SQL ifadesi
+CAPTURED_STATEMENTS = 100
+LOGGED_STATEMENTS = 10
+
+_current = ContextVar('events_metrics_sample', default=None)
+
+
+class Sample:
+    __slots__ = ('started', 'queries', 'db_time', 'serialization_time', 'statements')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialization_time = 0.0
+        self.statements = []
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self.lock:
+            self.series[labels] = self.series.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self.lock:
+            series = sorted(self.series.items())
+        for labels, value in series:
+            lines.append(f'{self.name}{_labels(self.labelnames, labels)} {value}')
+        return lines
+
+
+class Histogram:
+    """Etiket değerleri başına kova sayıları, toplam ve adet (thread-safe)"""
+
+    def __init__(self, name, documentation, labelnames, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                # Kovalar, +Inf, toplam
+                series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            series = sorted((labels, list(values)) for labels, values in self.series.items())
+        for labels, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), values):
+                cumulative += count
+                le = 'le="%s"' % bound
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {values[-1]}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        http = ('endpoint', 'method')
+        consumer = ('consumer', 'handler')
+        self.http_duration = Histogram(
+            'http_request_duration_seconds', 'Total request latency', http, LATENCY_BUCKETS)
+        self.http_db = Histogram(
+            'http_request_db_seconds', 'Time spent in SQL queries per request', http, LATENCY_BUCKETS)
+        self.http_serialization = Histogram(
+            'http_request_serialization_seconds', 'Time spent rendering the response body',
+            http, LATENCY_BUCKETS)
+        self.http_queries = Histogram(
+            'http_request_queries', 'SQL queries per request', http, QUERY_BUCKETS)
+        self.http_responses = Counter(
+            'http_responses_total', 'Responses by status code', http + ('status',))
+        self.consumer_duration = Histogram(
+            'consumer_handler_duration_seconds', 'Consumer message handling latency',
+            consumer, LATENCY_BUCKETS)
+        self.consumer_db = Histogram(
+            'consumer_handler_db_seconds', 'Time spent in SQL queries per consumer message',
+            consumer, LATENCY_BUCKETS)
+        self.consumer_queries = Histogram(
+            'consumer_handler_queries', 'SQL queries per consumer message', consumer, QUERY_BUCKETS)
+
+    def metrics(self):
+        return [
+            self.http_duration, self.http_db, self.http_serialization, self.http_queries,
+            self.http_responses, self.consumer_duration, self.consumer_db, self.consumer_queries,
+        ]
+
+    def record_request(self, endpoint, method, status, sample, elapsed):
+        labels = (endpoint, method)
+        self.http_duration.observe(labels, elapsed)
+        self.http_db.observe(labels, sample.db_time)
+        self.http_serialization.observe(labels, sample.serialization_time)
+        self.http_queries.observe(labels, sample.queries)
+        self.http_responses.inc(labels + (str(status),))
+
+    def record_message(self, consumer, handler, sample, elapsed):
+        labels = (consumer, handler)
+        self.consumer_duration.observe(labels, elapsed)
+        self.consumer_db.observe(labels, sample.db_time)
+        self.consumer_queries.observe(labels, sample.queries)
+
+    def render(self):
+        lines = []
+        for metric in self.metrics():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def record_query(execute, sql, params, many, context):
+    sample = _current.get()
+    if sample is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        sample.queries += 1
+        sample.db_time += elapsed
+        if len(sample.statements) < CAPTURED_STATEMENTS:
+            sample.statements.append((elapsed, sql))
+
+
+def install_query_recorder(connection, **kwargs):
+    """``connection_created`` sinyali: her bağlantıya sarmalayıcı bir kez eklenir"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class TimedJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        sample = _current.get()
+        if sample is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        started = time.perf_counter()
+        try:
+            return super().render(data, accepted_media_type, renderer_context)
+        finally:
+            sample.serialization_time += time.perf_counter() - started
+
+
+def _slow_threshold():
+    return getattr(settings, 'METRICS_SLOW_REQUEST_MS', 1000) / 1000
+
+
+def _log_slow(label, sample, elapsed):
+    if elapsed < _slow_threshold():
+        return
+    statements = sorted(sample.statements, key=lambda statement: statement[0], reverse=True)
+    logger.warning(
+        'Slow %s: %.1f ms, %d queries (%.1f ms in db)%s',
+        label, elapsed * 1000, sample.queries, sample.db_time * 1000,
+        ''.join(f'\n  {duration * 1000:.1f} ms: {sql}' for duration, sql in statements[:LOGGED_STATEMENTS]),
+    )
+
+
+def endpoint_of(request):
+    # Etiket sayısı sınırlı kalsın diye URL değil, URL deseninin adı kullanılır
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match.route
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        sample = Sample()
+        token = _current.set(sample)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, sample)
+
+    async def __acall__(self, request):
+        sample = Sample()
+        token = _current.set(sample)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, sample)
+
+    def finish(self, request, response, sample):
+        elapsed = sample.elapsed()
+        endpoint = endpoint_of(request)
+        registry.record_request(endpoint, request.method, response.status_code, sample, elapsed)
+        if getattr(settings, 'METRICS_SERVER_TIMING', False):
+            response['Server-Timing'] = (
+                f'db;dur={sample.db_time * 1000:.1f};desc="{sample.queries} queries", '
+                f'ser;dur={sample.serialization_time * 1000:.1f}, '
+                f'total;dur={elapsed * 1000:.1f}'
+            )
+        _log_slow(f'request {request.method} {request.path} ({endpoint})', sample, elapsed)
+        return response
+
+
+class MetricsConsumerMixin:
+    """Consumer'a gelen her mesajın süresini ve sorgularını ölçer"""
+
+    async def dispatch(self, message):
+        sample = Sample()
+        token = _current.set(sample)
+        try:
+            await super().dispatch(message)
+        finally:
+            _current.reset(token)
+            elapsed = sample.elapsed()
+            consumer = type(self).__name__
+            handler = message['type'].replace('.', '_')
+            registry.record_message(consumer, handler, sample, elapsed)
+            _log_slow(f'consumer message {consumer}.{handler}', sample, elapsed)
@@ -0,0 +1,30 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views.decorators.http import require_GET
+
+from .metrics import registry
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+@require_GET
+def metrics(request):
+    """
+    Bu sürecin histogramlarını Prometheus metin biçiminde döner. Varsayılan
+    olarak kapalıdır: ``METRICS_TOKEN`` tanımlıysa
+    ``Authorization: Bearer <token>`` ile, ya da oturum açmış staff kullanıcıyla
+    erişilir.
+    """
+    if not (_has_token(request) or request.user.is_staff):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
+
+
+def _has_token(request):
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if not token:
+        return False
+    supplied = request.META.get('HTTP_AUTHORIZATION', '')
+    return hmac.compare_digest(supplied.encode(), f'Bearer {token}'.encode())
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.21 on 2026-10-18 07:55
+
+from django.db import migrations, models
+from django.db.models import Q, Sum
+
+
+def populate_sold_tickets(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    events = Event.objects.annotate(
+        sold=Sum('tickets__quantity', filter=Q(tickets__is_cancelled=False))
+    ).filter(sold__gt=0)
+    for event in events.iterator():
+        Event.objects.filter(pk=event.pk).update(sold_tickets=event.sold)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='sold_tickets',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_sold_tickets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.21 on 2026-10-18 08:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0003_ticket_holds'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='inventory_shards',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tickethold',
+            name='shard_index',
+            field=models.SmallIntegerField(default=-1),
+        ),
+        migrations.CreateModel(
+            name='InventoryShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveSmallIntegerField()),
+                ('capacity', models.PositiveIntegerField(default=0)),
+                ('sold_tickets', models.PositiveIntegerField(default=0)),
+                ('held_tickets', models.PositiveIntegerField(default=0)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shards', to='events.event')),
+            ],
+            options={
+                'ordering': ['event', 'index'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='inventoryshard',
+            constraint=models.UniqueConstraint(fields=('event', 'index'), name='unique_event_shard_index'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 4.2.21 on 2026-10-18 08:04
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+import django.db.models.deletion
+
+
+def backfill_rollups(apps, schema_editor):
+    Ticket = apps.get_model('events', 'Ticket')
+    DailySalesRollup = apps.get_model('events', 'DailySalesRollup')
+    cancelled = Q(is_cancelled=True)
+    rows = Ticket.objects.annotate(day=TruncDate('purchase_date')).order_by().values(
+        'event_id', 'event__category_id', 'day'
+    ).annotate(
+        tickets=Count('id'),
+        revenue=Sum('total_price'),
+        cancellations=Count('id', filter=cancelled),
+        cancelled_revenue=Sum('total_price', filter=cancelled),
+    )
+    DailySalesRollup.objects.bulk_create(
+        (
+            DailySalesRollup(
+                event_id=row['event_id'],
+                category_id=row['event__category_id'],
+                day=row['day'],
+                tickets=row['tickets'],
+                revenue=row['revenue'] or 0,
+                cancellations=row['cancellations'],
+                cancelled_revenue=row['cancelled_revenue'] or 0,
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0004_inventory_shards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('bucket', models.PositiveSmallIntegerField(default=0)),
+                ('tickets', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('cancellations', models.PositiveIntegerField(default=0)),
+                ('cancelled_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_rollups', to='events.category')),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_rollups', to='events.event')),
+            ],
+            options={
+                'ordering': ['-day'],
+                'indexes': [models.Index(fields=['day'], name='events_dail_day_2b63fc_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailysalesrollup',
+            constraint=models.UniqueConstraint(fields=('event', 'day', 'bucket'), name='unique_event_day_bucket'),
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
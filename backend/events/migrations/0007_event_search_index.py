@@ -0,0 +1,72 @@
+from django.db import migrations
+
+# SQL bu migration'ın yazıldığı andaki haliyle sabittir; ``events.search``
+# sonradan değişse de migration geçmişi değişmez. Sonraki migrate'lerde
+# tetikleyicileri ``events.apps.install_search_index`` geri kurar.
+PG_INDEX = (
+    "CREATE INDEX IF NOT EXISTS events_event_search_idx ON events_event USING GIN ("
+    "to_tsvector('simple', coalesce(title, '') || ' ' || "
+    "coalesce(description, '') || ' ' || coalesce(location, '')))"
+)
+
+SQLITE_TABLE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS events_event_fts USING fts5("
+    "title, description, location, content='events_event', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')"
+)
+
+SQLITE_TRIGGERS = {
+    'events_event_fts_ai': """
+        CREATE TRIGGER IF NOT EXISTS events_event_fts_ai AFTER INSERT ON events_event BEGIN
+            INSERT INTO events_event_fts(rowid, title, description, location)
+            VALUES (new.id, new.title, new.description, new.location);
+        END
+    """,
+    'events_event_fts_ad': """
+        CREATE TRIGGER IF NOT EXISTS events_event_fts_ad AFTER DELETE ON events_event BEGIN
+            INSERT INTO events_event_fts(events_event_fts, rowid, title, description, location)
+            VALUES ('delete', old.id, old.title, old.description, old.location);
+        END
+    """,
+    'events_event_fts_au': """
+        CREATE TRIGGER IF NOT EXISTS events_event_fts_au
+        AFTER UPDATE OF title, description, location ON events_event BEGIN
+            INSERT INTO events_event_fts(events_event_fts, rowid, title, description, location)
+            VALUES ('delete', old.id, old.title, old.description, old.location);
+            INSERT INTO events_event_fts(rowid, title, description, location)
+            VALUES (new.id, new.title, new.description, new.location);
+        END
+    """,
+}
+
+
+def install_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute(PG_INDEX)
+    elif connection.vendor == 'sqlite':
+        schema_editor.execute(SQLITE_TABLE)
+        for sql in SQLITE_TRIGGERS.values():
+            schema_editor.execute(sql)
+        schema_editor.execute("INSERT INTO events_event_fts(events_event_fts) VALUES ('rebuild')")
+
+
+def uninstall_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS events_event_search_idx')
+    elif connection.vendor == 'sqlite':
+        for name in SQLITE_TRIGGERS:
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        schema_editor.execute('DROP TABLE IF EXISTS events_event_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0006_listing_order_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.21 on 2026-10-18 08:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0007_event_search_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='event',
+            name='event_listing_order_idx',
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-date', 'time', '-id'], name='event_active_listing_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['category', '-date', 'time'], name='event_active_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(condition=models.Q(('is_cancelled', False)), fields=['event', 'quantity'], name='ticket_event_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(condition=models.Q(('is_cancelled', False)), fields=['user', 'total_price'], name='ticket_user_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(condition=models.Q(('is_cancelled', False)), fields=['purchase_date', 'total_price'], name='ticket_active_purchase_idx'),
+        ),
+    ]
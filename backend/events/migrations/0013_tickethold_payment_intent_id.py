@@ -0,0 +1,18 @@
+# Generated by Django 4.2.21 on 2026-10-18 09:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0012_event_admission_rate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tickethold',
+            name='payment_intent_id',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=255, null=True),
+        ),
+    ]
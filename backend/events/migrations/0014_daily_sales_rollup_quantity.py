@@ -0,0 +1,61 @@
+# Generated by Django 4.2.21 on 2026-10-18 10:01
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+
+
+def rebuild_rollups(apps, schema_editor):
+    # Mevcut satırların adet toplamı bucket'lara bölünemez; rollup biletlerden yeniden kurulur
+    Ticket = apps.get_model('events', 'Ticket')
+    DailySalesRollup = apps.get_model('events', 'DailySalesRollup')
+    cancelled = Q(is_cancelled=True)
+    rows = Ticket.objects.annotate(day=TruncDate('purchase_date')).order_by().values(
+        'event_id', 'event__category_id', 'day'
+    ).annotate(
+        tickets=Count('id'),
+        quantity_sum=Sum('quantity'),
+        revenue=Sum('total_price'),
+        cancellations=Count('id', filter=cancelled),
+        cancelled_quantity_sum=Sum('quantity', filter=cancelled),
+        cancelled_revenue=Sum('total_price', filter=cancelled),
+    )
+    DailySalesRollup.objects.all().delete()
+    DailySalesRollup.objects.bulk_create(
+        (
+            DailySalesRollup(
+                event_id=row['event_id'],
+                category_id=row['event__category_id'],
+                day=row['day'],
+                tickets=row['tickets'],
+                quantity=row['quantity_sum'] or 0,
+                revenue=row['revenue'] or 0,
+                cancellations=row['cancellations'],
+                cancelled_quantity=row['cancelled_quantity_sum'] or 0,
+                cancelled_revenue=row['cancelled_revenue'] or 0,
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0013_tickethold_payment_intent_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailysalesrollup',
+            name='cancelled_quantity',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='dailysalesrollup',
+            name='quantity',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(rebuild_rollups, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,8 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
 from django.contrib.auth.models import User
+from django.utils import timezone
+import random
 import uuid
 
 class Category(models.Model):
@@ -15,6 +18,11 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+class EventQuerySet(models.QuerySet):
+    def for_listing(self):
+        # Kategori ve stok parçaları tek seferde yüklenir; sayfa başına sabit sorgu
+        return self.select_related('category').prefetch_related('shards')
+
 class Event(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(max_length=200, unique=True)
@@ -26,20 +34,64 @@ class Event(models.Model):
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='events')
     price = models.DecimalField(max_digits=10, decimal_places=2)
     available_tickets = models.PositiveIntegerField(default=0)
+    sold_tickets = models.PositiveIntegerField(default=0, editable=False)
+    held_tickets = models.PositiveIntegerField(default=0, editable=False)
+    # 0: stok Event satırında; >0: stok bu kadar InventoryShard satırına bölünmüş
+    inventory_shards = models.PositiveSmallIntegerField(default=0, editable=False)
+    # Dolu ise satış bekleme odasından geçer: saniyede en fazla bu kadar kullanıcı alınır
+    admission_rate = models.PositiveIntegerField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
 
+    objects = EventQuerySet.as_manager()
+
     class Meta:
         ordering = ['-date', 'time']
+        indexes = [
+            # Herkese açık listeleme: aktif etkinlikler, sıralama ve keyset anahtarı
+            models.Index(
+                fields=['-date', 'time', '-id'],
+                condition=models.Q(is_active=True),
+                name='event_active_listing_idx',
+            ),
+            models.Index(
+                fields=['category', '-date', 'time'],
+                condition=models.Q(is_active=True),
+                name='event_active_category_idx',
+            ),
+            models.Index(fields=['-created_at', '-id'], name='event_created_order_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
     @property
     def remaining_tickets(self):
-        sold_tickets = self.tickets.filter(is_cancelled=False).count()
-        return self.available_tickets - sold_tickets
+        if not self.inventory_shards:
+            return self.available_tickets - self.sold_tickets - self.held_tickets
+        from .inventory import totals
+        return totals(self)['remaining_tickets']
+
+class InventoryShard(models.Model):
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='shards')
+    index = models.PositiveSmallIntegerField()
+    capacity = models.PositiveIntegerField(default=0)
+    sold_tickets = models.PositiveIntegerField(default=0)
+    held_tickets = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['event', 'index']
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'index'], name='unique_event_shard_index'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_id}#{self.index}"
+
+    @property
+    def free(self):
+        return self.capacity - self.sold_tickets - self.held_tickets
 
 class Ticket(models.Model):
     STATUS_CHOICES = (
@@ -57,18 +109,228 @@ class Ticket(models.Model):
     total_price = models.DecimalField(max_digits=10, decimal_places=2)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
     is_cancelled = models.BooleanField(default=False)
+    # Ödemeyle oluşan biletlerde Stripe PaymentIntent; tekil olduğu için aynı ödeme iki bilet üretemez
+    payment_intent_id = models.CharField(max_length=255, unique=True, null=True, blank=True, editable=False)
+    # Grup siparişlerinde her koltuk ayrı bir bilettir ve siparişe bağlanır
+    order = models.ForeignKey(
+        'TicketOrder', on_delete=models.SET_NULL, null=True, blank=True, related_name='tickets'
+    )
 
     class Meta:
         ordering = ['-purchase_date']
+        indexes = [
+            models.Index(fields=['-purchase_date', '-id'], name='ticket_purchase_order_idx'),
+            models.Index(fields=['user', '-purchase_date', '-id'], name='ticket_user_order_idx'),
+            # Sadece geçerli biletler; toplanan sütunlar anahtarda olduğu için tablo okunmaz
+            models.Index(
+                fields=['event', 'quantity'],
+                condition=models.Q(is_cancelled=False),
+                name='ticket_event_active_idx',
+            ),
+            models.Index(
+                fields=['user', 'total_price'],
+                condition=models.Q(is_cancelled=False),
+                name='ticket_user_active_idx',
+            ),
+            models.Index(
+                fields=['purchase_date', 'total_price'],
+                condition=models.Q(is_cancelled=False),
+                name='ticket_active_purchase_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.ticket_number} - {self.event.title} - {self.user.email}"
 
+    def save(self, *args, track_inventory=True, **kwargs):
+        # track_inventory=False: stok zaten rezervasyon motoru tarafından düşüldü
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding and not self.is_cancelled:
+                if track_inventory:
+                    from .inventory import take
+                    take(self.event, self.quantity, 'sold_tickets', check_availability=False)
+                DailySalesRollup.record(self)
+
     def cancel(self):
+        with transaction.atomic():
+            cancelled = Ticket.objects.filter(pk=self.pk, is_cancelled=False).update(
+                is_cancelled=True,
+                status='cancelled'
+            )
+            if cancelled:
+                from .inventory import give_back
+                give_back(self.event, self.quantity, 'sold_tickets')
+                DailySalesRollup.record(self, cancelled=True)
         self.is_cancelled = True
         self.status = 'cancelled'
-        self.save()
 
     def mark_as_used(self):
-        self.status = 'used'
-        self.save()
\ No newline at end of file
+        """Tek sütunluk koşullu güncelleme; bilet yalnızca bir kez kullanılabilir"""
+        used = Ticket.objects.filter(pk=self.pk, status='active', is_cancelled=False).update(
+            status='used'
+        )
+        if used:
+            self.status = 'used'
+        return bool(used)
+
+class TicketOrder(models.Model):
+    """
+    Grup ve kurumsal siparişler. Siparişteki her koltuk ayrı taranabilir
+    ``quantity=1`` bir ``Ticket`` satırıdır; satırlar tek işlemde
+    ``bulk_create`` ile oluşturulur ve stok bir kez düşülür.
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='orders')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ticket_orders')
+    quantity = models.PositiveIntegerField()
+    total_price = models.DecimalField(max_digits=14, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.event.title} - {self.quantity} ({self.user_id})"
+
+class TicketHold(models.Model):
+    STATUS_CHOICES = (
+        ('active', 'Active'),
+        ('confirmed', 'Confirmed'),
+        ('released', 'Released'),
+    )
+
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='holds')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ticket_holds')
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
+    shard_index = models.SmallIntegerField(default=-1)
+    ticket = models.OneToOneField(
+        Ticket, on_delete=models.SET_NULL, null=True, blank=True, related_name='hold'
+    )
+    # Rezervasyon için açılan Stripe ödemesi; onay isteği yalnızca sahibinden kabul edilir
+    payment_intent_id = models.CharField(max_length=255, null=True, blank=True, db_index=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'expires_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.event.title} - {self.quantity} ({self.status})"
+
+class DailySalesRollup(models.Model):
+    """
+    Etkinlik ve gün bazında önceden toplanmış satış rakamları. Sayaçlar sadece
+    artar (iptaller ayrı sütunlarda tutulur); parçalı etkinliklerde aynı gün
+    birden fazla ``bucket`` satırına yayılarak sıcak satır oluşması önlenir.
+    ``tickets`` bilet satırı sayısıdır (panelin "satılan bilet" rakamı);
+    ``quantity`` bu biletlerin ``quantity`` toplamı, yani satılan koltuk sayısıdır.
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='sales_rollups')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='sales_rollups')
+    day = models.DateField()
+    bucket = models.PositiveSmallIntegerField(default=0)
+    tickets = models.PositiveIntegerField(default=0)
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    cancellations = models.PositiveIntegerField(default=0)
+    cancelled_quantity = models.PositiveIntegerField(default=0)
+    cancelled_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['-day']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['event', 'day', 'bucket'], name='unique_event_day_bucket'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['day']),
+        ]
+
+    def __str__(self):
+        return f"{self.event_id} - {self.day}"
+
+    @classmethod
+    def record(cls, ticket, cancelled=False, count=1):
+        """
+        Bilet satışını ya da iptalini satın alındığı günün satırına ekler.
+        ``count``: aynı gün, adet ve fiyatla toplu oluşturulan bilet sayısı.
+        """
+        event = ticket.event
+        key = {
+            'event_id': ticket.event_id,
+            'day': timezone.localdate(ticket.purchase_date),
+            'bucket': random.randrange(event.inventory_shards) if event.inventory_shards else 0,
+        }
+        quantity = ticket.quantity * count
+        if cancelled:
+            counters = {
+                'cancellations': count,
+                'cancelled_quantity': quantity,
+                'cancelled_revenue': ticket.total_price * count,
+            }
+        else:
+            counters = {'tickets': count, 'quantity': quantity, 'revenue': ticket.total_price * count}
+
+        changes = {field: F(field) + value for field, value in counters.items()}
+        if cls.objects.filter(**key).update(**changes):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(category_id=event.category_id, **key, **counters)
+        except IntegrityError:
+            # Aynı satırı eşzamanlı başka bir satış oluşturdu
+            cls.objects.filter(**key).update(**changes)
+
+class PaymentCustomer(models.Model):
+    """
+    Kullanıcının Stripe müşteri kaydı. Müşteri bir kez oluşturulur ve burada
+    saklanır; ödeme uç noktaları Stripe'ta e-posta ile arama yapmaz.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='payment_customer')
+    stripe_customer_id = models.CharField(max_length=255, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.user_id} - {self.stripe_customer_id}"
+
+class PaymentEvent(models.Model):
+    """
+    Stripe webhook olayları için kalıcı kuyruk. Olaylar alındığı anda yazılır,
+    bilet oluşturma gibi işler ``process_payment_events`` worker'ında yapılır.
+    ``available_at`` hem yeniden deneme zamanı hem de işlenen kaydın kirasıdır.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+
+    stripe_event_id = models.CharField(max_length=255, unique=True)
+    event_type = models.CharField(max_length=100)
+    payment_intent_id = models.CharField(max_length=255, blank=True, db_index=True)
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(
+                fields=['available_at', 'id'],
+                condition=models.Q(status='pending'),
+                name='payment_event_pending_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.stripe_event_id} - {self.event_type} ({self.status})"
@@ -0,0 +1,160 @@
+"""
+Keyset (cursor) sayfalama.
+
+``OFFSET`` yerine son satırın sıralama anahtarından sonrasını ister
+(``WHERE (a, id) < (:a, :id)``). ``COUNT(*)`` çalıştırmaz; her sayfanın maliyeti
+sayfa derinliğinden bağımsız olarak sayfa boyutuyla sınırlıdır. Sıralama
+alanlarının sonuncusu benzersiz olmalıdır (genelde ``id``).
+"""
+import base64
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+class KeysetPagination(BasePagination):
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    # View'da ``keyset_ordering`` tanımlı değilse kullanılır
+    ordering = ('-id',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(view)
+
+        queryset = queryset.order_by(*self.ordering)
+        cursor = self.decode_cursor(request)
+        try:
+            if cursor is not None:
+                queryset = queryset.filter(self.after(cursor))
+            rows = list(queryset[:self.page_size + 1])
+        except (ValidationError, TypeError, ValueError):
+            # İmleç istemciden gelir; alan tipine uymayan değer sunucu hatası olmamalı
+            raise NotFound('Invalid cursor')
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_ordering(self, view):
+        ordering = getattr(view, 'keyset_ordering', None) or self.ordering
+        return tuple(ordering)
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def after(self, cursor):
+        """Sıralamada ``cursor`` satırından sonra gelen satırlar için koşul"""
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, cursor):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def row_key(self, row):
+        fields = [field.lstrip('-') for field in self.ordering]
+        if isinstance(row, dict):
+            return [_encode_value(row[field]) for field in fields]
+        return [_encode_value(getattr(row, field)) for field in fields]
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound('Invalid cursor')
+        if not isinstance(cursor, list) or len(cursor) != len(self.ordering):
+            raise NotFound('Invalid cursor')
+        if not all(value is None or isinstance(value, (str, int, float)) for value in cursor):
+            raise NotFound('Invalid cursor')
+        return cursor
+
+    def encode_cursor(self, key):
+        encoded = base64.urlsafe_b64encode(json.dumps(key).encode('utf-8')).decode('ascii')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.row_key(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class SelectablePagination(BasePagination):
+    """
+    Varsayılan olarak ``PageNumberPagination`` kullanır; istek ``cursor``
+    parametresi ya da ``pagination=cursor`` içeriyorsa keyset sayfalamaya geçer.
+    Keyset sıralaması view'daki ``keyset_ordering`` ile belirlenir.
+    """
+
+    def __init__(self):
+        self.keyset = KeysetPagination()
+        self.page_number = PageNumberPagination()
+        self.active = self.page_number
+
+    def use_keyset(self, request):
+        params = request.query_params
+        return self.keyset.cursor_query_param in params or params.get('pagination') == 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.active = self.keyset if self.use_keyset(request) else self.page_number
+        return self.active.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.active.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.page_number.get_paginated_response_schema(schema)
+
+    def get_schema_operation_parameters(self, view):
+        return self.page_number.get_schema_operation_parameters(view) + [
+            {
+                'name': self.keyset.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Keyset pagination cursor (switches to cursor mode)',
+                'schema': {'type': 'string'},
+            },
+        ]
@@ -0,0 +1,82 @@
+"""
+Kullanıcı -> Stripe müşteri eşlemesi.
+
+Müşteri kimliği ``PaymentCustomer`` tablosunda saklanır ve süreç içi LRU'da
+tutulur; ödeme uç noktaları müşteri için gateway'e gitmez. Eşleme yoksa:
+
+* Aynı süreçte aynı kullanıcı için gelen eşzamanlı istekler tek çözümlemeyi
+  bekler (single-flight).
+* Farklı süreçler aynı anda müşteri oluşturursa kullanıcıya özgü
+  ``Idempotency-Key`` sayesinde Stripe aynı müşteriyi döner; tabloya ilk
+  yazan kazanır, diğeri kaydı okur.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from .caching import LocalLRU
+from .models import PaymentCustomer
+from .payment_gateway import gateway
+
+# Eşleme değişmez; süre sadece silinen kayıtların süreçte kalmaması için
+CACHE_TIMEOUT = 3600
+
+
+def _stored(user_id):
+    return PaymentCustomer.objects.filter(user_id=user_id).values_list('stripe_customer_id', flat=True)
+
+
+def _save(user, customer_id):
+    try:
+        with transaction.atomic():
+            PaymentCustomer.objects.create(user=user, stripe_customer_id=customer_id)
+        return customer_id
+    except IntegrityError:
+        # Başka bir süreç aynı kullanıcıyı önce kaydetti
+        return _stored(user.pk).get()
+
+
+class CustomerDirectory:
+    def __init__(self, max_entries):
+        self.cache = LocalLRU(max_entries)
+        self.inflight = {}
+
+    async def customer_id(self, user):
+        customer_id = self.cache.get(user.pk)
+        if customer_id is not None:
+            return customer_id
+
+        future = self.inflight.get(user.pk)
+        if future is None or future.done() or future.get_loop() is not asyncio.get_running_loop():
+            future = asyncio.ensure_future(self._resolve(user))
+            self.inflight[user.pk] = future
+            future.add_done_callback(lambda done: self._forget(user.pk, done))
+        return await asyncio.shield(future)
+
+    def _forget(self, user_id, future):
+        if self.inflight.get(user_id) is future:
+            del self.inflight[user_id]
+
+    async def _resolve(self, user):
+        customer_id = await _stored(user.pk).afirst()
+        if customer_id is None:
+            customer_id = await sync_to_async(_save)(user, await self._create(user))
+        self.cache.set(user.pk, customer_id, CACHE_TIMEOUT)
+        return customer_id
+
+    async def _create(self, user):
+        # Eşleme tablosundan önce e-posta ile oluşturulmuş müşteriler (kayıtlı kartlar) korunur
+        customer = await gateway.find_customer(user.email) if user.email else None
+        if customer is None:
+            customer = await gateway.create_customer(
+                email=user.email,
+                name=f"{user.first_name} {user.last_name}",
+                metadata={'user_id': user.pk},
+                idempotency_key=f'customer-user-{user.pk}'
+            )
+        return customer['id']
+
+
+directory = CustomerDirectory(getattr(settings, 'PAYMENT_CUSTOMER_CACHE_ENTRIES', 10000))
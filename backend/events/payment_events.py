@@ -0,0 +1,282 @@
+"""
+Stripe webhook olaylarının doğrulanması, kuyruklanması ve işlenmesi.
+
+Webhook uç noktası yalnızca imzayı doğrular ve olayı ``PaymentEvent``
+tablosuna yazar; aynı olayın tekrar gönderimi ``stripe_event_id`` tekilliği
+sayesinde yok sayılır. Biletler ``process_payment_events`` worker'ında
+oluşturulur:
+
+* Kayıtlar koşullu ``UPDATE`` ile sahiplenilir (``available_at`` ileri
+  alınır); birden fazla worker aynı olayı işlemez, çöken worker'ın kaydı
+  kira süresi dolunca tekrar işlenir.
+* Bilet oluşturma PaymentIntent kimliğine göre idempotent'tir: aynı ödeme
+  için webhook, istemcinin onay isteği ya da tekrar deneme kaç kez gelirse
+  gelsin tek bilet oluşur.
+* Geçici hatalar artan beklemeyle yeniden denenir. Henüz tamamlanmamış
+  ödeme hata sayılmaz: rezervasyon sürdükçe kısa aralıkla tekrar okunur.
+  Düzelmeyecek hatalar (ör. süresi dolan rezervasyondan sonra stok
+  kalmaması) ``failed`` olarak işaretlenir ve iade için loglanır.
+"""
+import hashlib
+import hmac
+import logging
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import IntegrityError
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Event, PaymentEvent, Ticket, TicketHold
+from .payment_gateway import GatewayUnavailable, PaymentError, gateway
+from .reservations import (
+    HoldNotActive,
+    InsufficientTickets,
+    confirm_hold,
+    purchase_tickets,
+    release_hold,
+)
+
+logger = logging.getLogger(__name__)
+
+# İstemci ödemeyi tamamladığını bildirdiğinde kuyruğa yazılan yerel olay;
+# worker intent'i gateway'den okur (webhook gecikirse ya da hiç gelmezse)
+CONFIRMATION_REQUESTED = 'payment_intent.confirmation_requested'
+
+RETRY_BASE_DELAY = 5  # saniye
+RETRY_MAX_DELAY = 3600
+# Ödeme sürerken (RetryLater) intent'in tekrar okunma aralığı; deneme hakkı harcanmaz
+PENDING_PAYMENT_DELAY = 10
+
+
+class SignatureError(Exception):
+    """Webhook imzası geçersiz ya da süresi dolmuş"""
+
+
+class RetryLater(Exception):
+    """Olay henüz işlenemez (ör. ödeme hâlâ sürüyor); daha sonra tekrar denenir"""
+
+
+def sign(payload, secret, timestamp=None):
+    """``Stripe-Signature`` başlığını üretir (testler ve yerel araçlar için)"""
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    signature = hmac.new(secret.encode(), f'{timestamp}.'.encode() + payload, hashlib.sha256).hexdigest()
+    return f't={timestamp},v1={signature}'
+
+
+def verify_signature(payload, header, secret, tolerance=None, now=None):
+    """Stripe'ın ``t=<zaman>,v1=<imza>`` biçimindeki başlığını doğrular"""
+    tolerance = getattr(settings, 'STRIPE_WEBHOOK_TOLERANCE', 300) if tolerance is None else tolerance
+    items = [item.split('=', 1) for item in (header or '').split(',') if '=' in item]
+    timestamps = [value for key, value in items if key == 't']
+    signatures = [value for key, value in items if key == 'v1']
+    if not timestamps or not signatures:
+        raise SignatureError('Unable to extract timestamp and signatures from header')
+    try:
+        timestamp = int(timestamps[0])
+    except ValueError:
+        raise SignatureError('Invalid timestamp in header') from None
+
+    expected = sign(payload, secret, timestamp).rsplit('v1=', 1)[1]
+    if not any(hmac.compare_digest(expected, signature) for signature in signatures):
+        raise SignatureError('No signatures found matching the expected signature')
+    now = time.time() if now is None else now
+    if tolerance and timestamp < now - tolerance:
+        raise SignatureError('Timestamp outside the tolerance zone')
+
+
+def enqueue(event):
+    """
+    Olayı kuyruğa yazar; daha önce alınmışsa ``False`` döner. İmzası geçerli
+    olsa da ``id`` ya da ``type`` alanı olmayan olay için ``ValueError``.
+    """
+    if not isinstance(event, dict) or not all(
+        isinstance(event.get(key), str) and event[key] for key in ('id', 'type')
+    ):
+        raise ValueError('Invalid event payload')
+    data = event.get('data')
+    obj = data.get('object') if isinstance(data, dict) else None
+    if not isinstance(obj, dict):
+        obj = {}
+    payment_intent_id = obj.get('id', '') if obj.get('object') == 'payment_intent' else ''
+    _, created = PaymentEvent.objects.get_or_create(
+        stripe_event_id=event['id'],
+        defaults={
+            'event_type': event['type'],
+            'payment_intent_id': payment_intent_id,
+            'payload': event,
+        }
+    )
+    return created
+
+
+def request_confirmation(payment_intent_id):
+    """
+    Worker'dan intent'i okumasını ister. Kayıt daha önce bilet üretmeden
+    bitmişse (ör. ödeme o sırada tamamlanmamıştı) her sorguda yeniden kurulur.
+    """
+    stripe_event_id = f'confirm:{payment_intent_id}'
+    created = enqueue({
+        'id': stripe_event_id,
+        'type': CONFIRMATION_REQUESTED,
+        'data': {'object': {'id': payment_intent_id, 'object': 'payment_intent'}},
+    })
+    if not created:
+        PaymentEvent.objects.filter(stripe_event_id=stripe_event_id, status='done').update(
+            status='pending',
+            attempts=0,
+            last_error='',
+            available_at=timezone.now(),
+            processed_at=None,
+        )
+    return created
+
+
+def issue_ticket(intent):
+    """PaymentIntent için bileti bir kez oluşturur; sonraki çağrılar aynı bileti döner"""
+    payment_intent_id = intent['id']
+    ticket = Ticket.objects.filter(payment_intent_id=payment_intent_id).first()
+    if ticket is not None:
+        return ticket
+
+    metadata = intent.get('metadata') or {}
+    if not metadata.get('hold_id') and not metadata.get('event_id'):
+        # Bu uygulamanın bilet ödemesi değil
+        return None
+    try:
+        if metadata.get('hold_id'):
+            hold = TicketHold.objects.select_related('event', 'user').get(pk=metadata['hold_id'])
+            try:
+                return confirm_hold(hold, payment_intent_id=payment_intent_id)
+            except HoldNotActive:
+                hold.refresh_from_db()
+                if hold.status == 'confirmed':
+                    # Rezervasyon başka bir yoldan (eski onay akışı) bilete dönüşmüş
+                    return Ticket.objects.get(pk=hold.ticket_id)
+            # Ödeme alındı ama rezervasyon süresi doldu: stok varsa doğrudan satılır
+            event, user, quantity = hold.event, hold.user, hold.quantity
+        else:
+            event = Event.objects.get(pk=metadata['event_id'])
+            user = User.objects.get(pk=metadata['user_id'])
+            quantity = int(metadata.get('quantity', 1))
+        return purchase_tickets(event, user, quantity, payment_intent_id=payment_intent_id)
+    except IntegrityError:
+        # Aynı ödemeyi eşzamanlı başka bir worker işledi
+        return Ticket.objects.get(payment_intent_id=payment_intent_id)
+
+
+def cancel_hold(intent):
+    hold_id = (intent.get('metadata') or {}).get('hold_id')
+    if hold_id:
+        hold = TicketHold.objects.select_related('event').filter(pk=hold_id).first()
+        if hold is not None:
+            release_hold(hold)
+
+
+def confirm_requested(intent):
+    # Worker sync çalışır: istek gateway'in ortak istemcisiyle kendi loop'unda yapılır
+    intent = gateway.call(gateway.retrieve_payment_intent, intent['id'])
+    if intent['status'] == 'succeeded':
+        issue_ticket(intent)
+    elif intent['status'] == 'canceled':
+        cancel_hold(intent)
+    elif hold_is_active(intent):
+        raise RetryLater(f"PaymentIntent {intent['id']} is {intent['status']}")
+    # Rezervasyon bitti: arka planda beklemeyi bırakır; geç gelen ödemeyi webhook ya da
+    # istemcinin sonraki onay isteği işler
+
+
+def hold_is_active(intent):
+    hold_id = (intent.get('metadata') or {}).get('hold_id')
+    return bool(hold_id) and TicketHold.objects.filter(pk=hold_id, status='active').exists()
+
+
+HANDLERS = {
+    'payment_intent.succeeded': issue_ticket,
+    'payment_intent.canceled': cancel_hold,
+    CONFIRMATION_REQUESTED: confirm_requested,
+}
+
+
+def _retry_delay(attempts):
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** max(0, attempts - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def _finish(event, status, error=''):
+    PaymentEvent.objects.filter(pk=event.pk).update(
+        status=status,
+        last_error=error,
+        processed_at=timezone.now(),
+    )
+
+
+def process(event):
+    """Sahiplenilmiş tek bir olayı işler; başarılıysa ``True``"""
+    handler = HANDLERS.get(event.event_type)
+    try:
+        if handler is not None:
+            handler(event.payload['data']['object'])
+    except (InsufficientTickets, PaymentError) as exc:
+        if isinstance(exc, GatewayUnavailable):
+            return _retry(event, exc)
+        # Tekrar denemek sonucu değiştirmez; ödeme alındıysa iade gerekir
+        logger.error('Payment event %s failed permanently: %s', event.stripe_event_id, exc)
+        _finish(event, 'failed', str(exc))
+        return False
+    except Exception as exc:
+        return _retry(event, exc)
+    _finish(event, 'done')
+    return True
+
+
+def _retry(event, exc):
+    if isinstance(exc, RetryLater):
+        # Hata değil: ödeme sürüyor. Sahiplenirken artırılan deneme geri alınır
+        PaymentEvent.objects.filter(pk=event.pk).update(
+            last_error=str(exc),
+            attempts=F('attempts') - 1,
+            available_at=timezone.now() + timedelta(
+                seconds=PENDING_PAYMENT_DELAY / 2 + random.uniform(0, PENDING_PAYMENT_DELAY / 2)
+            ),
+        )
+        return False
+    max_attempts = getattr(settings, 'PAYMENT_EVENT_MAX_ATTEMPTS', 8)
+    if event.attempts >= max_attempts:
+        logger.error('Payment event %s gave up after %s attempts: %s', event.stripe_event_id, event.attempts, exc)
+        _finish(event, 'failed', str(exc))
+        return False
+    logger.exception('Payment event %s failed, will retry', event.stripe_event_id)
+    PaymentEvent.objects.filter(pk=event.pk).update(
+        last_error=str(exc),
+        available_at=timezone.now() + timedelta(seconds=_retry_delay(event.attempts)),
+    )
+    return False
+
+
+def process_pending(limit=100, now=None):
+    """
+    Zamanı gelmiş olayları sırayla sahiplenip işler. ``(sahiplenilen, başarılı)``
+    döner; yeniden denemeye bırakılan ya da kalıcı hata alan olaylar yalnızca
+    sahiplenilen sayısına girer.
+    """
+    now = now or timezone.now()
+    lease = timedelta(seconds=getattr(settings, 'PAYMENT_EVENT_LEASE', 60))
+    candidates = list(
+        PaymentEvent.objects.filter(status='pending', available_at__lte=now)
+        .order_by('available_at', 'id')
+        .values_list('id', flat=True)[:limit]
+    )
+
+    claimed = processed = 0
+    for pk in candidates:
+        # Koşullu güncelleme: aynı kaydı başka bir worker sahiplendiyse atlanır
+        if PaymentEvent.objects.filter(
+            pk=pk, status='pending', available_at__lte=now
+        ).update(available_at=now + lease, attempts=F('attempts') + 1):
+            claimed += 1
+            processed += process(PaymentEvent.objects.get(pk=pk))
+    return claimed, processed
@@ -0,0 +1,256 @@
+"""
+Stripe için async ödeme gateway'i.
+
+* Süreç başına tek bir ``httpx.AsyncClient`` kullanılır ve gateway'in kendi
+  event loop thread'inde çalışır. Çağıran hangi loop'ta olursa olsun (ASGI,
+  WSGI altında her istekte yeni loop açan async view'lar, worker) istekler
+  bu loop'a gönderilir; bağlantılar havuzda kalır, her istekte TLS el
+  sıkışması yapılmaz. Sync kod ``gateway.call(...)`` kullanır. İstemci
+  ``close()`` ile (süreç çıkışında otomatik) kapatılır; fork sonrası
+  çocuk süreç kendi loop'unu açar.
+* Her çağrının yeniden denemeler dahil toplam bir süre sınırı vardır
+  (``STRIPE_TIMEOUT``); aşılırsa ``GatewayUnavailable`` fırlatılır.
+* Ağ hataları, 409/429 ve 5xx yanıtları (ya da ``Stripe-Should-Retry``
+  başlığı) üstel bekleme ve rastgele sapma (full jitter) ile yeniden denenir.
+  POST isteklerinde tüm denemeler aynı ``Idempotency-Key`` ile gönderilir,
+  böylece zaman aşımından sonra tekrar denenen istek iki kez işlenmez.
+
+Yanıtlar Stripe API'sinin döndürdüğü JSON sözlükleridir.
+"""
+import asyncio
+import atexit
+import os
+import random
+import threading
+import uuid
+from urllib.parse import urlencode
+
+import httpx
+from django.conf import settings
+
+# Yeniden denemeler arasındaki bekleme: [0, min(üst sınır, taban * 2^deneme)] aralığından rastgele
+RETRY_BASE_DELAY = 0.25
+RETRY_MAX_DELAY = 2.0
+
+
+class PaymentError(Exception):
+    """Ödeme sağlayıcısının reddettiği istek (geçersiz parametre, kart reddi vb.)"""
+
+    def __init__(self, message, status=None, code=None):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+
+
+class GatewayUnavailable(PaymentError):
+    """Sağlayıcıya süre sınırı içinde ulaşılamadı; istek daha sonra tekrar denenebilir"""
+
+
+def encode(params, prefix=None):
+    """Parametreleri Stripe'ın form biçimine çevirir (``metadata[event_id]=1``)"""
+    pairs = []
+    for key, value in params.items():
+        name = f'{prefix}[{key}]' if prefix else key
+        if value is None:
+            continue
+        if isinstance(value, dict):
+            pairs.extend(encode(value, name))
+        elif isinstance(value, (list, tuple)):
+            pairs.extend(encode(dict(enumerate(value)), name))
+        elif isinstance(value, bool):
+            pairs.append((name, 'true' if value else 'false'))
+        else:
+            pairs.append((name, str(value)))
+    return pairs
+
+
+class StripeGateway:
+    retry_base_delay = RETRY_BASE_DELAY
+    retry_max_delay = RETRY_MAX_DELAY
+
+    def __init__(self):
+        # httpx bağlantıları oluşturuldukları event loop'a bağlıdır; tek loop, tek istemci
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._client = None
+        self._pid = None
+        self._atexit = False
+
+    @property
+    def api_base(self):
+        return getattr(settings, 'STRIPE_API_BASE', 'https://api.stripe.com').rstrip('/')
+
+    @property
+    def api_key(self):
+        return getattr(settings, 'STRIPE_SECRET_KEY', 'sk_test_...')
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'STRIPE_TIMEOUT', 10)
+
+    @property
+    def connect_timeout(self):
+        return getattr(settings, 'STRIPE_CONNECT_TIMEOUT', 2)
+
+    @property
+    def max_retries(self):
+        return getattr(settings, 'STRIPE_MAX_RETRIES', 2)
+
+    def _running_loop(self):
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                # Fork edilen süreçte ebeveynin thread'i yoktur
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name='stripe-gateway', daemon=True)
+                thread.start()
+                self._loop, self._thread, self._client, self._pid = loop, thread, None, os.getpid()
+                if not self._atexit:
+                    atexit.register(self.close)
+                    self._atexit = True
+            return self._loop
+
+    def submit(self, coroutine):
+        """Coroutine'i gateway loop'unda başlatır; ``concurrent.futures.Future`` döner"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._running_loop())
+
+    def call(self, method, *args, **kwargs):
+        """Sync kod için: gateway metodunu (ör. ``retrieve_payment_intent``) çalıştırıp sonucu bekler"""
+        return self.submit(method(*args, **kwargs)).result()
+
+    def client(self):
+        """Yalnızca gateway loop'unda çağrılır"""
+        if self._client is None:
+            max_connections = getattr(settings, 'STRIPE_MAX_CONNECTIONS', 100)
+            self._client = httpx.AsyncClient(limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ))
+        return self._client
+
+    async def _close_client(self):
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
+
+    async def aclose(self):
+        """Havuzdaki bağlantıları kapatır; sonraki istek yeni istemci açar"""
+        if self._loop is not None and self._pid == os.getpid():
+            await asyncio.wrap_future(self.submit(self._close_client()))
+
+    def close(self):
+        """İstemciyi kapatır ve gateway loop'unu durdurur"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            owned = self._pid == os.getpid()
+            self._loop = self._thread = None
+        if loop is None or not owned:
+            return
+        asyncio.run_coroutine_threadsafe(self._close_client(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+
+    async def request(self, method, path, params=None, idempotency_key=None, timeout=None):
+        """
+        API çağrısı yapar ve JSON yanıtını döner. ``timeout`` yeniden
+        denemeler dahil toplam süredir (varsayılan ``STRIPE_TIMEOUT``).
+        """
+        timeout = self.timeout if timeout is None else timeout
+        headers = {'Authorization': f'Bearer {self.api_key}'}
+        if method == 'POST':
+            headers['Idempotency-Key'] = idempotency_key or uuid.uuid4().hex
+        coroutine = self._request(method, path, params, headers, timeout)
+        if asyncio.get_running_loop() is self._loop:
+            return await coroutine
+        # İstek iptal edilirse (ör. istemci bağlantıyı kapattı) gateway loop'undaki görev de iptal olur
+        return await asyncio.wrap_future(self.submit(coroutine))
+
+    async def _request(self, method, path, params, headers, timeout):
+        try:
+            async with asyncio.timeout(timeout):
+                return await self._send(method, path, encode(params or {}), headers, timeout)
+        except TimeoutError:
+            raise GatewayUnavailable('Ödeme servisi zamanında yanıt vermedi') from None
+
+    async def _send(self, method, path, params, headers, timeout):
+        url = self.api_base + path
+        request_timeout = httpx.Timeout(timeout, connect=min(timeout, self.connect_timeout))
+        attempt = 0
+        while True:
+            try:
+                if method == 'GET':
+                    response = await self.client().get(url, params=params, headers=headers, timeout=request_timeout)
+                else:
+                    response = await self.client().request(
+                        method, url, content=urlencode(params), timeout=request_timeout,
+                        headers={**headers, 'Content-Type': 'application/x-www-form-urlencoded'},
+                    )
+            except httpx.TransportError as exc:
+                error = GatewayUnavailable(f'Ödeme servisine ulaşılamadı: {exc.__class__.__name__}')
+                retry = True
+            else:
+                if response.status_code < 400:
+                    return response.json()
+                error = self._error(response)
+                retry = self._should_retry(response)
+
+            if not retry or attempt >= self.max_retries:
+                raise error
+            await asyncio.sleep(self.backoff(attempt))
+            attempt += 1
+
+    def _error(self, response):
+        try:
+            body = response.json().get('error') or {}
+        except ValueError:
+            body = {}
+        message = body.get('message') or f'Ödeme servisi hatası (HTTP {response.status_code})'
+        error_class = GatewayUnavailable if response.status_code == 429 or response.status_code >= 500 else PaymentError
+        return error_class(message, status=response.status_code, code=body.get('code'))
+
+    def _should_retry(self, response):
+        should_retry = response.headers.get('Stripe-Should-Retry')
+        if should_retry is not None:
+            return should_retry == 'true'
+        return response.status_code in (409, 429) or response.status_code >= 500
+
+    async def create_payment_intent(self, amount, currency, metadata, idempotency_key=None):
+        return await self.request('POST', '/v1/payment_intents', {
+            'amount': amount,
+            'currency': currency,
+            'metadata': metadata,
+        }, idempotency_key=idempotency_key)
+
+    async def retrieve_payment_intent(self, payment_intent_id):
+        return await self.request('GET', f'/v1/payment_intents/{payment_intent_id}')
+
+    async def find_customer(self, email):
+        customers = await self.request('GET', '/v1/customers', {'email': email, 'limit': 1})
+        return customers['data'][0] if customers['data'] else None
+
+    async def create_customer(self, email, name, metadata=None, idempotency_key=None):
+        return await self.request('POST', '/v1/customers', {
+            'email': email,
+            'name': name,
+            'metadata': metadata,
+        }, idempotency_key=idempotency_key)
+
+    async def list_payment_methods(self, customer_id, type='card'):
+        payment_methods = await self.request('GET', '/v1/payment_methods', {
+            'customer': customer_id,
+            'type': type,
+        })
+        return payment_methods['data']
+
+    async def create_setup_intent(self, customer_id, payment_method_types=('card',)):
+        return await self.request('POST', '/v1/setup_intents', {
+            'customer': customer_id,
+            'payment_method_types': list(payment_method_types),
+        })
+
+
+gateway = StripeGateway()
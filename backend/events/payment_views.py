@@ -1,173 +1,218 @@
-import stripe
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.shortcuts import get_object_or_404
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from .models import Event, Ticket
+from .async_views import async_api_view
+from .models import Event, PaymentEvent, Ticket, TicketHold
+from .payment_events import SignatureError, enqueue, request_confirmation, verify_signature
+from .payment_customers import directory
+from .payment_gateway import GatewayUnavailable, gateway
+from .reservations import (
+    InsufficientTickets,
+    hold_tickets,
+    release_hold,
+)
+from .waiting_room import AdmissionRequired, check_admission, pass_from
 import json
 
-# Stripe API key'i ayarla
-stripe.api_key = getattr(settings, 'STRIPE_SECRET_KEY', 'sk_test_...')
+# Stripe'a giden görünümler async'tir: yanıt beklenirken worker thread'i tutulmaz.
+# Veritabanı işlemleri sync_to_async ile ayrı thread'de çalışır.
 
-@api_view(['POST'])
+def _gateway_unavailable(error):
+    return Response(
+        {'error': str(error)},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+
+def _hold_for(user, event_id, quantity, queue_pass=None):
+    event = get_object_or_404(Event, id=event_id)
+    check_admission(event, user, queue_pass)
+    return event, hold_tickets(event, user, quantity)
+
+@async_api_view(['POST'])
 @permission_classes([IsAuthenticated])
-def create_payment_intent(request):
+async def create_payment_intent(request):
     """Stripe Payment Intent oluştur"""
     try:
         data = request.data
         event_id = data.get('event_id')
         quantity = int(data.get('quantity', 1))
-        
-        # Event'i al
-        event = get_object_or_404(Event, id=event_id)
-        
-        # Bilet yeterli mi kontrol et
-        if event.remaining_tickets < quantity:
+
+        # Biletleri ödeme süresince ayır (stok yetersizse hata döner)
+        try:
+            event, hold = await sync_to_async(_hold_for)(
+                request.user, event_id, quantity, pass_from(request)
+            )
+        except AdmissionRequired:
+            return Response(
+                {'error': 'Satın almak için bekleme odasında sıranızı bekleyin'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        except InsufficientTickets:
             return Response(
-                {'error': 'Yeterli bilet yok'}, 
+                {'error': 'Yeterli bilet yok'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        
+
         # Toplam fiyatı hesapla
         total_amount = int(event.price * quantity * 100)  # Kuruş cinsinden
-        
-        # Payment Intent oluştur
-        intent = stripe.PaymentIntent.create(
-            amount=total_amount,
-            currency='try',
-            metadata={
-                'event_id': event_id,
-                'user_id': request.user.id,
-                'quantity': quantity
-            }
-        )
-        
+
+        # Payment Intent oluştur; rezervasyon başına tek intent (tekrar denemelerde aynı anahtar)
+        try:
+            intent = await gateway.create_payment_intent(
+                amount=total_amount,
+                currency='try',
+                metadata={
+                    'event_id': event_id,
+                    'user_id': request.user.id,
+                    'quantity': quantity,
+                    'hold_id': hold.id
+                },
+                idempotency_key=f'payment-intent-hold-{hold.id}'
+            )
+        except Exception:
+            await sync_to_async(release_hold)(hold)
+            raise
+        await TicketHold.objects.filter(pk=hold.pk).aupdate(payment_intent_id=intent['id'])
+
         return Response({
-            'client_secret': intent.client_secret,
+            'client_secret': intent['client_secret'],
             'amount': total_amount,
-            'currency': 'try'
+            'currency': 'try',
+            'hold_id': hold.id,
+            'hold_expires_at': hold.expires_at
         })
-        
+
+    except GatewayUnavailable as e:
+        return _gateway_unavailable(e)
     except Exception as e:
         return Response(
-            {'error': str(e)}, 
+            {'error': str(e)},
             status=status.HTTP_400_BAD_REQUEST
         )
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def confirm_payment(request):
-    """Ödeme onaylandıktan sonra bilet oluştur"""
+    """
+    Ödeme sonrası bilet durumunu döner. Bilet webhook kuyruğunda oluşturulur;
+    henüz oluşmadıysa 202 döner ve istemci tekrar sorar.
+    """
     try:
-        data = request.data
-        payment_intent_id = data.get('payment_intent_id')
-        event_id = data.get('event_id')
-        quantity = int(data.get('quantity', 1))
-        
-        # Payment Intent'i doğrula
-        intent = stripe.PaymentIntent.retrieve(payment_intent_id)
-        
-        if intent.status != 'succeeded':
+        payment_intent_id = request.data.get('payment_intent_id')
+        if not payment_intent_id:
             return Response(
-                {'error': 'Ödeme başarısız'}, 
+                {'error': 'payment_intent_id gerekli'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        
-        # Event'i al
-        event = get_object_or_404(Event, id=event_id)
-        
-        # Bilet oluştur
-        ticket = Ticket.objects.create(
-            user=request.user,
-            event=event,
-            quantity=quantity,
-            total_price=event.price * quantity,
-            status='active'
-        )
-        
+
+        ticket = Ticket.objects.filter(
+            payment_intent_id=payment_intent_id,
+            user=request.user
+        ).first()
+        if ticket is not None:
+            return Response({
+                'success': True,
+                'ticket_id': ticket.id,
+                'ticket_number': ticket.ticket_number,
+                'message': 'Bilet başarıyla oluşturuldu'
+            })
+
+        # Yalnızca kullanıcının kendi rezervasyonuna ait ödeme için worker Stripe'a gider
+        if not TicketHold.objects.filter(payment_intent_id=payment_intent_id, user=request.user).exists():
+            return Response(
+                {'error': 'Ödeme bulunamadı'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        if PaymentEvent.objects.filter(payment_intent_id=payment_intent_id, status='failed').exists():
+            return Response(
+                {'error': 'Rezervasyon süresi doldu veya yeterli bilet yok'},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        # Webhook gecikirse worker intent'i Stripe'tan kendisi okur
+        request_confirmation(payment_intent_id)
         return Response({
-            'success': True,
-            'ticket_id': ticket.id,
-            'ticket_number': ticket.ticket_number,
-            'message': 'Bilet başarıyla oluşturuldu'
-        })
-        
+            'success': False,
+            'status': 'pending',
+            'message': 'Ödeme işleniyor'
+        }, status=status.HTTP_202_ACCEPTED)
+
     except Exception as e:
         return Response(
-            {'error': str(e)}, 
+            {'error': str(e)},
             status=status.HTTP_400_BAD_REQUEST
         )
 
-@api_view(['GET'])
+@async_api_view(['GET'])
 @permission_classes([IsAuthenticated])
-def payment_methods(request):
+async def payment_methods(request):
     """Kullanıcının kayıtlı ödeme yöntemlerini getir"""
     try:
-        # Stripe Customer oluştur veya al
-        customer = stripe.Customer.list(
-            email=request.user.email,
-            limit=1
-        )
-        
-        if not customer.data:
-            customer = stripe.Customer.create(
-                email=request.user.email,
-                name=f"{request.user.first_name} {request.user.last_name}"
-            )
-        else:
-            customer = customer.data[0]
-        
+        # Müşteri kimliği kayıtlı eşlemeden gelir; tek gateway çağrısı yapılır
+        customer_id = await directory.customer_id(request.user)
+
         # Payment methods'ları al
-        payment_methods = stripe.PaymentMethod.list(
-            customer=customer.id,
-            type='card'
-        )
-        
+        payment_methods = await gateway.list_payment_methods(customer_id, type='card')
+
         return Response({
-            'payment_methods': payment_methods.data,
-            'customer_id': customer.id
+            'payment_methods': payment_methods,
+            'customer_id': customer_id
         })
-        
+
+    except GatewayUnavailable as e:
+        return _gateway_unavailable(e)
     except Exception as e:
         return Response(
-            {'error': str(e)}, 
+            {'error': str(e)},
             status=status.HTTP_400_BAD_REQUEST
         )
 
-@api_view(['POST'])
+@async_api_view(['POST'])
 @permission_classes([IsAuthenticated])
-def create_setup_intent(request):
+async def create_setup_intent(request):
     """Kart kaydetmek için Setup Intent oluştur"""
     try:
-        # Stripe Customer oluştur veya al
-        customer = stripe.Customer.list(
-            email=request.user.email,
-            limit=1
-        )
-        
-        if not customer.data:
-            customer = stripe.Customer.create(
-                email=request.user.email,
-                name=f"{request.user.first_name} {request.user.last_name}"
-            )
-        else:
-            customer = customer.data[0]
-        
+        customer_id = await directory.customer_id(request.user)
+
         # Setup Intent oluştur
-        setup_intent = stripe.SetupIntent.create(
-            customer=customer.id,
-            payment_method_types=['card']
-        )
-        
+        setup_intent = await gateway.create_setup_intent(customer_id)
+
         return Response({
-            'client_secret': setup_intent.client_secret,
-            'customer_id': customer.id
+            'client_secret': setup_intent['client_secret'],
+            'customer_id': customer_id
         })
-        
+
+    except GatewayUnavailable as e:
+        return _gateway_unavailable(e)
     except Exception as e:
         return Response(
-            {'error': str(e)}, 
+            {'error': str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def stripe_webhook(request):
+    """Stripe webhook'u: imzayı doğrular ve olayı kuyruğa yazar"""
+    try:
+        verify_signature(
+            request.body,
+            request.META.get('HTTP_STRIPE_SIGNATURE'),
+            settings.STRIPE_WEBHOOK_SECRET
+        )
+        event = json.loads(request.body)
+        # Aynı olay tekrar gelirse (Stripe yeniden gönderimi) tekrar kuyruğa alınmaz
+        created = enqueue(event)
+    except (SignatureError, ValueError) as e:
+        return Response(
+            {'error': str(e)},
             status=status.HTTP_400_BAD_REQUEST
         )
+
+    return Response({'received': True, 'duplicate': not created})
@@ -0,0 +1,41 @@
+from django.shortcuts import get_object_or_404
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from .models import Event
+from . import waiting_room
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def queue(request, event_id):
+    """
+    Bekleme odası: POST kuyruğa katılır, GET konumu döner. WebSocket
+    (``ws/event/<id>/queue/``) kullanamayan istemciler için yoklama yolu.
+    Sıra gelince yanıtta satın alma uç noktalarına ``X-Queue-Pass``
+    başlığıyla gönderilecek geçiş kartı bulunur.
+    """
+    rate = get_object_or_404(
+        Event.objects.values_list('admission_rate', flat=True), pk=event_id
+    )
+    if request.method == 'POST':
+        number = waiting_room.join(event_id, request.user.pk)
+    else:
+        number = waiting_room.number_of(event_id, request.user.pk)
+        if number is None:
+            return Response(
+                {'error': 'Kuyrukta değilsiniz'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+    # Bağlantı olmayan süreçlerde de kuyruk yoklamalarla ilerler
+    waiting_room.advance(event_id, rate)
+    if rate:
+        state = waiting_room.status(event_id, number)
+    else:
+        # Bekleme odası kapalı: herkes içeride
+        state = {'number': number, 'position': 0, 'admitted': True}
+    if state['admitted']:
+        state['pass'] = waiting_room.issue_pass(event_id, request.user.pk, number)
+        state['expires_in'] = waiting_room.purchase_window()
+    return Response(state)
@@ -0,0 +1,160 @@
+"""
+Bilet rezervasyon motoru.
+
+Stok, Event satırı (ya da çok yoğun etkinliklerde bir stok parçası) üzerinde
+koşullu atomik UPDATE ile düşülür (``UPDATE ... WHERE available - sold - held
+>= qty``, bkz. ``inventory``). Satır kilidi sadece tek bir UPDATE süresince
+tutulur; SELECT ... FOR UPDATE kullanılmaz, bu yüzden aynı etkinliğe gelen
+binlerce eşzamanlı alıcı sıraya girmeden yarışır ve stok asla eksiye düşmez.
+
+Ödeme akışında bilet önce kısa ömürlü bir ``TicketHold`` ile ayrılır; ödeme
+onaylanırsa rezervasyon bilete dönüştürülür, onaylanmazsa süresi dolduğunda
+serbest bırakılır.
+
+Grup siparişlerinde (``purchase_order``) her koltuk ayrı bir bilettir; stok
+tek UPDATE ile düşülür ve biletler ``bulk_create`` ile yazılır.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import inventory
+from .models import DailySalesRollup, Ticket, TicketHold, TicketOrder
+
+
+class InsufficientTickets(Exception):
+    """Etkinlikte istenen adet kadar bilet kalmadı"""
+
+
+class HoldNotActive(Exception):
+    """Rezervasyon zaten onaylanmış ya da serbest bırakılmış"""
+
+
+def _acquire_or_raise(event, quantity, counter):
+    if quantity < 1:
+        raise ValueError('quantity must be positive')
+    shard_index = inventory.take(event, quantity, counter)
+    # Süresi dolmuş rezervasyonlar stoğu tutuyor olabilir; temizleyip bir kez daha dene
+    if shard_index is None and release_expired_holds(event=event):
+        shard_index = inventory.take(event, quantity, counter)
+    if shard_index is None:
+        raise InsufficientTickets(f'Not enough tickets left for event {event.pk}')
+    return shard_index
+
+
+def hold_tickets(event, user, quantity, ttl=None):
+    """Ödeme tamamlanana kadar biletleri kısa süreliğine ayırır"""
+    if ttl is None:
+        ttl = getattr(settings, 'TICKET_HOLD_TTL', 600)
+    with transaction.atomic():
+        shard_index = _acquire_or_raise(event, quantity, 'held_tickets')
+        return TicketHold.objects.create(
+            event=event,
+            user=user,
+            quantity=quantity,
+            shard_index=shard_index,
+            expires_at=timezone.now() + timedelta(seconds=ttl),
+        )
+
+
+def confirm_hold(hold, payment_intent_id=None):
+    """Aktif bir rezervasyonu bilete dönüştürür"""
+    with transaction.atomic():
+        # Durum geçişi koşullu olduğu için aynı rezervasyon iki kez onaylanamaz
+        claimed = TicketHold.objects.filter(pk=hold.pk, status='active').update(
+            status='confirmed'
+        )
+        if not claimed:
+            raise HoldNotActive(f'Hold {hold.pk} is no longer active')
+
+        inventory.convert_held(hold.event, hold.quantity, hold.shard_index)
+        ticket = Ticket(
+            event=hold.event,
+            user=hold.user,
+            quantity=hold.quantity,
+            total_price=hold.event.price * hold.quantity,
+            payment_intent_id=payment_intent_id,
+        )
+        ticket.save(track_inventory=False)
+
+        TicketHold.objects.filter(pk=hold.pk).update(ticket=ticket)
+        hold.status = 'confirmed'
+        hold.ticket = ticket
+        return ticket
+
+
+def release_hold(hold):
+    """Rezervasyonu iptal eder ve stoğu geri verir"""
+    with transaction.atomic():
+        released = TicketHold.objects.filter(pk=hold.pk, status='active').update(
+            status='released'
+        )
+        if released:
+            inventory.give_back(hold.event, hold.quantity, 'held_tickets', hold.shard_index)
+            hold.status = 'released'
+    return bool(released)
+
+
+def release_expired_holds(event=None, now=None):
+    """Süresi dolmuş aktif rezervasyonları serbest bırakır, bırakılan sayıyı döner"""
+    holds = TicketHold.objects.filter(
+        status='active',
+        expires_at__lte=now or timezone.now(),
+    )
+    if event is None:
+        holds = holds.select_related('event')
+    else:
+        holds = holds.filter(event=event)
+
+    released = 0
+    for hold in holds:
+        if event is not None:
+            hold.event = event
+        released += release_hold(hold)
+    return released
+
+
+def purchase_tickets(event, user, quantity, payment_intent_id=None):
+    """Rezervasyon adımı olmadan doğrudan satın alma"""
+    with transaction.atomic():
+        _acquire_or_raise(event, quantity, 'sold_tickets')
+        ticket = Ticket(
+            event=event,
+            user=user,
+            quantity=quantity,
+            total_price=event.price * quantity,
+            payment_intent_id=payment_intent_id,
+        )
+        ticket.save(track_inventory=False)
+        return ticket
+
+
+def purchase_order(event, user, quantity):
+    """
+    ``quantity`` adet ayrı taranabilir bileti tek işlemde oluşturur. Stok ve
+    satış özeti bilet başına değil sipariş başına bir kez güncellenir.
+    ``(sipariş, biletler)`` döner.
+    """
+    max_tickets = getattr(settings, 'BULK_ORDER_MAX_TICKETS', 5000)
+    if quantity > max_tickets:
+        raise ValueError(f'quantity must not exceed {max_tickets}')
+    with transaction.atomic():
+        _acquire_or_raise(event, quantity, 'sold_tickets')
+        order = TicketOrder.objects.create(
+            event=event,
+            user=user,
+            quantity=quantity,
+            total_price=event.price * quantity,
+        )
+        # Bilet numaraları (uuid4) nesne oluşturulurken üretilir; eklemeden sonra okuma gerekmez
+        tickets = Ticket.objects.bulk_create(
+            [
+                Ticket(event=event, user=user, order=order, quantity=1, total_price=event.price)
+                for _ in range(quantity)
+            ],
+            batch_size=getattr(settings, 'BULK_ORDER_BATCH_SIZE', 500),
+        )
+        DailySalesRollup.record(tickets[0], count=quantity)
+        return order, tickets
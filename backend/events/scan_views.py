@@ -0,0 +1,46 @@
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from .scanning import max_batch, scan_tickets
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def scan(request):
+    """
+    Kapı cihazlarından bilet okutma. Tek bilet (``ticket_number``) ya da toplu
+    (``ticket_numbers``) gönderilebilir; ``event`` verilirse başka etkinliğin
+    biletleri reddedilir. Yanıt girdiyle aynı sırada sonuç kodları ve giriş
+    hakları içerir: ``{"results": ["ok", "used"], "admit": [2, 0]}``
+    """
+    data = request.data
+    ticket_numbers = data.get('ticket_numbers')
+    if ticket_numbers is None and data.get('ticket_number'):
+        ticket_numbers = [data.get('ticket_number')]
+    if (
+        not isinstance(ticket_numbers, list)
+        or not ticket_numbers
+        or not all(isinstance(number, str) for number in ticket_numbers)
+    ):
+        return Response(
+            {'error': 'ticket_number veya ticket_numbers gerekli'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(ticket_numbers) > max_batch():
+        return Response(
+            {'error': f'Tek gönderimde en fazla {max_batch()} bilet okutulabilir'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    event_id = data.get('event')
+    if event_id is not None and not str(event_id).isdigit():
+        return Response(
+            {'error': 'Geçersiz etkinlik'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    results = scan_tickets([number.strip() for number in ticket_numbers], event_id)
+    return Response({
+        'results': [code for code, _ in results],
+        'admit': [admit for _, admit in results],
+    })
@@ -0,0 +1,69 @@
+"""
+Kapı girişlerinde bilet doğrulama.
+
+Her okutma tek sütunluk koşullu bir UPDATE'tir::
+
+    UPDATE ticket SET status = 'used'
+    WHERE ticket_number = %s AND status = 'active' AND NOT is_cancelled
+
+Aynı bilet iki kapıda aynı anda okutulsa da satırı yalnızca bir UPDATE
+değiştirebilir; diğeri 0 satır görür ve ``used`` sonucunu alır. Toplu
+gönderimler tek işlemde yazılır, reddedilen biletlerin nedeni tek SELECT ile
+bulunur.
+"""
+from django.conf import settings
+from django.db import transaction
+
+from .models import Ticket
+
+# Reddedilen biletlerde sonuç bunlardan biri ya da biletin durumudur (used, cancelled, expired)
+OK = 'ok'
+WRONG_EVENT = 'wrong_event'
+UNKNOWN = 'unknown'
+
+
+def max_batch():
+    return getattr(settings, 'GATE_SCAN_MAX_BATCH', 500)
+
+
+def scan_tickets(ticket_numbers, event_id=None):
+    """
+    Biletleri kullanılmış olarak işaretler. Girdiyle aynı sırada
+    ``(sonuç, giriş hakkı)`` çiftleri döner; giriş hakkı kabul edilen
+    biletin ``quantity`` değeridir, reddedilenlerde 0.
+    """
+    active = Ticket.objects.filter(status='active', is_cancelled=False)
+    if event_id is not None:
+        active = active.filter(event_id=event_id)
+
+    admitted = set()
+    with transaction.atomic():
+        # Satır kilitleri her gönderimde aynı sırayla alınır; ters sırada okutulan
+        # eşzamanlı gönderimler PostgreSQL'de birbirini kilitlemez (deadlock)
+        for number in sorted(set(ticket_numbers)):
+            if active.filter(ticket_number=number).update(status='used'):
+                admitted.add(number)
+
+        # Kabul edilenlerin giriş hakkı ve reddedilenlerin nedeni tek sorguda
+        rows = {
+            row[0]: row[1:]
+            for row in Ticket.objects.filter(ticket_number__in=set(ticket_numbers)).values_list(
+                'ticket_number', 'event_id', 'status', 'quantity'
+            )
+        }
+
+    results = []
+    seen = set()
+    for number in ticket_numbers:
+        row = rows.get(number)
+        if row is None:
+            results.append((UNKNOWN, 0))
+        elif number in admitted and number not in seen:
+            results.append((OK, row[2]))
+        elif event_id is not None and row[0] != int(event_id):
+            results.append((WRONG_EVENT, 0))
+        else:
+            # Daha önce (ya da aynı gönderimde) okutulmuş, iptal edilmiş veya süresi geçmiş
+            results.append((row[1] if row[1] != 'active' else 'used', 0))
+        seen.add(number)
+    return results
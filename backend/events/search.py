@@ -0,0 +1,150 @@
+"""
+Etkinlik tam metin araması.
+
+``title``, ``description`` ve ``location`` alanları için tokenize edilmiş bir
+indeks tutulur:
+
+* PostgreSQL: ``to_tsvector`` ifadesi üzerinde GIN indeksi
+* SQLite: FTS5 tablosu; ``events_event`` üzerindeki tetikleyicilerle her
+  kayıt/güncelleme/silmede senkron tutulur
+
+Sonuçlar alaka düzeyine göre (``ts_rank`` / ``bm25``) sıralanır ve her kelime
+önek olarak eşleşir (``konse`` -> ``konser``). Diğer veritabanlarında
+``icontains`` aramasına düşülür. Arama, sonuçları başka bir sıraya sokacak
+keyset (``cursor``) sayfalamayla birlikte kullanılamaz (400).
+"""
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+from rest_framework.exceptions import ValidationError
+
+FTS_TABLE = 'events_event_fts'
+PG_INDEX = 'events_event_search_idx'
+# Sorgu, indeks ifadesiyle birebir aynı olmalı; JOIN'lerde belirsizlik olmasın diye tablo adı eklenir
+PG_VECTOR = (
+    "to_tsvector('simple', coalesce({table}title, '') || ' ' || "
+    "coalesce({table}description, '') || ' ' || coalesce({table}location, ''))"
+)
+MAX_TERMS = 8
+
+SQLITE_TRIGGERS = {
+    f'{FTS_TABLE}_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON events_event BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, title, description, location)
+            VALUES (new.id, new.title, new.description, new.location);
+        END
+    """,
+    f'{FTS_TABLE}_ad': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON events_event BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, location)
+            VALUES ('delete', old.id, old.title, old.description, old.location);
+        END
+    """,
+    f'{FTS_TABLE}_au': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+        AFTER UPDATE OF title, description, location ON events_event BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, location)
+            VALUES ('delete', old.id, old.title, old.description, old.location);
+            INSERT INTO {FTS_TABLE}(rowid, title, description, location)
+            VALUES (new.id, new.title, new.description, new.location);
+        END
+    """,
+}
+
+
+def install(connection):
+    """
+    Arama indeksini oluşturur. Idempotent'tir; SQLite tablo yeniden
+    oluşturulduğunda (ör. sonraki bir AddField migration'ı) düşen
+    tetikleyicileri geri kurar ve indeksi yeniden doldurur.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {PG_INDEX} ON events_event USING GIN ({PG_VECTOR.format(table="")})'
+            )
+        elif connection.vendor == 'sqlite':
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+                [f'{FTS_TABLE}_%'],
+            )
+            existing = {row[0] for row in cursor.fetchall()}
+            if existing == set(SQLITE_TRIGGERS):
+                return
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5('
+                "title, description, location, content='events_event', content_rowid='id', "
+                "tokenize='unicode61 remove_diacritics 2')"
+            )
+            for sql in SQLITE_TRIGGERS.values():
+                cursor.execute(sql)
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def uninstall(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f'DROP INDEX IF EXISTS {PG_INDEX}')
+        elif connection.vendor == 'sqlite':
+            for name in SQLITE_TRIGGERS:
+                cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def search_terms(text):
+    return re.findall(r'\w+', text.lower())[:MAX_TERMS]
+
+
+def search_events(queryset, text):
+    """``queryset``'i arama metnine göre filtreler ve alaka düzeyine göre sıralar"""
+    terms = search_terms(text)
+    if not terms:
+        return queryset
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        query = ' & '.join(f'{term}:*' for term in terms)
+        vector = PG_VECTOR.format(table='events_event.')
+        matches = RawSQL(
+            f"{vector} @@ to_tsquery('simple', %s)", [query], output_field=BooleanField()
+        )
+        rank = RawSQL(
+            f"ts_rank({vector}, to_tsquery('simple', %s))", [query], output_field=FloatField()
+        )
+        return queryset.filter(matches).annotate(search_rank=rank).order_by('-search_rank', '-id')
+
+    if vendor == 'sqlite':
+        query = ' '.join(f'"{term}"*' for term in terms)
+        matched_ids = RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [query])
+        # bm25 daha alakalı sonuçlar için daha küçük (negatif) değer döner
+        rank = RawSQL(
+            f'SELECT bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = events_event.id',
+            [query],
+            output_field=FloatField(),
+        )
+        return queryset.filter(id__in=matched_ids).annotate(search_rank=rank).order_by('search_rank', '-id')
+
+    condition = Q()
+    for term in terms:
+        condition &= (
+            Q(title__icontains=term) | Q(description__icontains=term) | Q(location__icontains=term)
+        )
+    return queryset.filter(condition)
+
+
+class EventSearchFilter(filters.SearchFilter):
+    """``?search=`` parametresini tam metin indeksine yönlendirir"""
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '')
+        # Keyset sayfalama kendi sıralamasını uygular; alaka sıralaması kaybolurdu
+        paginator = getattr(view, 'paginator', None)
+        if search_terms(text) and getattr(paginator, 'use_keyset', None) and paginator.use_keyset(request):
+            raise ValidationError({
+                self.search_param: 'Arama sonuçları alaka sırasıyla döner; sayfa numarasıyla sayfalanabilir.'
+            })
+        return search_events(queryset, text)
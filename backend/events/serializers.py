@@ -1,5 +1,9 @@
 from rest_framework import serializers
-from .models import Category, Event, Ticket
+from rest_framework.exceptions import PermissionDenied
+from django.conf import settings
+from .models import Category, Event, Ticket, TicketOrder
+from .reservations import InsufficientTickets, purchase_order, purchase_tickets
+from .waiting_room import AdmissionRequired, check_admission, pass_from
 
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -24,7 +28,7 @@ class EventDetailSerializer(serializers.ModelSerializer):
         model = Event
         fields = ['id', 'title', 'slug', 'description', 'image', 'date', 'time', 
                  'location', 'category', 'price', 'available_tickets', 
-                 'remaining_tickets', 'is_active', 'created_at', 'updated_at']
+                 'remaining_tickets', 'is_active', 'admission_rate', 'created_at', 'updated_at']
 
 class TicketSerializer(serializers.ModelSerializer):
     event = EventListSerializer(read_only=True)
@@ -33,26 +37,62 @@ class TicketSerializer(serializers.ModelSerializer):
         model = Ticket
         fields = ['id', 'ticket_number', 'event', 'purchase_date', 'quantity', 
                  'total_price', 'status', 'is_cancelled']
+        read_only_fields = ['quantity', 'total_price', 'status', 'is_cancelled']
+
+def admit(event, request):
+    # Bekleme odası olan etkinlikte satın alma geçiş kartı ister
+    try:
+        check_admission(event, request.user, pass_from(request))
+    except AdmissionRequired:
+        raise PermissionDenied("Satın almak için bekleme odasında sıranızı bekleyin.")
 
 class TicketPurchaseSerializer(serializers.ModelSerializer):
     class Meta:
         model = Ticket
         fields = ['event', 'quantity']
     
+    def validate_quantity(self, value):
+        if value < 1:
+            raise serializers.ValidationError("En az bir bilet seçilmelidir.")
+        return value
+    
     def create(self, validated_data):
         event = validated_data['event']
         quantity = validated_data['quantity']
-        user = self.context['request'].user
-        
-        # Calculate total price
-        total_price = event.price * quantity
+        request = self.context['request']
+        user = request.user
+        admit(event, request)
         
-        # Create ticket
-        ticket = Ticket.objects.create(
-            event=event,
-            user=user,
-            quantity=quantity,
-            total_price=total_price
-        )
-        
-        return ticket
+        # Stok koşullu atomik güncelleme ile düşülür, fazla satış olmaz
+        try:
+            return purchase_tickets(event, user, quantity)
+        except InsufficientTickets:
+            raise serializers.ValidationError({'quantity': "Yeterli bilet yok."})
+
+class TicketOrderSerializer(serializers.ModelSerializer):
+    # Yanıt sadece bilet numaralarını içerir; bin biletlik siparişte iç içe etkinlik tekrarlanmaz
+    ticket_numbers = serializers.ListField(child=serializers.CharField(), read_only=True)
+    
+    class Meta:
+        model = TicketOrder
+        fields = ['id', 'event', 'quantity', 'total_price', 'created_at', 'ticket_numbers']
+        read_only_fields = ['total_price', 'created_at']
+    
+    def validate_quantity(self, value):
+        if value < 1:
+            raise serializers.ValidationError("En az bir bilet seçilmelidir.")
+        max_tickets = getattr(settings, 'BULK_ORDER_MAX_TICKETS', 5000)
+        if value > max_tickets:
+            raise serializers.ValidationError(f"Tek siparişte en fazla {max_tickets} bilet alınabilir.")
+        return value
+    
+    def create(self, validated_data):
+        request = self.context['request']
+        user = request.user
+        admit(validated_data['event'], request)
+        try:
+            order, tickets = purchase_order(validated_data['event'], user, validated_data['quantity'])
+        except InsufficientTickets:
+            raise serializers.ValidationError({'quantity': "Yeterli bilet yok."})
+        order.ticket_numbers = [str(ticket.ticket_number) for ticket in tickets]
+        return order
@@ -0,0 +1,101 @@
+"""
+Admin paneli istatistikleri.
+
+Bilet rakamları ``Ticket`` tablosu yerine önceden toplanmış
+``DailySalesRollup`` satırlarından okunur; genel ve son 30 günlük rakamlar
+koşullu aggregate ile, aylık gelir ``TruncMonth`` gruplaması ile tek sorguda
+hesaplanır. Böylece panel gecikmesi toplam bilet geçmişinden bağımsızdır.
+Bilet sayıları ``Ticket`` satırlarını sayar (``quantity`` toplamını değil);
+rollup öncesindeki sorgularla aynı anlamdadır.
+"""
+from datetime import date, timedelta
+
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+from .models import Category, DailySalesRollup, Event
+
+NET_TICKETS = F('tickets') - F('cancellations')
+NET_REVENUE = F('revenue') - F('cancelled_revenue')
+
+def _months_back(day, months):
+    # Ayın ilk günü; takvim ayı bazında geriye gider
+    index = day.year * 12 + day.month - 1 - months
+    return date(index // 12, index % 12 + 1, 1)
+
+def _net_tickets_by(field):
+    totals = DailySalesRollup.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+        field
+    ).annotate(total=Sum(NET_TICKETS)).values('total')
+    return Coalesce(Subquery(totals, output_field=IntegerField()), 0)
+
+def _overview_aggregates(now):
+    now = now or timezone.now()
+    since = now - timedelta(days=30)
+    recent = Q(day__gte=timezone.localdate(since))
+    return (
+        (Event.objects, {
+            'total_events': Count('id'),
+            'active_events': Count('id', filter=Q(is_active=True)),
+            'recent_events': Count('id', filter=Q(created_at__gte=since)),
+        }),
+        (DailySalesRollup.objects, {
+            'total_tickets_sold': Sum(NET_TICKETS),
+            'total_revenue': Sum(NET_REVENUE),
+            'recent_tickets': Sum(NET_TICKETS, filter=recent),
+            'recent_revenue': Sum(NET_REVENUE, filter=recent),
+        }),
+    )
+
+def _overview_result(events, tickets):
+    return {
+        **events,
+        'total_tickets_sold': tickets['total_tickets_sold'] or 0,
+        'total_revenue': float(tickets['total_revenue'] or 0),
+        'recent_tickets': tickets['recent_tickets'] or 0,
+        'recent_revenue': float(tickets['recent_revenue'] or 0),
+    }
+
+def overview_stats(now=None):
+    """Etkinlik ve bilet sayıları ile gelirler (iki sorgu)"""
+    events, tickets = (
+        queryset.aggregate(**aggregates) for queryset, aggregates in _overview_aggregates(now)
+    )
+    return _overview_result(events, tickets)
+
+async def aoverview_stats(now=None):
+    """``overview_stats``'ın async ORM ile çalışan karşılığı"""
+    (events_qs, event_aggregates), (tickets_qs, ticket_aggregates) = _overview_aggregates(now)
+    events = await events_qs.aaggregate(**event_aggregates)
+    tickets = await tickets_qs.aaggregate(**ticket_aggregates)
+    return _overview_result(events, tickets)
+
+def monthly_revenue(months=12, now=None):
+    """Son ``months`` takvim ayının geliri, en yeni ay başta (tek sorgu)"""
+    today = timezone.localdate(now or timezone.now())
+    rows = DailySalesRollup.objects.filter(
+        day__gte=_months_back(today, months - 1)
+    ).annotate(
+        month=TruncMonth('day')
+    ).order_by().values('month').annotate(revenue=Sum(NET_REVENUE))
+    revenue = {row['month'].strftime('%Y-%m'): row['revenue'] for row in rows}
+
+    result = []
+    for i in range(months):
+        month = _months_back(today, i).strftime('%Y-%m')
+        result.append({'month': month, 'revenue': float(revenue.get(month) or 0)})
+    return result
+
+def category_stats():
+    """Kategori başına etkinlik ve satılan bilet sayısı"""
+    return Category.objects.annotate(
+        event_count=Count('events'),
+        ticket_count=_net_tickets_by('category'),
+    ).values('name', 'event_count', 'ticket_count')
+
+def popular_events(limit=5):
+    """En çok bilet satan etkinlikler"""
+    return Event.objects.for_listing().annotate(
+        ticket_count=_net_tickets_by('event')
+    ).order_by('-ticket_count')[:limit]
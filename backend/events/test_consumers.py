@@ -0,0 +1,313 @@
+import asyncio
+import json
+
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from channels.layers import get_channel_layer
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from .broadcast import Coalescer, coalescer, flush, get_snapshot, group_name
+from .consumers import EventConsumer, QueueConsumer
+from .inventory import configure_shards
+from .metrics import registry
+from .dashboard import GROUP, LEADER_KEY, DashboardPublisher
+from .models import Ticket
+from .reservations import hold_tickets, purchase_tickets
+from . import waiting_room
+from .test_reservations import create_event
+
+IN_MEMORY_LAYER = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYER, INVENTORY_BROADCAST_WINDOW=0)
+class InventoryBroadcastTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        EventConsumer.snapshots.clear()
+        self.event = create_event(available_tickets=10)
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.layer = get_channel_layer()
+        self.channel = async_to_sync(self.layer.new_channel)()
+        async_to_sync(self.layer.group_add)(group_name(self.event.pk), self.channel)
+
+    def receive(self):
+        return async_to_sync(self.layer.receive)(self.channel)
+
+    def test_purchase_and_cancel_publish_after_commit(self):
+        get_snapshot(self.event.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket = purchase_tickets(self.event, self.user, 3)
+        message = self.receive()
+        self.assertEqual(message['type'], 'ticket_purchased')
+        self.assertEqual(
+            (message['ticket_count'], message['remaining_tickets'], message['quantity']),
+            (3, 7, 3)
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Ticket.objects.get(pk=ticket.pk).cancel()
+        message = self.receive()
+        self.assertEqual(message['type'], 'ticket_count')
+        self.assertEqual((message['ticket_count'], message['remaining_tickets']), (0, 10))
+
+    def test_holds_change_remaining_only(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            hold_tickets(self.event, self.user, 4)
+        message = self.receive()
+        self.assertEqual(message['type'], 'ticket_count')
+        self.assertEqual((message['ticket_count'], message['remaining_tickets']), (0, 6))
+
+    def test_nothing_is_published_before_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            purchase_tickets(self.event, self.user, 1)
+        self.assertNotIn(self.channel, self.layer.channels)
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.receive()['remaining_tickets'], 9)
+
+    def test_snapshot_is_loaded_once(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(get_snapshot(self.event.pk)['remaining_tickets'], 10)
+        with self.assertNumQueries(0):
+            get_snapshot(self.event.pk)
+
+    def watch(self, *messages):
+        """Bağlanır, verilen mesajları gönderir ve gelen tüm kareleri döner"""
+        scope = {
+            'type': 'websocket',
+            'path': f'/ws/event/{self.event.pk}/',
+            'headers': [],
+            'subprotocols': [],
+            'url_route': {'kwargs': {'event_id': str(self.event.pk)}},
+        }
+
+        async def session():
+            # channels.testing daphne gerektirdiği için ASGI iletişimi doğrudan yürütülür
+            communicator = ApplicationCommunicator(EventConsumer.as_asgi(), scope)
+            await communicator.send_input({'type': 'websocket.connect'})
+            self.assertEqual((await communicator.receive_output())['type'], 'websocket.accept')
+            frames = [json.loads((await communicator.receive_output())['text'])]
+            for message in messages:
+                await communicator.send_input({'type': 'websocket.receive', 'text': json.dumps(message)})
+                frames.append(json.loads((await communicator.receive_output())['text']))
+            await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+            await communicator.wait()
+            return frames
+
+        return async_to_sync(session)()
+
+    def test_connect_served_from_snapshot(self):
+        get_snapshot(self.event.pk)
+        with self.assertNumQueries(0):
+            first, second = self.watch({'type': 'get_ticket_count'})
+        self.assertEqual(first, second)
+        self.assertEqual(first['remaining_tickets'], 10)
+
+    def test_cold_connect_uses_one_query_per_message(self):
+        self.event = configure_shards(self.event, 4)
+        hold_tickets(self.event, self.user, 3)
+        cache.clear()
+
+        # Bağlantı: görüntü için bir sorgu; join_event: bilgi ve sayaçlar için bir sorgu
+        with self.assertNumQueries(2):
+            count, info = self.watch({'type': 'join_event'})
+        self.assertEqual(count['remaining_tickets'], 7)
+        self.assertEqual(info['event']['remaining_tickets'], 7)
+        self.assertEqual(info['event']['title'], self.event.title)
+
+def purchase_message(sold, remaining):
+    return {
+        'type': 'ticket_purchased',
+        'ticket_count': sold,
+        'remaining_tickets': remaining,
+        'quantity': 1,
+    }
+
+class CoalescingTest(TestCase):
+    def test_updates_within_window_are_merged(self):
+        pending = Coalescer()
+        self.assertTrue(pending.add(1, purchase_message(1, 9), window=0.1, now=0))
+        self.assertFalse(pending.add(1, purchase_message(2, 8), window=0.1, now=0.05))
+        pending.add(1, {'type': 'ticket_count', 'ticket_count': 2, 'remaining_tickets': 9}, window=0.1, now=0.06)
+        pending.add(2, purchase_message(1, 4), window=0.1, now=0.08)
+
+        self.assertEqual(pending.pop_due(now=0.09), [])
+        self.assertEqual(pending.pop_due(now=0.1), [(1, {
+            'type': 'ticket_purchased',
+            'ticket_count': 2,
+            'remaining_tickets': 9,
+            'quantity': 2,
+        })])
+        self.assertEqual(pending.next_deadline(), 0.18)
+
+    @override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYER, INVENTORY_BROADCAST_WINDOW=60)
+    def test_flash_sale_sends_one_group_message_per_window(self):
+        cache.clear()
+        event = create_event(available_tickets=10)
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        layer = get_channel_layer()
+        channel = async_to_sync(layer.new_channel)()
+        async_to_sync(layer.group_add)(group_name(event.pk), channel)
+
+        get_snapshot(event.pk)
+        for _ in range(3):
+            with self.captureOnCommitCallbacks(execute=True):
+                purchase_tickets(event, user, 1)
+        self.assertNotIn(channel, layer.channels)
+
+        flush()
+        message = async_to_sync(layer.receive)(channel)
+        self.assertEqual(
+            (message['type'], message['ticket_count'], message['remaining_tickets'], message['quantity']),
+            ('ticket_purchased', 3, 7, 3)
+        )
+        self.assertNotIn(channel, layer.channels)
+        self.assertIsNone(coalescer.next_deadline())
+
+    def test_slow_client_gets_latest_frame_only(self):
+        consumer = EventConsumer()
+        consumer.event_id = '1'
+        consumer.pending_frame = None
+        consumer.sender = None
+        consumer.dropped_frames = 0
+        frames = []
+
+        async def scenario():
+            gate = asyncio.Event()
+
+            async def slow_send(text_data):
+                frames.append(json.loads(text_data))
+                await gate.wait()
+
+            consumer.send = slow_send
+            for sold in range(1, 6):
+                await consumer.ticket_purchased(purchase_message(sold, 10 - sold))
+                await asyncio.sleep(0)
+            gate.set()
+            await consumer.sender
+
+        async_to_sync(scenario)()
+        self.assertEqual(consumer.dropped_frames, 3)
+        self.assertEqual([frame['remaining_tickets'] for frame in frames], [9, 5])
+        self.assertEqual(frames[1]['quantity'], 4)
+        self.assertEqual(EventConsumer.snapshots.pop('1')['remaining_tickets'], 5)
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYER)
+class DashboardPublisherTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.event = create_event(available_tickets=10)
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.publisher = DashboardPublisher()
+        self.layer = get_channel_layer()
+        self.channel = async_to_sync(self.layer.new_channel)()
+        async_to_sync(self.layer.group_add)(GROUP, self.channel)
+
+    def test_concurrent_requests_share_one_computation(self):
+        async def many_admins():
+            return await asyncio.gather(*(self.publisher.get_stats() for _ in range(20)))
+
+        # overview_stats iki sorgu çalıştırır; 20 istek için de iki sorgu
+        with self.assertNumQueries(2):
+            results = async_to_sync(many_admins)()
+        self.assertEqual(len({json.dumps(stats, sort_keys=True) for stats in results}), 1)
+        with self.assertNumQueries(0):
+            async_to_sync(self.publisher.get_stats)()
+
+    def test_refresh_broadcasts_only_on_change(self):
+        self.assertTrue(async_to_sync(self.publisher.refresh)())
+        message = async_to_sync(self.layer.receive)(self.channel)
+        self.assertEqual(message['type'], 'stats_updated')
+        self.assertEqual(message['stats']['total_tickets_sold'], 0)
+
+        self.assertFalse(async_to_sync(self.publisher.refresh)())
+        self.assertNotIn(self.channel, self.layer.channels)
+
+        purchase_tickets(self.event, self.user, 2)
+        self.assertTrue(async_to_sync(self.publisher.refresh)())
+        message = async_to_sync(self.layer.receive)(self.channel)
+        self.assertEqual(message['stats']['total_tickets_sold'], 1)
+
+    def test_single_leader_across_processes(self):
+        other = DashboardPublisher()
+        self.assertTrue(async_to_sync(self.publisher.is_leader)())
+        self.assertFalse(async_to_sync(other.is_leader)())
+        self.assertTrue(async_to_sync(self.publisher.is_leader)())
+
+        # Lider bırakınca (kira düşünce) diğeri devralır
+        cache.delete(LEADER_KEY)
+        self.assertTrue(async_to_sync(other.is_leader)())
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYER)
+class QueueConsumerTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.event = create_event(available_tickets=10)
+        self.event.admission_rate = 1
+        self.event.save()
+        self.users = [
+            User.objects.create_user(username=f'buyer{i}', password='testpass123')
+            for i in range(2)
+        ]
+
+    def scope(self, user):
+        return {
+            'type': 'websocket',
+            'path': f'/ws/event/{self.event.pk}/queue/',
+            'headers': [],
+            'subprotocols': [],
+            'user': user,
+            'url_route': {'kwargs': {'event_id': str(self.event.pk)}},
+        }
+
+    def test_position_is_pushed_until_admitted(self):
+        # İlk kullanıcı içeride; ikinci kullanıcı bir sonraki turu bekler
+        waiting_room.join(self.event.pk, self.users[0].pk)
+        waiting_room.advance(self.event.pk, 1)
+
+        async def session():
+            communicator = ApplicationCommunicator(QueueConsumer.as_asgi(), self.scope(self.users[1]))
+            await communicator.send_input({'type': 'websocket.connect'})
+            self.assertEqual((await communicator.receive_output())['type'], 'websocket.accept')
+            waiting = json.loads((await communicator.receive_output())['text'])
+
+            await get_channel_layer().group_send(
+                waiting_room.group_name(self.event.pk),
+                {'type': 'queue_advanced', 'admitted_through': 2}
+            )
+            admitted = json.loads((await communicator.receive_output())['text'])
+            await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+            await communicator.wait()
+            return waiting, admitted
+
+        waiting, admitted = async_to_sync(session)()
+        self.assertEqual(waiting, {'type': 'queue_position', 'number': 2, 'position': 1, 'admitted': False})
+        self.assertEqual(admitted['type'], 'admitted')
+        waiting_room.check_admission(self.event, self.users[1], admitted['pass'])
+        self.assertEqual(waiting_room.gatekeeper.rooms, {})
+
+    def test_anonymous_connection_is_closed(self):
+        async def session():
+            communicator = ApplicationCommunicator(QueueConsumer.as_asgi(), self.scope(None))
+            await communicator.send_input({'type': 'websocket.connect'})
+            return await communicator.receive_output()
+
+        self.assertEqual(async_to_sync(session)()['type'], 'websocket.close')
+
+    def test_handlers_are_recorded(self):
+        def count(handler):
+            series = registry.consumer_duration.series.get(('QueueConsumer', handler))
+            return sum(series[:-1]) if series else 0
+
+        before = count('websocket_connect'), count('queue_advanced')
+        self.test_position_is_pushed_until_admitted()
+        self.assertEqual(count('websocket_connect'), before[0] + 1)
+        self.assertEqual(count('queue_advanced'), before[1] + 1)
+        # Bağlanırken etkinlik okunur
+        self.assertGreater(registry.consumer_queries.series[('QueueConsumer', 'websocket_connect')][-1], 0)
@@ -1,8 +1,13 @@
 from django.test import TestCase
+from django.db import connection
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
-from .models import Category, Event, Ticket
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.utils import timezone
+from .models import Category, DailySalesRollup, Event, Ticket
 from decimal import Decimal
+from io import StringIO
 
 class CategoryModelTest(TestCase):
     def setUp(self):
@@ -158,3 +163,215 @@ class TicketModelTest(TestCase):
         # Should be ordered by purchase_date descending
         self.assertEqual(tickets[0], ticket2)  # More recent first
         self.assertEqual(tickets[1], self.ticket)
+
+class SoldTicketsCounterTest(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(
+            name='Test Category',
+            slug='test-category'
+        )
+        self.event = Event.objects.create(
+            title='Test Event',
+            slug='test-event',
+            description='Test description',
+            date='2024-12-31',
+            time='20:00:00',
+            location='Test Location',
+            category=self.category,
+            price=Decimal('100.00'),
+            available_tickets=100
+        )
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+
+    def test_counter_tracks_creation_and_cancel(self):
+        ticket = Ticket.objects.create(
+            event=self.event,
+            user=self.user,
+            quantity=3,
+            total_price=Decimal('300.00')
+        )
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.sold_tickets, 3)
+
+        ticket.cancel()
+        ticket.cancel()  # İkinci iptal sayacı tekrar düşürmemeli
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.sold_tickets, 0)
+        self.assertEqual(self.event.remaining_tickets, 100)
+
+    def test_remaining_tickets_does_not_query(self):
+        event = Event.objects.get(pk=self.event.pk)
+        with self.assertNumQueries(0):
+            event.remaining_tickets
+
+    def test_rebuild_ticket_counters_command(self):
+        Ticket.objects.create(
+            event=self.event,
+            user=self.user,
+            quantity=4,
+            total_price=Decimal('400.00')
+        )
+        Event.objects.filter(pk=self.event.pk).update(sold_tickets=0)
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_ticket_counters', '--check', stdout=StringIO())
+
+        call_command('rebuild_ticket_counters', stdout=StringIO())
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.sold_tickets, 4)
+        call_command('rebuild_ticket_counters', '--check', stdout=StringIO())
+
+class DailySalesRollupTest(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(
+            name='Test Category',
+            slug='test-category'
+        )
+        self.event = Event.objects.create(
+            title='Test Event',
+            slug='test-event',
+            description='Test description',
+            date='2024-12-31',
+            time='20:00:00',
+            location='Test Location',
+            category=self.category,
+            price=Decimal('100.00'),
+            available_tickets=100
+        )
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+
+    def create_ticket(self, quantity=1):
+        return Ticket.objects.create(
+            event=self.event,
+            user=self.user,
+            quantity=quantity,
+            total_price=self.event.price * quantity
+        )
+
+    def test_rollup_tracks_sales_and_cancellations(self):
+        self.create_ticket(2)
+        ticket = self.create_ticket(1)
+        ticket.cancel()
+
+        rollup = DailySalesRollup.objects.get(event=self.event)
+        self.assertEqual(rollup.category, self.category)
+        self.assertEqual(rollup.day, timezone.localdate(ticket.purchase_date))
+        self.assertEqual(rollup.tickets, 2)
+        self.assertEqual(rollup.quantity, 3)
+        self.assertEqual(rollup.revenue, Decimal('300.00'))
+        self.assertEqual(rollup.cancellations, 1)
+        self.assertEqual(rollup.cancelled_quantity, 1)
+        self.assertEqual(rollup.cancelled_revenue, Decimal('100.00'))
+
+    def test_rebuild_sales_rollup_backfill_and_compact(self):
+        self.create_ticket(1)
+        self.create_ticket(3).cancel()
+        rollup = DailySalesRollup.objects.get()
+        self.assertEqual(
+            (rollup.tickets, rollup.quantity, rollup.cancellations, rollup.cancelled_quantity),
+            (2, 4, 1, 3)
+        )
+        DailySalesRollup.objects.all().delete()
+
+        call_command('rebuild_sales_rollup', stdout=StringIO())
+        rebuilt = DailySalesRollup.objects.get()
+        self.assertEqual(
+            (rebuilt.tickets, rebuilt.quantity, rebuilt.revenue,
+             rebuilt.cancellations, rebuilt.cancelled_quantity, rebuilt.cancelled_revenue),
+            (rollup.tickets, rollup.quantity, rollup.revenue,
+             rollup.cancellations, rollup.cancelled_quantity, rollup.cancelled_revenue)
+        )
+
+        DailySalesRollup.objects.create(
+            event=self.event,
+            category=self.category,
+            day=rebuilt.day,
+            bucket=1,
+            tickets=5,
+            quantity=7,
+            revenue=Decimal('500.00')
+        )
+        call_command('rebuild_sales_rollup', '--compact', stdout=StringIO())
+        compacted = DailySalesRollup.objects.get()
+        self.assertEqual(compacted.tickets, rebuilt.tickets + 5)
+        self.assertEqual(compacted.quantity, rebuilt.quantity + 7)
+        self.assertEqual(compacted.revenue, rebuilt.revenue + Decimal('500.00'))
+
+class QueryPlanTest(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Test Category', slug='test-category')
+        self.event = Event.objects.create(
+            title='Test Konser',
+            slug='test-konser',
+            description='Test description',
+            date='2024-12-31',
+            time='20:00:00',
+            location='Test Location',
+            category=category,
+            price=Decimal('100.00'),
+            available_tickets=100
+        )
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        Ticket.objects.create(
+            event=self.event,
+            user=user,
+            quantity=1,
+            total_price=Decimal('100.00')
+        )
+
+    def test_canonical_queries_avoid_sequential_scans(self):
+        out = StringIO()
+        call_command('explain_queries', '--fail', '--verbose-plans', stdout=out)
+        if connection.vendor == 'sqlite':
+            self.assertIn('event_active_listing_idx', out.getvalue())
+            self.assertIn('ticket_user_active_idx', out.getvalue())
+        # Komut yakaladığı değişiklikleri geri alır
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.sold_tickets, 1)
+        self.assertEqual(Ticket.objects.count(), 1)
+
+class GenerateDataTest(TestCase):
+    options = {
+        'events': 30, 'users': 20, 'tickets': 500, 'categories': 3,
+        'seed': 7, 'start_date': '2025-06-01', 'batch_size': 50, 'commit_every': 200,
+    }
+
+    def generate(self, **options):
+        call_command('generate_data', stdout=StringIO(), **{**self.options, **options})
+        return list(Ticket.objects.order_by('ticket_number').values_list(
+            'ticket_number', 'event__slug', 'user__username', 'purchase_date', 'quantity', 'status'
+        ))
+
+    def test_counters_and_rollup_match_tickets(self):
+        self.generate()
+        self.assertEqual(Ticket.objects.count(), 500)
+        self.assertEqual(Event.objects.count(), 30)
+        self.assertTrue(Ticket.objects.filter(is_cancelled=True, status='cancelled').exists())
+        self.assertFalse(Ticket.objects.filter(purchase_date__gt=timezone.make_aware(
+            timezone.datetime(2025, 6, 2)
+        )).exists())
+        # Satış sayaçları ve rollup bilet tablosuyla tutarlı
+        call_command('rebuild_ticket_counters', '--check', stdout=StringIO())
+        self.assertEqual(
+            sum(DailySalesRollup.objects.values_list('tickets', flat=True)),
+            Ticket.objects.count()
+        )
+        self.assertEqual(
+            sum(DailySalesRollup.objects.values_list('quantity', flat=True)),
+            sum(Ticket.objects.values_list('quantity', flat=True))
+        )
+
+    def test_same_seed_same_data(self):
+        first = self.generate()
+        with self.assertRaises(CommandError):
+            self.generate()
+        self.assertEqual(self.generate(flush=True), first)
+        self.assertNotEqual(self.generate(flush=True, seed=8), first)
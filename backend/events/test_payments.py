@@ -0,0 +1,433 @@
+import asyncio
+import json
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .fake_stripe import FakeStripe
+from .models import Event, PaymentCustomer, PaymentEvent, Ticket, TicketHold
+from .payment_events import SignatureError, issue_ticket, process_pending, sign, verify_signature
+from .payment_customers import CustomerDirectory, directory
+from .payment_gateway import GatewayUnavailable, PaymentError, StripeGateway
+from .payment_views import create_payment_intent
+from .reservations import hold_tickets, release_hold
+from .test_reservations import create_event
+from .waiting_room import issue_pass
+
+class FakeStripeTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.fake = FakeStripe().start()
+        cls.addClassCleanup(cls.fake.stop)
+
+    def setUp(self):
+        self.fake.failures.clear()
+        self.fake.requests.clear()
+        self.fake.objects.clear()
+        self.fake.replies.clear()
+        self.fake.inflight.clear()
+        self.fake.latency = 0
+        settings_override = override_settings(
+            STRIPE_API_BASE=self.fake.url,
+            STRIPE_SECRET_KEY='sk_test_fake',
+            STRIPE_TIMEOUT=2,
+            STRIPE_MAX_RETRIES=2,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+class StripeGatewayTest(FakeStripeTestCase):
+    def setUp(self):
+        super().setUp()
+        self.gateway = StripeGateway()
+        self.gateway.retry_base_delay = 0.01
+        self.addCleanup(self.gateway.close)
+
+    def create_intent(self, **kwargs):
+        return async_to_sync(self.gateway.create_payment_intent)(
+            amount=1000, currency='try', metadata={'hold_id': 1}, **kwargs
+        )
+
+    def test_server_errors_are_retried_with_same_idempotency_key(self):
+        self.fake.fail_next(503, 500)
+        intent = self.create_intent()
+        self.assertEqual(intent['metadata'], {'hold_id': '1'})
+
+        attempts = [r for r in self.fake.requests if r[:2] == ('POST', '/v1/payment_intents')]
+        self.assertEqual(len(attempts), 3)
+        self.assertEqual(len({key for _, _, key in attempts}), 1)
+
+    def test_lost_response_does_not_create_second_intent(self):
+        # İlk deneme işlenir ama yanıtı kaybolur; tekrar deneme aynı sonucu alır
+        self.fake.fail_next('drop')
+        intent = self.create_intent(idempotency_key='hold-1')
+        intents = [obj for obj in self.fake.objects.values() if obj['id'] == intent['id']]
+        self.assertEqual(len(intents), 1)
+        self.assertEqual(self.fake.count('POST', '/v1/payment_intents'), 2)
+
+    def test_client_errors_are_not_retried(self):
+        with self.assertRaises(PaymentError) as raised:
+            async_to_sync(self.gateway.retrieve_payment_intent)('pi_missing')
+        self.assertNotIsInstance(raised.exception, GatewayUnavailable)
+        self.assertEqual(raised.exception.code, 'resource_missing')
+        self.assertEqual(self.fake.count('GET', '/v1/payment_intents/pi_missing'), 1)
+
+    def test_retries_give_up_after_max_retries(self):
+        self.fake.fail_next(503, 503, 503, 503)
+        with self.assertRaises(GatewayUnavailable):
+            self.create_intent()
+        self.assertEqual(self.fake.count('POST', '/v1/payment_intents'), 3)
+
+    @override_settings(STRIPE_TIMEOUT=0.2)
+    def test_slow_gateway_hits_the_deadline(self):
+        self.fake.latency = 1
+        started = time.monotonic()
+        with self.assertRaises(GatewayUnavailable):
+            self.create_intent()
+        self.assertLess(time.monotonic() - started, 0.8)
+
+    def test_connections_are_reused(self):
+        # Her async_to_sync çağrısı ayrı bir event loop açar; istemci ve havuz yine ortaktır
+        for _ in range(3):
+            async_to_sync(self.gateway.find_customer)('nobody@example.com')
+        self.gateway.call(self.gateway.find_customer, 'nobody@example.com')
+        self.assertEqual(len(self.gateway._client._transport._pool.connections), 1)
+
+    def test_close_releases_client_and_loop(self):
+        self.gateway.call(self.gateway.find_customer, 'nobody@example.com')
+        client, thread = self.gateway._client, self.gateway._thread
+        self.gateway.close()
+        self.assertTrue(client.is_closed)
+        self.assertFalse(thread.is_alive())
+
+        # Kapatıldıktan sonra ilk istek yeniden açar
+        self.gateway.call(self.gateway.find_customer, 'nobody@example.com')
+        self.assertFalse(self.gateway._client.is_closed)
+
+class PaymentViewsTest(FakeStripeTestCase):
+    def setUp(self):
+        super().setUp()
+        self.event = create_event(available_tickets=10)
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        directory.cache.clear()
+
+    def test_views_are_async(self):
+        self.assertTrue(asyncio.iscoroutinefunction(create_payment_intent))
+
+    def test_payment_flow(self):
+        response = self.client.post('/api/payment/create-intent/', {
+            'event_id': self.event.id,
+            'quantity': 2
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['amount'], 20000)
+        hold = TicketHold.objects.get(pk=response.data['hold_id'])
+        self.assertEqual(hold.status, 'active')
+
+        intent_id = response.data['client_secret'].split('_secret_')[0]
+        response = self.client.post('/api/payment/confirm/', {
+            'payment_intent_id': intent_id
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+        # Ödeme henüz tamamlanmadı: worker olayı sonraya bırakır
+        self.assertEqual(process_pending(), (1, 0))
+        self.assertFalse(Ticket.objects.exists())
+
+        self.fake.succeed(intent_id)
+        self.assertEqual(process_pending(now=timezone.now() + timedelta(hours=1)), (1, 1))
+        response = self.client.post('/api/payment/confirm/', {
+            'payment_intent_id': intent_id
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ticket = Ticket.objects.get(pk=response.data['ticket_id'])
+        self.assertEqual((ticket.quantity, ticket.payment_intent_id), (2, intent_id))
+        self.assertEqual(Event.objects.get(pk=self.event.pk).sold_tickets, 2)
+
+    def confirm(self, intent_id):
+        return self.client.post('/api/payment/confirm/', {'payment_intent_id': intent_id}, format='json')
+
+    @override_settings(PAYMENT_EVENT_MAX_ATTEMPTS=1)
+    def test_pending_payment_is_not_a_failure(self):
+        response = self.client.post('/api/payment/create-intent/', {
+            'event_id': self.event.id,
+            'quantity': 1
+        }, format='json')
+        intent_id = response.data['client_secret'].split('_secret_')[0]
+        self.assertEqual(self.confirm(intent_id).status_code, status.HTTP_202_ACCEPTED)
+
+        # Ödeme sürdükçe deneme hakkı harcanmaz, kayıt 'failed' olmaz
+        now = timezone.now()
+        for minute in range(1, 4):
+            self.assertEqual(process_pending(now=now + timedelta(minutes=minute)), (1, 0))
+        queued = PaymentEvent.objects.get()
+        self.assertEqual((queued.status, queued.attempts), ('pending', 0))
+        self.assertEqual(self.confirm(intent_id).status_code, status.HTTP_202_ACCEPTED)
+
+        self.fake.succeed(intent_id)
+        self.assertEqual(process_pending(now=now + timedelta(hours=1)), (1, 1))
+        self.assertEqual(self.confirm(intent_id).status_code, status.HTTP_200_OK)
+
+    def test_finished_confirmation_is_rearmed(self):
+        response = self.client.post('/api/payment/create-intent/', {
+            'event_id': self.event.id,
+            'quantity': 1
+        }, format='json')
+        intent_id = response.data['client_secret'].split('_secret_')[0]
+        self.confirm(intent_id)
+
+        # Rezervasyon bittiğinde worker beklemeyi bırakır; kayıt bilet üretmeden biter
+        TicketHold.objects.update(status='released')
+        self.assertEqual(process_pending(now=timezone.now() + timedelta(hours=1)), (1, 1))
+        self.assertEqual(PaymentEvent.objects.get().status, 'done')
+
+        # Ödeme sonradan tamamlanırsa istemcinin sonraki sorgusu kaydı yeniden kurar
+        self.fake.succeed(intent_id)
+        self.assertEqual(self.confirm(intent_id).status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(PaymentEvent.objects.get().status, 'pending')
+        self.assertEqual(process_pending(), (1, 1))
+        self.assertEqual(self.confirm(intent_id).status_code, status.HTTP_200_OK)
+
+    def test_confirmation_requires_own_hold(self):
+        response = self.client.post('/api/payment/create-intent/', {
+            'event_id': self.event.id,
+            'quantity': 1
+        }, format='json')
+        intent_id = response.data['client_secret'].split('_secret_')[0]
+        self.assertEqual(TicketHold.objects.get().payment_intent_id, intent_id)
+
+        # Başka kullanıcının ya da bilinmeyen bir ödemenin onayı kuyruğa yazılmaz
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user(username='other'))
+        for client, payment_intent_id in ((other, intent_id), (self.client, 'pi_unknown')):
+            response = client.post('/api/payment/confirm/', {'payment_intent_id': payment_intent_id}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(PaymentEvent.objects.exists())
+
+    def test_gateway_outage_releases_hold(self):
+        self.fake.fail_next(503, 503, 503)
+        response = self.client.post('/api/payment/create-intent/', {
+            'event_id': self.event.id,
+            'quantity': 2
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(TicketHold.objects.get().status, 'released')
+        self.assertEqual(Event.objects.get(pk=self.event.pk).held_tickets, 0)
+
+    def test_customer_is_created_once(self):
+        first = self.client.get('/api/payment/methods/')
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.data['payment_methods'], [])
+        self.assertEqual(PaymentCustomer.objects.get(user=self.user).stripe_customer_id, first.data['customer_id'])
+        self.fake.add_payment_method(first.data['customer_id'])
+
+        # Sonraki isteklerde müşteri için gateway'e gidilmez
+        self.fake.requests.clear()
+        second = self.client.get('/api/payment/methods/')
+        self.assertEqual(second.data['customer_id'], first.data['customer_id'])
+        self.assertEqual(len(second.data['payment_methods']), 1)
+
+        response = self.client.post('/api/payment/setup-intent/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['customer_id'], first.data['customer_id'])
+        self.assertEqual(len(self.fake.requests), 2)
+        self.assertEqual(self.fake.count('GET', '/v1/customers'), 0)
+
+        # Süreç içi önbellek boşalsa da kayıt veritabanından okunur
+        directory.cache.clear()
+        self.client.post('/api/payment/setup-intent/')
+        self.assertEqual(self.fake.count('POST', '/v1/customers'), 0)
+
+    def test_waiting_room_requires_pass(self):
+        self.event.admission_rate = 10
+        self.event.save()
+        payload = {'event_id': self.event.id, 'quantity': 1}
+        response = self.client.post('/api/payment/create-intent/', payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(TicketHold.objects.exists())
+        self.assertEqual(self.fake.count('POST', '/v1/payment_intents'), 0)
+
+        token = issue_pass(self.event.pk, self.user.pk, 1)
+        response = self.client.post(
+            '/api/payment/create-intent/', payload, format='json', HTTP_X_QUEUE_PASS=token
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_requires_authentication(self):
+        response = APIClient().post('/api/payment/create-intent/', {
+            'event_id': self.event.id
+        }, format='json')
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+class CustomerDirectoryTest(FakeStripeTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='payer', email='payer@example.com')
+
+    def test_concurrent_lookups_create_one_customer(self):
+        # İki süreç (iki dizin) ve her birinde eşzamanlı istekler
+        first, second = CustomerDirectory(10), CustomerDirectory(10)
+
+        async def storm():
+            return await asyncio.gather(*(
+                directory.customer_id(self.user)
+                for directory in (first, second) * 5
+            ))
+
+        self.fake.latency = 0.05
+        customer_ids = async_to_sync(storm)()
+        self.assertEqual(len(set(customer_ids)), 1)
+        self.assertEqual(PaymentCustomer.objects.get(user=self.user).stripe_customer_id, customer_ids[0])
+        # Her dizin bir kez oluşturmayı dener; hepsi aynı anahtarla, Stripe'ta tekrar olarak yanıtlanır
+        self.assertGreaterEqual(self.fake.count('POST', '/v1/customers'), 2)
+        self.assertEqual(
+            {key for method, path, key in self.fake.requests if (method, path) == ('POST', '/v1/customers')},
+            {f'customer-user-{self.user.pk}'}
+        )
+        self.assertEqual(len([obj for obj in self.fake.objects.values() if obj['object'] == 'customer' and obj['email'] == 'payer@example.com']), 1)
+
+    def test_existing_customer_is_adopted(self):
+        existing = async_to_sync(StripeGateway().create_customer)('payer@example.com', 'Payer')
+        customer_id = async_to_sync(CustomerDirectory(10).customer_id)(self.user)
+        self.assertEqual(customer_id, existing['id'])
+        self.assertEqual(self.fake.count('POST', '/v1/customers'), 1)
+
+WEBHOOK_SECRET = 'whsec_test'
+
+@override_settings(STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET)
+class PaymentWebhookTest(TestCase):
+    def setUp(self):
+        self.event = create_event(available_tickets=10)
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.hold = hold_tickets(self.event, self.user, 2)
+        TicketHold.objects.filter(pk=self.hold.pk).update(payment_intent_id='pi_test')
+        self.client = APIClient()
+
+    def intent(self, **metadata):
+        return {
+            'id': 'pi_test',
+            'object': 'payment_intent',
+            'status': 'succeeded',
+            'metadata': {'hold_id': str(self.hold.id), **metadata},
+        }
+
+    def deliver(self, event_id='evt_1', event_type='payment_intent.succeeded', obj=None, secret=WEBHOOK_SECRET):
+        payload = json.dumps({
+            'id': event_id,
+            'type': event_type,
+            'data': {'object': obj or self.intent()},
+        }).encode()
+        return self.client.post(
+            '/api/payment/webhook/', payload,
+            content_type='application/json',
+            HTTP_STRIPE_SIGNATURE=sign(payload, secret),
+        )
+
+    def test_signature_is_verified(self):
+        payload = b'{"id": "evt_1"}'
+        verify_signature(payload, sign(payload, WEBHOOK_SECRET), WEBHOOK_SECRET)
+        with self.assertRaises(SignatureError):
+            verify_signature(payload + b' ', sign(payload, WEBHOOK_SECRET), WEBHOOK_SECRET)
+        with self.assertRaises(SignatureError):
+            verify_signature(payload, sign(payload, WEBHOOK_SECRET, timestamp=1), WEBHOOK_SECRET)
+
+        response = self.deliver(secret='whsec_other')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(PaymentEvent.objects.exists())
+
+    def test_malformed_event_is_rejected(self):
+        # İmzası geçerli ama ``id``/``type`` alanı eksik ya da hatalı olaylar
+        for payload in ({'type': 'payment_intent.succeeded'}, {'id': 'evt_1'},
+                        {'id': 1, 'type': 'payment_intent.succeeded'}, ['evt_1']):
+            body = json.dumps(payload).encode()
+            response = self.client.post(
+                '/api/payment/webhook/', body,
+                content_type='application/json',
+                HTTP_STRIPE_SIGNATURE=sign(body, WEBHOOK_SECRET),
+            )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(PaymentEvent.objects.exists())
+
+    def test_webhook_only_enqueues(self):
+        response = self.deliver()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['duplicate'])
+        self.assertFalse(Ticket.objects.exists())
+
+        # Stripe'ın yeniden gönderimi kuyruğa ikinci kez yazılmaz
+        self.assertTrue(self.deliver().data['duplicate'])
+        queued = PaymentEvent.objects.get()
+        self.assertEqual((queued.status, queued.payment_intent_id), ('pending', 'pi_test'))
+
+        self.assertEqual(process_pending(), (1, 1))
+        self.assertEqual(PaymentEvent.objects.get().status, 'done')
+        self.assertEqual(Ticket.objects.get().payment_intent_id, 'pi_test')
+
+    def test_replays_issue_one_ticket(self):
+        self.deliver('evt_1')
+        self.deliver('evt_2')
+        self.assertEqual(process_pending(), (2, 2))
+        first = issue_ticket(self.intent())
+        self.assertEqual(Ticket.objects.get(), first)
+
+        # Rezervasyonsuz ödeme için de aynı intent tek bilet üretir
+        direct = {'id': 'pi_direct', 'object': 'payment_intent', 'metadata': {
+            'event_id': str(self.event.id), 'user_id': str(self.user.id), 'quantity': '1',
+        }}
+        self.assertEqual(issue_ticket(direct), issue_ticket(direct))
+        self.assertEqual(Ticket.objects.count(), 2)
+        self.assertEqual(Event.objects.get(pk=self.event.pk).sold_tickets, 3)
+
+    def test_expired_hold_is_sold_directly_or_fails(self):
+        TicketHold.objects.filter(pk=self.hold.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+        other = hold_tickets(self.event, self.user, 9)
+        self.assertEqual(TicketHold.objects.get(pk=self.hold.pk).status, 'released')
+
+        # Süresi dolan rezervasyonun stoğu başkasına gitti; ödeme bilet üretmez
+        self.deliver()
+        self.assertEqual(process_pending(), (1, 0))
+        failed = PaymentEvent.objects.get()
+        self.assertEqual(failed.status, 'failed')
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post('/api/payment/confirm/', {'payment_intent_id': 'pi_test'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        # Stok geri gelince (farklı bir ödeme) doğrudan satış yapılır
+        release_hold(other)
+        self.assertEqual(issue_ticket(self.intent()).quantity, 2)
+
+    def test_worker_sleeps_only_when_batch_is_not_full(self):
+        # Başarısız/ertelenen olaylarla dolan parti de beklemeden devam eder
+        command = 'events.management.commands.process_payment_events'
+        batches = [(2, 0), (2, 1), (1, 1)]
+        with mock.patch(f'{command}.process_pending', side_effect=batches) as process, \
+                mock.patch(f'{command}.time.sleep', side_effect=KeyboardInterrupt) as sleep:
+            with self.assertRaises(KeyboardInterrupt):
+                call_command('process_payment_events', '--batch', '2', stdout=StringIO())
+        self.assertEqual(process.call_count, 3)
+        sleep.assert_called_once()
+
+    def test_claimed_event_is_not_processed_twice(self):
+        self.deliver()
+        now = timezone.now()
+        PaymentEvent.objects.update(available_at=now + timedelta(seconds=60))
+        # Kira süresince başka worker sahiplenemez, süre dolunca sahiplenir
+        self.assertEqual(process_pending(now=now), (0, 0))
+        self.assertEqual(process_pending(now=now + timedelta(seconds=61)), (1, 1))
@@ -0,0 +1,287 @@
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .inventory import configure_shards, totals
+from .models import Category, DailySalesRollup, Event, InventoryShard, Ticket, TicketHold
+from .reservations import (
+    HoldNotActive,
+    InsufficientTickets,
+    confirm_hold,
+    hold_tickets,
+    purchase_order,
+    purchase_tickets,
+    release_expired_holds,
+    release_hold,
+)
+from .scanning import scan_tickets
+
+def create_event(available_tickets):
+    category = Category.objects.create(name='Test Category', slug='test-category')
+    return Event.objects.create(
+        title='Test Event',
+        slug='test-event',
+        description='Test description',
+        date='2024-12-31',
+        time='20:00:00',
+        location='Test Location',
+        category=category,
+        price=Decimal('100.00'),
+        available_tickets=available_tickets
+    )
+
+class ReservationTest(TestCase):
+    def setUp(self):
+        self.event = create_event(available_tickets=10)
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+
+    def test_hold_reduces_remaining_tickets(self):
+        hold_tickets(self.event, self.user, 4)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.held_tickets, 4)
+        self.assertEqual(self.event.remaining_tickets, 6)
+
+    def test_hold_rejects_oversell(self):
+        hold_tickets(self.event, self.user, 8)
+        with self.assertRaises(InsufficientTickets):
+            hold_tickets(self.event, self.user, 3)
+        self.assertEqual(TicketHold.objects.count(), 1)
+
+    def test_confirm_hold_moves_held_to_sold(self):
+        hold = hold_tickets(self.event, self.user, 3)
+        ticket = confirm_hold(hold)
+        self.event.refresh_from_db()
+        self.assertEqual(ticket.quantity, 3)
+        self.assertEqual(ticket.total_price, Decimal('300.00'))
+        self.assertEqual(self.event.held_tickets, 0)
+        self.assertEqual(self.event.sold_tickets, 3)
+
+        with self.assertRaises(HoldNotActive):
+            confirm_hold(hold)
+        self.assertEqual(Ticket.objects.count(), 1)
+
+    def test_release_hold_returns_inventory(self):
+        hold = hold_tickets(self.event, self.user, 5)
+        self.assertTrue(release_hold(hold))
+        self.assertFalse(release_hold(hold))
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.remaining_tickets, 10)
+
+    def test_expired_holds_are_reclaimed(self):
+        hold_tickets(self.event, self.user, 10, ttl=-1)
+        # Süresi dolmuş rezervasyon yeni alımı engellememeli
+        ticket = purchase_tickets(self.event, self.user, 2)
+        self.assertEqual(ticket.quantity, 2)
+        self.assertEqual(TicketHold.objects.get().status, 'released')
+        self.assertEqual(release_expired_holds(now=timezone.now() + timedelta(days=1)), 0)
+
+    def test_purchase_rejects_inactive_event(self):
+        Event.objects.filter(pk=self.event.pk).update(is_active=False)
+        with self.assertRaises(InsufficientTickets):
+            purchase_tickets(self.event, self.user, 1)
+
+    def test_purchase_order_issues_individual_tickets(self):
+        order, tickets = purchase_order(self.event, self.user, 4)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.sold_tickets, 4)
+        self.assertEqual(order.total_price, Decimal('400.00'))
+        self.assertEqual(
+            set(Ticket.objects.filter(order=order).values_list('ticket_number', flat=True)),
+            {str(ticket.ticket_number) for ticket in tickets}
+        )
+        self.assertTrue(all(ticket.quantity == 1 for ticket in tickets))
+        rollup = DailySalesRollup.objects.get()
+        self.assertEqual((rollup.tickets, rollup.quantity, rollup.revenue), (4, 4, Decimal('400.00')))
+
+        # Stok yetmezse sipariş hiç oluşmaz
+        with self.assertRaises(InsufficientTickets):
+            purchase_order(self.event, self.user, 7)
+        self.assertEqual(Ticket.objects.count(), 4)
+
+        # Tek bilet iptali stoğa bir bilet geri verir
+        tickets[0].cancel()
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.remaining_tickets, 7)
+
+    def test_purchase_order_query_count_does_not_grow(self):
+        self.event.available_tickets = 1000
+        self.event.save()
+        purchase_order(self.event, self.user, 1)
+        for quantity in (10, 400):
+            with CaptureQueriesContext(connection) as queries:
+                purchase_order(self.event, self.user, quantity)
+            # Bilet eklemeleri partiler halinde (SQLite parti boyutunu küçültür);
+            # geri kalan sabit: savepoint, stok, sipariş, satış özeti
+            inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "events_ticket" ')]
+            self.assertEqual(len(queries) - len(inserts), 5)
+            self.assertLessEqual(len(inserts), quantity // 90 + 1)
+
+class ShardedInventoryTest(TestCase):
+    def setUp(self):
+        self.event = create_event(available_tickets=100)
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+
+    def test_configure_shards_moves_existing_counters(self):
+        purchase_tickets(self.event, self.user, 10)
+        hold_tickets(self.event, self.user, 5)
+        event = configure_shards(self.event, 4)
+
+        self.assertEqual(InventoryShard.objects.filter(event=event).count(), 4)
+        self.assertEqual(event.sold_tickets, 0)
+        self.assertEqual(totals(event), {
+            'sold_tickets': 10,
+            'held_tickets': 5,
+            'remaining_tickets': 85,
+        })
+
+        event = configure_shards(event, 0)
+        self.assertFalse(InventoryShard.objects.filter(event=event).exists())
+        self.assertEqual((event.sold_tickets, event.held_tickets), (10, 5))
+
+    def test_purchase_rebalances_drained_shard(self):
+        event = configure_shards(self.event, 4)
+        # Tek bir parçanın kapasitesinden (25) büyük alım, diğer parçalardan kapasite çeker
+        purchase_tickets(event, self.user, 40)
+        hold = hold_tickets(event, self.user, 60)
+        self.assertEqual(event.remaining_tickets, 0)
+        with self.assertRaises(InsufficientTickets):
+            purchase_tickets(event, self.user, 1)
+
+        confirm_hold(hold)
+        capacity = sum(InventoryShard.objects.filter(event=event).values_list('capacity', flat=True))
+        self.assertEqual(capacity, 100)
+        self.assertEqual(totals(event)['sold_tickets'], 100)
+
+    def test_cancel_returns_ticket_to_a_shard(self):
+        event = configure_shards(self.event, 4)
+        ticket = purchase_tickets(event, self.user, 3)
+        ticket.cancel()
+        self.assertEqual(totals(event)['sold_tickets'], 0)
+        self.assertEqual(Event.objects.get(pk=event.pk).remaining_tickets, 100)
+
+    def test_rebuild_ticket_counters_repairs_shards(self):
+        event = configure_shards(self.event, 4)
+        purchase_tickets(event, self.user, 7)
+        InventoryShard.objects.filter(event=event).update(sold_tickets=0)
+
+        call_command('rebuild_ticket_counters', stdout=StringIO())
+        self.assertEqual(totals(event)['sold_tickets'], 7)
+        call_command('rebuild_ticket_counters', '--check', stdout=StringIO())
+
+class ReservationConcurrencyTest(TransactionTestCase):
+    """Tek bir etkinliğe çok sayıda eşzamanlı alıcı; hiçbir koşulda fazla satış olmamalı"""
+    workers = 16
+    attempts_per_worker = 10
+    available_tickets = 50
+    inventory_shards = 0
+
+    def setUp(self):
+        self.event = create_event(available_tickets=self.available_tickets)
+        if self.inventory_shards:
+            self.event = configure_shards(self.event, self.inventory_shards)
+        self.users = [
+            User.objects.create_user(username=f'buyer{i}', password='testpass123')
+            for i in range(self.workers)
+        ]
+
+    def _retry(self, operation, *args):
+        while True:
+            try:
+                return operation(*args)
+            except OperationalError:
+                # SQLite yazma kilidi; PostgreSQL'de oluşmaz
+                continue
+
+    def _buyer(self, user, results):
+        self.barrier.wait()
+        try:
+            for attempt in range(self.attempts_per_worker):
+                try:
+                    if attempt % 2:
+                        hold = self._retry(hold_tickets, self.event, user, 1)
+                        self._retry(confirm_hold, hold)
+                    else:
+                        self._retry(purchase_tickets, self.event, user, 1)
+                    results.append('sold')
+                except InsufficientTickets:
+                    results.append('rejected')
+        finally:
+            connection.close()
+
+    def test_no_oversell_under_contention(self):
+        results = []
+        self.barrier = threading.Barrier(self.workers)
+        threads = [
+            threading.Thread(target=self._buyer, args=(user, results))
+            for user in self.users
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.event.refresh_from_db()
+        sold = Ticket.objects.filter(event=self.event, is_cancelled=False).count()
+        self.assertEqual(results.count('sold'), self.available_tickets)
+        self.assertEqual(sold, self.available_tickets)
+        self.assertEqual(totals(self.event), {
+            'sold_tickets': self.available_tickets,
+            'held_tickets': 0,
+            'remaining_tickets': 0,
+        })
+
+class ShardedReservationConcurrencyTest(ReservationConcurrencyTest):
+    inventory_shards = 8
+
+class GateScanConcurrencyTest(TransactionTestCase):
+    """Aynı bilet birden fazla kapıda aynı anda okutulur; yalnızca bir kapı kabul etmeli"""
+    gates = 8
+
+    def test_ticket_admitted_once(self):
+        event = create_event(available_tickets=10)
+        user = User.objects.create_user(username='holder', password='testpass123')
+        tickets = [purchase_tickets(event, user, 1) for _ in range(5)]
+        numbers = [str(ticket.ticket_number) for ticket in tickets]
+
+        results = []
+        barrier = threading.Barrier(self.gates)
+
+        def gate():
+            barrier.wait()
+            try:
+                while True:
+                    try:
+                        results.extend(scan_tickets(numbers, event.id))
+                        break
+                    except OperationalError:
+                        # SQLite yazma kilidi; PostgreSQL'de oluşmaz
+                        continue
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=gate) for _ in range(self.gates)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        codes = [code for code, _ in results]
+        self.assertEqual(codes.count('ok'), len(numbers))
+        self.assertEqual(codes.count('used'), len(numbers) * (self.gates - 1))
+        self.assertEqual(Ticket.objects.filter(status='used').count(), len(numbers))
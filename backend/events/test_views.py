@@ -1,13 +1,56 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from rest_framework.test import APITestCase
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+from rest_framework import mixins, serializers
 from rest_framework import status
 from rest_framework.authtoken.models import Token
 from .models import Category, Event, Ticket
+from .inventory import configure_shards
+from .caching import LocalLRU, local_cache
+from . import waiting_room
+from .metrics import registry
+from .fast_serializers import compile_serializer
+from .serializers import EventListSerializer, TicketSerializer
+from .views import CategoryViewSet, EventViewSet, TicketViewSet
+from django.core.exceptions import ImproperlyConfigured
+from datetime import datetime, timedelta
 from decimal import Decimal
+from io import StringIO
+import base64
 import json
 
+IN_MEMORY_LAYER = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+class QueryCountAssertionsMixin:
+    """Endpoint başına sorgu sayısını doğrulayan yardımcılar"""
+
+    def count_queries(self, url, **params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(context.captured_queries)
+
+    def assertConstantQueries(self, url, grow, expected=None, **params):
+        """
+        ``grow()`` ile satır sayısı artırıldığında endpoint'in sorgu sayısının
+        değişmediğini (N+1 olmadığını) ve verilirse ``expected`` olduğunu doğrular.
+        """
+        before = self.count_queries(url, **params)
+        grow()
+        after = self.count_queries(url, **params)
+        self.assertEqual(
+            before, after,
+            f'{url} query count grew with row count ({before} -> {after})'
+        )
+        if expected is not None:
+            self.assertEqual(after, expected, f'{url} issued {after} queries, expected {expected}')
+
 class EventViewSetTest(APITestCase):
     def setUp(self):
         self.user = User.objects.create_user(
@@ -71,6 +114,119 @@ class EventViewSetTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 1)
 
+class EventListingTest(APITestCase):
+    def setUp(self):
+        self.category = Category.objects.create(
+            name='Test Category',
+            slug='test-category',
+            description='Test description'
+        )
+        self.event = Event.objects.create(
+            title='Test Event',
+            slug='test-event',
+            description='Test description',
+            date='2024-12-31',
+            time='20:00:00',
+            location='Test Location',
+            category=self.category,
+            price=Decimal('100.00'),
+            available_tickets=100
+        )
+
+    def test_list_events_cursor_pagination(self):
+        """Test walking the event list with keyset cursors"""
+        for i in range(4):
+            Event.objects.create(
+                title=f'Same Day Event {i}',
+                slug=f'same-day-event-{i}',
+                description='Test description',
+                date='2024-12-31' if i % 2 else '2025-01-15',
+                time='20:00:00',
+                location='Test Location',
+                category=self.category,
+                price=Decimal('100.00'),
+                available_tickets=100
+            )
+        expected = list(
+            Event.objects.filter(is_active=True).order_by('-date', 'time', '-id').values_list('id', flat=True)
+        )
+
+        url = reverse('event-list')
+        response = self.client.get(url, {'pagination': 'cursor', 'page_size': 2})
+        self.assertNotIn('count', response.data)
+        seen = [event['id'] for event in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            self.assertLessEqual(len(response.data['results']), 2)
+            seen += [event['id'] for event in response.data['results']]
+        self.assertEqual(seen, expected)
+
+    def test_malformed_cursor_is_rejected(self):
+        """Uzunluğu doğru ama tipleri yanlış imleçler 404 döner, 500 değil"""
+        url = reverse('event-list')
+        for cursor in (['x', 'y', 1], ['2024-12-31', '20:00:00', 'z'], [{'a': 1}, [], 1], ['x']):
+            encoded = base64.urlsafe_b64encode(json.dumps(cursor).encode()).decode()
+            response = self.client.get(url, {'cursor': encoded})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, cursor)
+
+    def test_search_events_full_text(self):
+        """Test prefix matching, ranking and index updates on save"""
+        concert = Event.objects.create(
+            title='Rock Konseri',
+            slug='rock-konseri',
+            description='Büyük rock konseri, rock severler için',
+            date='2024-12-15',
+            time='20:00:00',
+            location='Istanbul Arena',
+            category=self.category,
+            price=Decimal('150.00'),
+            available_tickets=1000
+        )
+        festival = Event.objects.create(
+            title='Yaz Festivali',
+            slug='yaz-festivali',
+            description='Caz ve rock sahneleri',
+            date='2024-12-16',
+            time='20:00:00',
+            location='Izmir',
+            category=self.category,
+            price=Decimal('150.00'),
+            available_tickets=1000
+        )
+
+        url = reverse('event-list')
+        response = self.client.get(url, {'search': 'konse'})
+        self.assertEqual([event['id'] for event in response.data['results']], [concert.id])
+
+        response = self.client.get(url, {'search': 'rock'})
+        self.assertEqual(
+            [event['id'] for event in response.data['results']],
+            [concert.id, festival.id]
+        )
+
+        response = self.client.get(url, {'search': 'istanbul rock'})
+        self.assertEqual([event['id'] for event in response.data['results']], [concert.id])
+
+        festival.title = 'Caz Festivali'
+        festival.save()
+        response = self.client.get(url, {'search': 'caz fest'})
+        self.assertEqual([event['id'] for event in response.data['results']], [festival.id])
+        response = self.client.get(url, {'search': 'yaz'})
+        self.assertEqual(response.data['results'], [])
+
+    def test_search_rejects_cursor_pagination(self):
+        """Keyset sıralaması alaka sıralamasını bozacağı için reddedilir"""
+        url = reverse('event-list')
+        for params in ({'pagination': 'cursor'}, {'cursor': 'WyIyMDI0LTEyLTMxIl0='}):
+            response = self.client.get(url, {'search': 'test', **params})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('search', response.data)
+
+        # Boş arama filtre uygulamaz; keyset sayfalama çalışır
+        response = self.client.get(url, {'search': ' ', 'pagination': 'cursor'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([event['id'] for event in response.data['results']], [self.event.id])
+
 class TicketViewSetTest(APITestCase):
     def setUp(self):
         self.user = User.objects.create_user(
@@ -168,6 +324,96 @@ class TicketViewSetTest(APITestCase):
         ticket.refresh_from_db()
         self.assertEqual(ticket.status, 'used')
 
+class BulkOrderTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.category = Category.objects.create(
+            name='Test Category',
+            slug='test-category'
+        )
+        self.event = Event.objects.create(
+            title='Test Event',
+            slug='test-event',
+            description='Test description',
+            date='2024-12-31',
+            time='20:00:00',
+            location='Test Location',
+            category=self.category,
+            price=Decimal('100.00'),
+            available_tickets=100
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_order(self):
+        response = self.client.post('/api/tickets/bulk/', {
+            'event': self.event.id,
+            'quantity': 30
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(set(response.data['ticket_numbers'])), 30)
+        self.assertEqual(Decimal(response.data['total_price']), Decimal('3000.00'))
+        self.assertEqual(Ticket.objects.filter(user=self.user, quantity=1).count(), 30)
+
+        response = self.client.post('/api/tickets/bulk/', {
+            'event': self.event.id,
+            'quantity': 71
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class TicketInventoryTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        category = Category.objects.create(name='Test Category', slug='test-category')
+        self.event = Event.objects.create(
+            title='Test Event',
+            slug='test-event',
+            description='Test description',
+            date='2024-12-31',
+            time='20:00:00',
+            location='Test Location',
+            category=category,
+            price=Decimal('100.00'),
+            available_tickets=5
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_ticket_cannot_bypass_inventory(self):
+        """Bilet güncelleme ve silme stok sayaçlarını atlayamaz"""
+        response = self.client.post(reverse('ticket-list'), {'event': self.event.id, 'quantity': 2})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        ticket = Ticket.objects.get()
+        url = reverse('ticket-detail', kwargs={'pk': ticket.pk})
+
+        payload = {'quantity': 5, 'is_cancelled': True, 'status': 'used', 'total_price': '1.00'}
+        for method in (self.client.patch, self.client.put):
+            self.assertEqual(method(url, payload).status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        self.assertEqual(self.client.delete(url).status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+        ticket.refresh_from_db()
+        self.event.refresh_from_db()
+        self.assertEqual((ticket.quantity, ticket.is_cancelled, ticket.status), (2, False, 'active'))
+        self.assertEqual((self.event.sold_tickets, self.event.remaining_tickets), (2, 3))
+
+        # Stok yalnızca iptalle geri döner
+        self.assertEqual(self.client.post(reverse('ticket-cancel', kwargs={'pk': ticket.pk})).status_code,
+                         status.HTTP_200_OK)
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.sold_tickets, self.event.remaining_tickets), (0, 5))
+
+    def test_ticket_fields_are_read_only(self):
+        ticket = Ticket.objects.create(
+            event=self.event, user=self.user, quantity=2, total_price=Decimal('200.00')
+        )
+        serializer = TicketSerializer(ticket, data={
+            'quantity': 5, 'is_cancelled': True, 'status': 'used', 'total_price': '1.00'
+        }, partial=True)
+        self.assertTrue(serializer.is_valid())
+        self.assertEqual(serializer.validated_data, {})
+
 class AdminDashboardTest(APITestCase):
     def setUp(self):
         self.admin_user = User.objects.create_superuser(
@@ -239,7 +485,7 @@ class AdminDashboardTest(APITestCase):
         self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.admin_token.key}')
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
 
     def test_users_management(self):
         """Test users management endpoint"""
@@ -247,7 +493,8 @@ class AdminDashboardTest(APITestCase):
         self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.admin_token.key}')
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)  # admin + testuser
+        self.assertEqual(len(response.data['results']), 2)  # admin + testuser
+        self.assertIsNone(response.data['next'])
 
     def test_tickets_management(self):
         """Test tickets management endpoint"""
@@ -255,4 +502,625 @@ class AdminDashboardTest(APITestCase):
         self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.admin_token.key}')
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
+
+class AdminReportsTest(APITestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(
+            username='admin',
+            email='admin@example.com',
+            password='adminpass123'
+        )
+        self.category = Category.objects.create(
+            name='Test Category',
+            slug='test-category'
+        )
+        self.event = Event.objects.create(
+            title='Test Event',
+            slug='test-event',
+            description='Test description',
+            date='2024-12-31',
+            time='20:00:00',
+            location='Test Location',
+            category=self.category,
+            price=Decimal('100.00'),
+            available_tickets=100
+        )
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.ticket = Ticket.objects.create(
+            event=self.event,
+            user=self.user,
+            quantity=2,
+            total_price=Decimal('200.00')
+        )
+        self.client.force_authenticate(self.admin_user)
+
+    def test_admin_stats_monthly_revenue(self):
+        """Aylık gelir takvim aylarına göre gruplanır"""
+        today = timezone.localdate()
+        last_month = (today.replace(day=1) - timedelta(days=1)).replace(day=15)
+        old_ticket = Ticket.objects.create(
+            event=self.event,
+            user=self.user,
+            quantity=1,
+            total_price=Decimal('100.00')
+        )
+        Ticket.objects.filter(pk=old_ticket.pk).update(
+            purchase_date=timezone.make_aware(datetime.combine(last_month, datetime.min.time()))
+        )
+        call_command('rebuild_sales_rollup', stdout=StringIO())
+
+        url = reverse('admin-stats')
+        response = self.client.get(url)
+        monthly = response.data['monthly_revenue']
+        self.assertEqual(len(monthly), 12)
+        self.assertEqual(monthly[0], {'month': today.strftime('%Y-%m'), 'revenue': 200.0})
+        self.assertEqual(monthly[1], {'month': last_month.strftime('%Y-%m'), 'revenue': 100.0})
+
+    def test_users_management_sorting_and_pagination(self):
+        """Test keyset pagination ordered by spend"""
+        for i in range(3):
+            buyer = User.objects.create_user(
+                username=f'buyer{i}',
+                email=f'buyer{i}@example.com',
+                password='testpass123'
+            )
+            Ticket.objects.create(
+                event=self.event,
+                user=buyer,
+                quantity=1,
+                total_price=Decimal('50.00') * (i + 1)
+            )
+
+        url = reverse('admin-users-management')
+        response = self.client.get(url, {'ordering': '-total_spent', 'page_size': 2})
+        self.assertEqual(
+            [user['username'] for user in response.data['results']],
+            ['testuser', 'buyer2']
+        )
+        self.assertEqual(response.data['results'][0]['total_spent'], 200.0)
+
+        seen = [user['username'] for user in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            seen += [user['username'] for user in response.data['results']]
+        self.assertEqual(seen, ['testuser', 'buyer2', 'buyer1', 'buyer0', 'admin'])
+
+        response = self.client.get(url, {'search': 'buyer1'})
+        self.assertEqual([user['username'] for user in response.data['results']], ['buyer1'])
+        response = self.client.get(url, {'has_tickets': 'true', 'ordering': 'ticket_count'})
+        self.assertEqual(len(response.data['results']), 4)
+        response = self.client.get(url, {'ordering': 'password'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class QueryCountTest(QueryCountAssertionsMixin, APITestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(
+            username='admin',
+            email='admin@example.com',
+            password='adminpass123'
+        )
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.created = 0
+        self.add_rows()
+
+    def add_rows(self, count=3):
+        for _ in range(count):
+            self.created += 1
+            category = Category.objects.create(
+                name=f'Category {self.created}',
+                slug=f'category-{self.created}'
+            )
+            event = Event.objects.create(
+                title=f'Event {self.created}',
+                slug=f'event-{self.created}',
+                description='Test description',
+                date='2024-12-31',
+                time='20:00:00',
+                location='Test Location',
+                category=category,
+                price=Decimal('100.00'),
+                available_tickets=100
+            )
+            if self.created % 2:
+                configure_shards(event, 2)
+            Ticket.objects.create(
+                event=event,
+                user=self.user,
+                quantity=1,
+                total_price=Decimal('100.00')
+            )
+
+    def test_event_list_queries(self):
+        # COUNT + sayfa + stok parçaları
+        self.assertConstantQueries(reverse('event-list'), self.add_rows, expected=3)
+
+    def test_ticket_list_queries(self):
+        self.client.force_authenticate(self.user)
+        self.assertConstantQueries(reverse('ticket-list'), self.add_rows, expected=3)
+
+    def test_admin_stats_queries(self):
+        self.client.force_authenticate(self.admin_user)
+        self.assertConstantQueries(reverse('admin-stats'), self.add_rows, expected=6)
+
+    def test_admin_listing_queries(self):
+        self.client.force_authenticate(self.admin_user)
+        self.assertConstantQueries(reverse('admin-events-management'), self.add_rows)
+        self.assertConstantQueries(reverse('admin-tickets-management'), self.add_rows)
+        self.assertConstantQueries(reverse('admin-users-management'), self.add_rows, expected=1)
+
+class CatalogCacheTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.category = Category.objects.create(
+            name='Test Category',
+            slug='test-category'
+        )
+        self.event = Event.objects.create(
+            title='Test Event',
+            slug='test-event',
+            description='Test description',
+            date='2024-12-31',
+            time='20:00:00',
+            location='Test Location',
+            category=self.category,
+            price=Decimal('100.00'),
+            available_tickets=100
+        )
+
+    def test_repeat_requests_are_served_from_cache(self):
+        url = reverse('event-list')
+        first = self.client.get(url)
+        self.assertIn('ETag', first)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+        # Farklı parametreler ayrı anahtar kullanır
+        other = self.client.get(url, {'page_size': 5})
+        self.assertNotEqual(other['ETag'], first['ETag'])
+
+    def test_if_none_match_returns_304(self):
+        url = reverse('event-detail', kwargs={'pk': self.event.pk})
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_ticket_sale_invalidates_event_responses(self):
+        list_url = reverse('event-list')
+        detail_url = reverse('event-detail', kwargs={'pk': self.event.pk})
+        etag = self.client.get(detail_url)['ETag']
+        self.client.get(list_url)
+
+        Ticket.objects.create(
+            event=self.event,
+            user=self.user,
+            quantity=2,
+            total_price=Decimal('200.00')
+        )
+        response = self.client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['remaining_tickets'], 98)
+        self.assertEqual(self.client.get(list_url).data['results'][0]['remaining_tickets'], 98)
+
+    def test_model_saves_invalidate_responses(self):
+        self.client.get(reverse('event-list'))
+        self.client.get(reverse('category-detail', kwargs={'pk': self.category.pk}))
+
+        self.category.name = 'Renamed'
+        self.category.save()
+        self.assertEqual(
+            self.client.get(reverse('category-detail', kwargs={'pk': self.category.pk})).data['name'],
+            'Renamed'
+        )
+        results = self.client.get(reverse('event-list')).data['results']
+        self.assertEqual(results[0]['category']['name'], 'Renamed')
+
+        self.event.title = 'Updated Event'
+        self.event.save()
+        results = self.client.get(reverse('event-list')).data['results']
+        self.assertEqual(results[0]['title'], 'Updated Event')
+
+    def test_local_lru_evicts_least_recently_used(self):
+        lru = LocalLRU(max_entries=2)
+        lru.set('a', 1, 60)
+        lru.set('b', 2, 60)
+        lru.get('a')
+        lru.set('c', 3, 60)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual((lru.get('a'), lru.get('c')), (1, 3))
+
+
+class GateScanTest(APITestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username='gate', password='testpass123', is_staff=True)
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        category = Category.objects.create(name='Test Category', slug='test-category')
+        self.event, self.other_event = [
+            Event.objects.create(
+                title=f'Event {i}',
+                slug=f'event-{i}',
+                description='Test description',
+                date='2024-12-31',
+                time='20:00:00',
+                location='Test Location',
+                category=category,
+                price=Decimal('100.00'),
+                available_tickets=100
+            )
+            for i in range(2)
+        ]
+        self.url = reverse('gate_scan')
+        self.client.force_authenticate(self.staff)
+
+    def ticket(self, event=None, **kwargs):
+        return Ticket.objects.create(
+            event=event or self.event,
+            user=self.user,
+            quantity=kwargs.pop('quantity', 1),
+            total_price=Decimal('100.00'),
+            **kwargs
+        )
+
+    def test_batch_scan(self):
+        group = self.ticket(quantity=3)
+        used = self.ticket(status='used')
+        cancelled = self.ticket(status='cancelled', is_cancelled=True)
+        foreign = self.ticket(event=self.other_event)
+
+        numbers = [
+            group.ticket_number, used.ticket_number, group.ticket_number,
+            'TKT-UNKNOWN', cancelled.ticket_number, foreign.ticket_number,
+        ]
+        response = self.client.post(
+            self.url, {'ticket_numbers': numbers, 'event': self.event.id}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {
+            'results': ['ok', 'used', 'used', 'unknown', 'cancelled', 'wrong_event'],
+            'admit': [3, 0, 0, 0, 0, 0],
+        })
+        group.refresh_from_db()
+        foreign.refresh_from_db()
+        self.assertEqual(group.status, 'used')
+        self.assertEqual(foreign.status, 'active')
+
+    def test_single_scan_admits_once(self):
+        ticket = self.ticket()
+        payload = {'ticket_number': ticket.ticket_number}
+        with CaptureQueriesContext(connection) as queries:
+            first = self.client.post(self.url, payload, format='json')
+        self.assertEqual(first.data, {'results': ['ok'], 'admit': [1]})
+        self.assertEqual(
+            len([q for q in queries.captured_queries if q['sql'].startswith('UPDATE')]), 1
+        )
+        second = self.client.post(self.url, payload, format='json')
+        self.assertEqual(second.data, {'results': ['used'], 'admit': [0]})
+
+    def test_batch_updates_in_ticket_number_order(self):
+        # Gönderim sırası ne olursa olsun satırlar aynı sırayla kilitlenir
+        numbers = sorted(str(self.ticket().ticket_number) for _ in range(4))[::-1]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {'ticket_numbers': numbers}, format='json')
+        self.assertEqual(response.data['results'], ['ok'] * 4)
+        updated = [
+            next(number for number in numbers if number in q['sql'])
+            for q in queries.captured_queries if q['sql'].startswith('UPDATE')
+        ]
+        self.assertEqual(updated, sorted(numbers))
+
+    def test_rejects_invalid_and_oversized_batches(self):
+        self.assertEqual(
+            self.client.post(self.url, {}, format='json').status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+        with self.settings(GATE_SCAN_MAX_BATCH=2):
+            response = self.client.post(self.url, {'ticket_numbers': ['a', 'b', 'c']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_staff_only(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(self.url, {'ticket_number': self.ticket().ticket_number}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYER)
+class WaitingRoomTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Test Category', slug='test-category')
+        self.event = Event.objects.create(
+            title='Test Event',
+            slug='test-event',
+            description='Test description',
+            date='2024-12-31',
+            time='20:00:00',
+            location='Test Location',
+            category=self.category,
+            price=Decimal('100.00'),
+            available_tickets=100,
+            admission_rate=2
+        )
+        self.users = [
+            User.objects.create_user(username=f'buyer{i}', password='testpass123')
+            for i in range(5)
+        ]
+        self.url = reverse('waiting_room', kwargs={'event_id': self.event.pk})
+
+    def join(self, user):
+        self.client.force_authenticate(user)
+        return self.client.post(self.url).data
+
+    def tick(self, now):
+        # Tur kilidi beklenmeden bir sonraki tur
+        cache.delete(f'waitingroom:{self.event.pk}:ticked:lock')
+        return waiting_room.advance(self.event.pk, self.event.admission_rate, now=now)
+
+    def test_users_are_admitted_in_order_at_rate(self):
+        first = self.join(self.users[0])
+        self.assertTrue(first['admitted'])
+        self.assertIn('pass', first)
+
+        # Aynı turda katılanlar sıra bekler
+        states = [self.join(user) for user in self.users[1:]]
+        self.assertEqual([state['number'] for state in states], [2, 3, 4, 5])
+        self.assertEqual([state['position'] for state in states], [1, 2, 3, 4])
+        self.assertFalse(any(state['admitted'] for state in states))
+
+        # Yeniden katılmak yeri değiştirmez
+        self.assertEqual(self.join(self.users[1])['number'], 2)
+
+        now = cache.get(f'waitingroom:{self.event.pk}:ticked')
+        self.assertEqual(self.tick(now + 1), 3)
+        self.client.force_authenticate(self.users[3])
+        self.assertEqual(self.client.get(self.url).data['position'], 1)
+        # Uzun boşluk biriktirilmez: en fazla iki turluk kapasite
+        self.assertEqual(self.tick(now + 60), 5)
+
+    def test_purchase_requires_pass(self):
+        user = self.users[0]
+        self.client.force_authenticate(user)
+        purchase = {'event': self.event.pk, 'quantity': 1}
+        response = self.client.post(reverse('ticket-list'), purchase)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        token = self.join(user)['pass']
+        response = self.client.post(reverse('ticket-list'), purchase, HTTP_X_QUEUE_PASS=token)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        # Kart başka kullanıcıya ya da etkinliğe geçmez
+        self.client.force_authenticate(self.users[1])
+        response = self.client.post(reverse('ticket-bulk'), purchase, HTTP_X_QUEUE_PASS=token)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_expired_pass_is_rejected(self):
+        user = self.users[0]
+        token = self.join(user)['pass']
+        with self.settings(WAITING_ROOM_PURCHASE_WINDOW=-1):
+            with self.assertRaises(waiting_room.AdmissionRequired):
+                waiting_room.check_admission(self.event, user, token)
+
+    def test_events_without_waiting_room_skip_queue(self):
+        self.event.admission_rate = None
+        self.event.save()
+        self.client.force_authenticate(self.users[0])
+        response = self.client.post(reverse('ticket-list'), {'event': self.event.pk, 'quantity': 1})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(self.join(self.users[1])['admitted'])
+
+    @override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'events.missing.ChannelLayer'}})
+    def test_queue_works_without_channel_layer(self):
+        # Yayın yapılamasa da kuyruk ilerler ve uç nokta yanıt verir
+        with self.assertLogs('events.waiting_room', 'ERROR'):
+            self.assertTrue(self.join(self.users[0])['admitted'])
+
+
+class MetricsTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Test Category', slug='test-category')
+        self.event = Event.objects.create(
+            title='Test Event',
+            slug='test-event',
+            description='Test description',
+            date='2024-12-31',
+            time='20:00:00',
+            location='Test Location',
+            category=self.category,
+            price=Decimal('100.00'),
+            available_tickets=100
+        )
+        self.url = reverse('event-detail', kwargs={'pk': self.event.pk})
+
+    def observed(self, histogram, labels):
+        series = histogram.series.get(labels)
+        return (sum(series[:-1]), series[-1]) if series else (0, 0.0)
+
+    def test_request_is_recorded(self):
+        labels = ('event-detail', 'GET')
+        count, queries = self.observed(registry.http_queries, labels)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        new_count, new_queries = self.observed(registry.http_queries, labels)
+        self.assertEqual(new_count, count + 1)
+        self.assertGreater(new_queries, queries)
+        self.assertEqual(self.observed(registry.http_duration, labels)[0], count + 1)
+        self.assertGreater(self.observed(registry.http_serialization, labels)[1], 0)
+
+        self.client.force_login(User.objects.create_user(username='ops', is_staff=True))
+        response = self.client.get('/metrics')
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        body = response.content.decode()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', body)
+        self.assertIn(
+            f'http_request_queries_count{{endpoint="event-detail",method="GET"}} {count + 1}', body
+        )
+        self.assertIn('http_responses_total{endpoint="event-detail",method="GET",status="200"}', body)
+        self.assertIn('http_request_duration_seconds_bucket{endpoint="event-detail",method="GET",le="+Inf"}', body)
+
+    def test_metrics_require_staff_by_default(self):
+        self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_login(User.objects.create_user(username='testuser'))
+        self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_403_FORBIDDEN)
+        # Token tanımlı değilken boş ya da rastgele başlık erişim vermez
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer ')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_login(User.objects.create_user(username='ops', is_staff=True))
+        self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_200_OK)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer other')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(METRICS_SERVER_TIMING=True)
+    def test_server_timing_header(self):
+        response = self.client.get(self.url)
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^db;dur=[\d.]+;desc="\d+ queries", ser;dur=[\d.]+, total;dur=[\d.]+$'
+        )
+
+    @override_settings(METRICS_SERVER_TIMING=False)
+    def test_server_timing_disabled(self):
+        self.assertNotIn('Server-Timing', self.client.get(self.url))
+
+    @override_settings(METRICS_SLOW_REQUEST_MS=0)
+    def test_slow_request_logs_sql(self):
+        with self.assertLogs('events.metrics', 'WARNING') as logs:
+            self.client.get(self.url)
+        self.assertIn(f'GET {self.url} (event-detail)', logs.output[0])
+        self.assertIn('FROM "events_event"', logs.output[0])
+
+
+class SerializerListMixin:
+    # Karşılaştırma için derlenmemiş ``ModelSerializer`` yolu
+    def list(self, request, *args, **kwargs):
+        return mixins.ListModelMixin.list(self, request, *args, **kwargs)
+
+
+class ReferenceEventViewSet(SerializerListMixin, EventViewSet):
+    pass
+
+
+class ReferenceTicketViewSet(SerializerListMixin, TicketViewSet):
+    pass
+
+
+class ReferenceCategoryViewSet(SerializerListMixin, CategoryViewSet):
+    pass
+
+
+class FastSerializerTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        categories = [
+            Category.objects.create(name=f'Category {i}', slug=f'category-{i}', description=f'Açıklama "{i}"')
+            for i in range(2)
+        ]
+        for i in range(6):
+            event = Event.objects.create(
+                title=f'Rock Konser {i}',
+                slug=f'rock-konser-{i}',
+                description='Müzik ve ışık gösterisi',
+                date=f'2024-12-{10 + i}',
+                time=f'{18 + i % 3}:30:00',
+                location='İstanbul Arena' if i % 2 else 'Ankara',
+                category=categories[i % 2],
+                price=Decimal('99.90') + i,
+                available_tickets=50
+            )
+            if i % 3 == 0:
+                configure_shards(event, 2)
+            if i == 1:
+                Event.objects.filter(pk=event.pk).update(image='events/poster 1.jpg')
+            for quantity in (1, 3):
+                ticket = Ticket.objects.create(
+                    event=event, user=self.user, quantity=quantity, total_price=event.price * quantity
+                )
+            if i == 2:
+                ticket.cancel()
+
+    def render(self, viewset, params=None, user=None):
+        view = viewset.as_view({'get': 'list'}, **(
+            {'use_response_cache': False} if hasattr(viewset, 'use_response_cache') else {}
+        ))
+        request = self.factory.get('/api/', params or {})
+        if user is not None:
+            force_authenticate(request, user)
+        response = view(request)
+        response.render()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.content
+
+    def assertSameOutput(self, fast, reference, params=None, user=None):
+        self.assertEqual(self.render(fast, params, user), self.render(reference, params, user))
+
+    def test_event_list_parity(self):
+        for params in (
+            None,
+            {'page': 1, 'location': 'Ankara'},
+            {'pagination': 'cursor', 'page_size': 4},
+            {'ordering': '-price'},
+            {'category': Category.objects.first().pk},
+            {'search': 'rock'},
+        ):
+            with self.subTest(params=params):
+                self.assertSameOutput(EventViewSet, ReferenceEventViewSet, params)
+
+    def test_ticket_list_parity(self):
+        self.assertSameOutput(TicketViewSet, ReferenceTicketViewSet, user=self.user)
+        self.assertSameOutput(
+            TicketViewSet, ReferenceTicketViewSet, {'pagination': 'cursor', 'page_size': 5}, user=self.user
+        )
+
+    def test_category_list_parity(self):
+        self.assertSameOutput(CategoryViewSet, ReferenceCategoryViewSet)
+
+    def test_output_matches_serializer(self):
+        queryset = Event.objects.for_listing().order_by('id')
+        request = self.factory.get('/api/')
+        expected = EventListSerializer(queryset, many=True, context={'request': request}).data
+        mapper = compile_serializer(EventListSerializer)
+        self.assertEqual(mapper.map(mapper.values(queryset), {'request': request}), expected)
+        self.assertTrue(any(row['image'] for row in expected))
+        self.assertTrue(any(row['remaining_tickets'] != 50 for row in expected))
+
+    def test_uncompilable_serializer(self):
+        class Serializer(serializers.ModelSerializer):
+            label = serializers.ReadOnlyField(source='__str__')
+
+            class Meta:
+                model = Event
+                fields = ['id', 'label']
+
+        with self.assertRaises(ImproperlyConfigured):
+            compile_serializer(Serializer)
+
@@ -2,11 +2,14 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import CategoryViewSet, EventViewSet, TicketViewSet
 from .admin_views import AdminDashboardViewSet
+from .scan_views import scan
+from .queue_views import queue
 from .payment_views import (
     create_payment_intent, 
     confirm_payment, 
     payment_methods, 
-    create_setup_intent
+    create_setup_intent,
+    stripe_webhook
 )
 
 router = DefaultRouter()
@@ -22,4 +25,9 @@ urlpatterns = [
     path('payment/confirm/', confirm_payment, name='confirm_payment'),
     path('payment/methods/', payment_methods, name='payment_methods'),
     path('payment/setup-intent/', create_setup_intent, name='create_setup_intent'),
+    path('payment/webhook/', stripe_webhook, name='stripe_webhook'),
+    # Gate scanning
+    path('gate/scan/', scan, name='gate_scan'),
+    # Waiting room
+    path('queue/<int:event_id>/', queue, name='waiting_room'),
 ]
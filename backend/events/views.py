@@ -1,43 +1,77 @@
-from rest_framework import viewsets, permissions, status, filters
+from rest_framework import mixins, viewsets, permissions, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter, OpenApiExample
 from drf_spectacular.types import OpenApiTypes
 from .models import Category, Event, Ticket
-from .serializers import CategorySerializer, EventListSerializer, EventDetailSerializer, TicketSerializer, TicketPurchaseSerializer
+from .serializers import CategorySerializer, EventListSerializer, EventDetailSerializer, TicketSerializer, TicketPurchaseSerializer, TicketOrderSerializer
+from .pagination import SelectablePagination
+from .search import EventSearchFilter
+from .caching import VersionedCacheMixin
+from .fast_serializers import FastListMixin
 
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class CategoryViewSet(VersionedCacheMixin, FastListMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [permissions.AllowAny]
+    
+    def get_cache_scopes(self):
+        if self.action == 'retrieve':
+            return [f"category:{self.kwargs['pk']}"]
+        return ['categories']
 
-class EventViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Event.objects.filter(is_active=True)
+class EventViewSet(VersionedCacheMixin, FastListMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Event.objects.for_listing().filter(is_active=True)
     permission_classes = [permissions.AllowAny]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = SelectablePagination
+    keyset_ordering = ('-date', 'time', '-id')
+    filter_backends = [DjangoFilterBackend, EventSearchFilter, filters.OrderingFilter]
     filterset_fields = ['category', 'date', 'location']
     search_fields = ['title', 'description', 'location']
     ordering_fields = ['date', 'time', 'price']
     
+    def get_cache_scopes(self):
+        # Yanıtlar iç içe kategori bilgisi içerdiği için kategori damgası da eklenir
+        if self.action == 'retrieve':
+            return [f"event:{self.kwargs['pk']}", 'categories']
+        return ['events', 'categories']
+    
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return EventDetailSerializer
         return EventListSerializer
 
-class TicketViewSet(viewsets.ModelViewSet):
+# Bilet güncelleme ve silme uçları yok: stok sayaçları ve satış rollup'ı yalnızca
+# satın alma ve ``cancel`` ile değişir
+class TicketViewSet(FastListMixin, mixins.CreateModelMixin, mixins.ListModelMixin,
+                    mixins.RetrieveModelMixin, viewsets.GenericViewSet):
     queryset = Ticket.objects.all()
     serializer_class = TicketSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = SelectablePagination
+    keyset_ordering = ('-purchase_date', '-id')
     
     def get_queryset(self):
-        return Ticket.objects.filter(user=self.request.user)
+        return Ticket.objects.filter(user=self.request.user).select_related(
+            'event__category'
+        ).prefetch_related('event__shards')
     
     def get_serializer_class(self):
         if self.action == 'create':
             return TicketPurchaseSerializer
+        if self.action == 'bulk':
+            return TicketOrderSerializer
         return TicketSerializer
     
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Grup siparişi: her koltuk için ayrı bilet, tek işlemde"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    
     @action(detail=True, methods=['post'])
     def cancel(self, request, pk=None):
         ticket = self.get_object()
@@ -59,5 +93,10 @@ class TicketViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        ticket.mark_as_used()
+        if not ticket.mark_as_used():
+            # Aynı anda başka bir istek bileti kullandı
+            return Response(
+                {"detail": "Bu bilet geçersiz."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         return Response({"detail": "Bilet başarıyla doğrulandı."})
\ No newline at end of file
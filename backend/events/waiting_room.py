@@ -0,0 +1,207 @@
+"""
+Satış açılışlarında sanal bekleme odası.
+
+``admission_rate`` alanı dolu olan etkinliklerde satın alma uç noktaları
+(``create_payment_intent``, bilet ve grup siparişi oluşturma) yalnızca
+imzalı bir geçiş kartı (``X-Queue-Pass``) ile çağrılabilir. Kart sıra
+kendisine gelen kullanıcıya verilir:
+
+* Kuyruk önbellekte iki sayaçtan oluşur: katılan her kullanıcı ``tail``
+  sayacını ``incr`` ile artırarak sıra numarasını alır, ``head`` ise içeri
+  alınan son numaradır. Sıra numarası ``head``'e ulaşan kullanıcı içeridedir;
+  konum ``numara - head``'dir. Katılma ve konum sorgusu veritabanına gitmez.
+* ``head`` her ``WAITING_ROOM_TICK`` saniyede en fazla ``admission_rate *
+  süre`` kadar ilerler. İlerletmeyi hangi süreç yaparsa yapsın önbellekteki
+  ``add`` kilidi sayesinde tur başına tek ilerleme olur; boşta geçen süre
+  biriktirilmez, kuyruk bir anda boşaltılmaz.
+* Her ilerleme ``queue_<id>`` grubuna tek mesajla yayınlanır; bekleyen her
+  bağlantı kendi konumunu bu sayıdan hesaplar.
+
+Geçiş kartı ``django.core.signing`` ile imzalanır ve
+``WAITING_ROOM_PURCHASE_WINDOW`` saniye geçerlidir; doğrulama için sorgu ya
+da önbellek erişimi gerekmez.
+"""
+import asyncio
+import logging
+import time
+
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+SALT = 'events.waiting_room'
+
+
+class AdmissionRequired(Exception):
+    """Etkinlik bekleme odasında; geçerli bir geçiş kartı yok"""
+
+
+def tick():
+    return getattr(settings, 'WAITING_ROOM_TICK', 1)
+
+
+def purchase_window():
+    return getattr(settings, 'WAITING_ROOM_PURCHASE_WINDOW', 600)
+
+
+def _timeout():
+    # Kuyruk sayaçlarının önbellekte kaldığı süre; satış boyunca her katılımda yenilenmez
+    return getattr(settings, 'WAITING_ROOM_TTL', 6 * 3600)
+
+
+def group_name(event_id):
+    return f'queue_{event_id}'
+
+
+def _keys(event_id):
+    prefix = f'waitingroom:{event_id}'
+    return f'{prefix}:tail', f'{prefix}:head', f'{prefix}:ticked'
+
+
+def _user_key(event_id, user_id):
+    return f'waitingroom:{event_id}:user:{user_id}'
+
+
+def join(event_id, user_id):
+    """Kullanıcıya sıra numarası verir; zaten kuyruktaysa yerini korur"""
+    user_key = _user_key(event_id, user_id)
+    number = cache.get(user_key)
+    if number is not None:
+        return number
+
+    tail_key, _, _ = _keys(event_id)
+    cache.add(tail_key, 0, _timeout())
+    number = cache.incr(tail_key)
+    if not cache.add(user_key, number, _timeout()):
+        # Aynı kullanıcının eşzamanlı isteği önce yazdı; bu numara boşta kalır
+        number = cache.get(user_key)
+    return number
+
+
+def number_of(event_id, user_id):
+    return cache.get(_user_key(event_id, user_id))
+
+
+def admitted_through(event_id):
+    _, head_key, _ = _keys(event_id)
+    return cache.get(head_key, 0)
+
+
+def status(event_id, number, head=None):
+    """Sıra numarasının konumu; ``head`` verilmezse önbellekten okunur"""
+    head = admitted_through(event_id) if head is None else head
+    return {'number': number, 'position': max(0, number - head), 'admitted': number <= head}
+
+
+def advance(event_id, rate, now=None):
+    """
+    Zamanı geldiyse kuyruğu ilerletir ve yayınlar. Tur başına yalnızca bir
+    çağrı ilerletir; ilerleme olduysa yeni ``head`` değerini döner.
+    """
+    if not rate:
+        return None
+    interval = tick()
+    tail_key, head_key, ticked_key = _keys(event_id)
+    if not cache.add(f'{ticked_key}:lock', 1, interval):
+        return None
+
+    now = time.time() if now is None else now
+    last = cache.get(ticked_key)
+    cache.set(ticked_key, now, _timeout())
+    # Boşta geçen süre biriktirilmez: en fazla iki turluk kapasite açılır
+    elapsed = interval if last is None else min(max(0, now - last), 2 * interval)
+
+    head = cache.get(head_key, 0)
+    step = min(int(rate * elapsed), cache.get(tail_key, 0) - head)
+    if step <= 0:
+        return None
+    cache.add(head_key, 0, _timeout())
+    head = cache.incr(head_key, step)
+    publish(event_id, head)
+    return head
+
+
+def publish(event_id, head):
+    try:
+        # Katman kurulamazsa (ör. Redis yok) kuyruk yine ilerler
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return
+        async_to_sync(channel_layer.group_send)(group_name(event_id), {
+            'type': 'queue_advanced',
+            'admitted_through': head,
+        })
+    except Exception:
+        # Bekleyenler bir sonraki ilerlemede ya da HTTP sorgusunda konumunu alır
+        logger.exception('Waiting room broadcast failed for event %s', event_id)
+
+
+def issue_pass(event_id, user_id, number):
+    return signing.dumps({'e': int(event_id), 'u': user_id, 'n': number}, salt=SALT)
+
+
+def check_admission(event, user, token):
+    """Bekleme odası olan etkinlikte geçiş kartını doğrular; geçersizse ``AdmissionRequired``"""
+    if not event.admission_rate:
+        return
+    if not token:
+        raise AdmissionRequired('Queue pass required')
+    try:
+        data = signing.loads(token, salt=SALT, max_age=purchase_window())
+    except signing.BadSignature as exc:
+        # SignatureExpired de BadSignature'dır
+        raise AdmissionRequired(str(exc)) from None
+    if data.get('e') != event.pk or data.get('u') != user.pk:
+        raise AdmissionRequired('Queue pass belongs to another event or user')
+
+
+def pass_from(request):
+    return request.META.get('HTTP_X_QUEUE_PASS')
+
+
+class Gatekeeper:
+    """
+    Bekleme odası bağlantısı olan her süreçte kuyrukları tur aralığıyla
+    ilerleten görev. Birden fazla süreç aynı etkinliği izlese de ``advance``
+    kilidi sayesinde tur başına tek ilerleme olur.
+    """
+
+    def __init__(self):
+        self.rooms = {}
+        self.task = None
+
+    def subscribe(self, event_id, rate):
+        watchers, _ = self.rooms.get(event_id, (0, rate))
+        self.rooms[event_id] = (watchers + 1, rate)
+        if (
+            self.task is None
+            or self.task.done()
+            or self.task.get_loop() is not asyncio.get_running_loop()
+        ):
+            self.task = asyncio.ensure_future(self.run())
+
+    def unsubscribe(self, event_id):
+        watchers, rate = self.rooms.get(event_id, (1, None))
+        if watchers > 1:
+            self.rooms[event_id] = (watchers - 1, rate)
+        else:
+            self.rooms.pop(event_id, None)
+        if not self.rooms and self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    async def run(self):
+        while True:
+            for event_id, (_, rate) in list(self.rooms.items()):
+                try:
+                    await sync_to_async(advance)(event_id, rate)
+                except Exception:
+                    logger.exception('Waiting room advance failed for event %s', event_id)
+            await asyncio.sleep(tick())
+
+
+gatekeeper = Gatekeeper()
@@ -14,7 +14,7 @@ const RealTimeEventDetail: React.FC<RealTimeEventDetailProps> = ({
   const [ticketCount, setTicketCount] = useState(0);
   const [remainingTickets, setRemainingTickets] = useState(0);
   const [recentPurchases, setRecentPurchases] = useState<Array<{
-    user: string;
+    quantity: number;
     timestamp: number;
   }>>([]);
 
@@ -36,7 +36,7 @@ const RealTimeEventDetail: React.FC<RealTimeEventDetailProps> = ({
           // Add to recent purchases
           setRecentPurchases(prev => [
             {
-              user: message.user,
+              quantity: message.quantity,
               timestamp: Date.now()
             },
             ...prev.slice(0, 4) // Keep only last 5
@@ -102,8 +102,8 @@ const RealTimeEventDetail: React.FC<RealTimeEventDetailProps> = ({
           <div className="purchase-list">
             {recentPurchases.map((purchase, index) => (
               <div key={index} className="purchase-item">
-                <i className="fas fa-user-circle me-2"></i>
-                <span>{purchase.user}</span>
+                <i className="fas fa-ticket-alt me-2"></i>
+                <span>{purchase.quantity} bilet</span>
                 <small className="text-muted ms-2">
                   {Math.floor((Date.now() - purchase.timestamp) / 1000)} saniye önce
                 </small>
@@ -82,18 +82,28 @@ const PaymentForm: React.FC<{
       if (error) {
         onError(error.message || 'Ödeme sırasında bir hata oluştu');
       } else if (paymentIntent.status === 'succeeded') {
-        // Ödeme başarılı, bilet oluştur
-        const ticketResponse = await axios.post('http://localhost:8000/api/payment/confirm/', {
-          payment_intent_id: paymentIntent.id,
-          event_id: event.id,
-          quantity: quantity
-        }, {
-          headers: {
-            'Authorization': `Token ${localStorage.getItem('token')}`
+        // Ödeme başarılı; bilet sunucuda webhook ile oluşturulur, hazır olana kadar sor
+        let ticketResponse = null;
+        for (let attempt = 0; attempt < 30; attempt++) {
+          const response = await axios.post('http://localhost:8000/api/payment/confirm/', {
+            payment_intent_id: paymentIntent.id
+          }, {
+            headers: {
+              'Authorization': `Token ${localStorage.getItem('token')}`
+            }
+          });
+          if (response.status !== 202) {
+            ticketResponse = response;
+            break;
           }
-        });
+          await new Promise(resolve => setTimeout(resolve, 1000));
+        }
 
-        onSuccess(ticketResponse.data);
+        if (ticketResponse) {
+          onSuccess(ticketResponse.data);
+        } else {
+          onError('Ödemeniz alındı, biletiniz kısa süre içinde hesabınızda görünecek');
+        }
       }
     } catch (error: any) {
       onError(error.response?.data?.error || 'Ödeme sırasında bir hata oluştu');